@@ -0,0 +1,14 @@
+"""Performance benchmarks for airspeed velocity (asv)
+
+Run from the repository root with ``asv run``; see ``benchmarks/README.rst``.
+"""
+import os
+import sys
+
+# `asv run -E existing:python` does not install the project; benchmark the
+# working tree then.
+try:
+    import specview
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+"""Benchmarks of specview.analysis"""
+from specview.analysis.collapse import collapse
+from specview.analysis.statistics import extract, stats, eq_width
+
+from .synthetic import SIZES, cube, line_regions, spectrum
+
+
+class Statistics(object):
+    """Region extraction, statistics and equivalent width."""
+    params = SIZES
+    param_names = ['n']
+    timeout = 600
+
+    def setup(self, n):
+        self.spectrum = spectrum(n)
+        self.blue, self.line, self.red = line_regions(self.spectrum)
+        self.region = extract(self.spectrum, self.line)
+        self.blue_stats = stats(extract(self.spectrum, self.blue))
+        self.red_stats = stats(extract(self.spectrum, self.red))
+
+    def time_extract(self, n):
+        extract(self.spectrum, self.line)
+
+    def time_stats(self, n):
+        stats(self.spectrum)
+
+    def time_eq_width(self, n):
+        eq_width(self.blue_stats, self.red_stats, self.region)
+
+    def time_measure_equivalent_width(self, n):
+        # The whole sequence run by the equivalent width tool.
+        blue = stats(extract(self.spectrum, self.blue))
+        red = stats(extract(self.spectrum, self.red))
+        eq_width(blue, red, extract(self.spectrum, self.line))
+
+    def peakmem_extract(self, n):
+        extract(self.spectrum, self.line)
+
+    def peakmem_stats(self, n):
+        stats(self.spectrum)
+
+
+class Collapse(object):
+    """Collapsing a cube along its spectral axis."""
+    params = (SIZES, ['average', 'median'])
+    param_names = ['n', 'method']
+    timeout = 600
+
+    def setup(self, n, method):
+        self.cube = cube(n)
+
+    def time_collapse(self, n, method):
+        collapse(self.cube, method=method)
+
+    def peakmem_collapse(self, n, method):
+        collapse(self.cube, method=method)
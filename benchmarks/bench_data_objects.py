@@ -0,0 +1,48 @@
+"""Benchmarks of specview.core.data_objects"""
+from astropy.units import Unit
+
+from .synthetic import SIZES, spectrum
+
+
+class SpectrumDataArithmetic(object):
+    """Arithmetic between spectra on different grids, via `_fit_shape`."""
+    params = SIZES
+    param_names = ['n']
+    timeout = 600
+
+    def setup(self, n):
+        self.a = spectrum(n)
+        self.b = spectrum(n // 2, seed=1, start=5000., stop=8000.)
+
+    def time_fit_shape(self, n):
+        self.a._fit_shape(self.a, self.b)
+
+    def time_add(self, n):
+        self.a.add(self.b)
+
+    def time_divide(self, n):
+        self.a.divide(self.b)
+
+    def peakmem_fit_shape(self, n):
+        self.a._fit_shape(self.a, self.b)
+
+
+class ConvertUnit(object):
+    """`SpectrumArray.convert_unit_to` on both axes."""
+    params = SIZES
+    param_names = ['n']
+    timeout = 600
+
+    def setup(self, n):
+        self.spectrum = spectrum(n)
+        self.x_unit = Unit('micron')
+        self.y_unit = Unit('W / (m2 micron)')
+
+    def time_convert_dispersion(self, n):
+        self.spectrum.x.convert_unit_to(self.x_unit)
+
+    def time_convert_flux(self, n):
+        self.spectrum.y.convert_unit_to(self.y_unit)
+
+    def peakmem_convert_dispersion(self, n):
+        self.spectrum.x.convert_unit_to(self.x_unit)
@@ -0,0 +1,50 @@
+"""Benchmarks of specview.tools.preprocess"""
+import os
+import shutil
+import tempfile
+
+from astropy.io import fits
+
+from specview.tools.preprocess import read_data
+
+from .synthetic import SIZES, spectrum
+
+
+class ReadData(object):
+    """`read_data` of single-extension FITS images and tables."""
+    params = (SIZES, ['image', 'table'])
+    param_names = ['n', 'layout']
+    timeout = 600
+
+    def setup(self, n, layout):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir,
+                                 'spectrum_{}.fits'.format(layout))
+        data = spectrum(n)
+        x, y = data.x.data, data.y.data
+
+        if layout == 'image':
+            header = fits.Header()
+            header['CRPIX1'] = 1.
+            header['CRVAL1'] = x[0]
+            header['CDELT1'] = x[1] - x[0]
+            header['CUNIT1'] = 'Angstrom'
+            header['CTYPE1'] = 'WAVE'
+            hdu = fits.PrimaryHDU(y, header=header)
+            hdu.writeto(self.path)
+        else:
+            table = fits.BinTableHDU.from_columns([
+                fits.Column(name='WAVELENGTH', format='D', array=x,
+                            unit='Angstrom'),
+                fits.Column(name='FLUX', format='D', array=y,
+                            unit='erg / (s cm2 Angstrom)')])
+            fits.HDUList([fits.PrimaryHDU(), table]).writeto(self.path)
+
+    def teardown(self, n, layout):
+        shutil.rmtree(self.tmp_dir)
+
+    def time_read_data(self, n, layout):
+        read_data(self.path, flux='FLUX', dispersion='WAVELENGTH')
+
+    def peakmem_read_data(self, n, layout):
+        read_data(self.path, flux='FLUX', dispersion='WAVELENGTH')
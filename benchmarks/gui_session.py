@@ -0,0 +1,279 @@
+"""Headless GUI session benchmark
+
+Scripts a realistic session on the main window, rendered offscreen: load
+spectra, plot them, add ROIs and layers, change units, fit models and
+edit parameters. For every action it records the latency of the call
+itself and the frame time of processing the resulting events and
+repainting the window, plus object counts at the end of the session.
+
+Run as a script; the report is JSON so that CI can compare it against a
+committed baseline::
+
+    python -m benchmarks.gui_session --output report.json
+    python -m benchmarks.gui_session --compare baseline.json
+
+Qt is imported in `run_session` only, so that asv can walk this module
+without starting an application.
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .synthetic import spectrum
+
+_timer = getattr(time, 'perf_counter', time.time)
+
+# Latency differences below this many seconds are never regressions.
+_NOISE_FLOOR = 1e-3
+
+
+class Recorder(object):
+    """Time actions on a running Qt application
+
+    Parameters
+    ----------
+    app: QApplication
+        Processes the events triggered by each action.
+
+    widget: QWidget
+        Repainted after each action.
+    """
+    def __init__(self, app, widget):
+        self._app = app
+        self._widget = widget
+        self.timings = OrderedDict()
+
+    @contextmanager
+    def action(self, name):
+        """Time the enclosed block as one occurrence of `name`."""
+        start = _timer()
+        yield
+        called = _timer()
+        self._app.processEvents()
+        self._widget.repaint()
+        done = _timer()
+        self.timings.setdefault(name, []).append((called - start,
+                                                  done - called))
+
+    def summary(self):
+        """Return {action: {'count', 'latency', 'frame'}} statistics."""
+        result = OrderedDict()
+        for name, timings in self.timings.items():
+            latencies, frames = zip(*timings)
+            result[name] = {'count': len(timings),
+                            'latency': _describe(latencies),
+                            'frame': _describe(frames)}
+        return result
+
+
+def _describe(values):
+    values = sorted(values)
+    return {'min': values[0],
+            'median': values[len(values) // 2],
+            'max': values[-1],
+            'total': sum(values)}
+
+
+def run_session(n_spectra=20, npix=10000, repeat=3):
+    """Run the scripted session
+
+    Parameters
+    ----------
+    n_spectra: int
+        Number of spectra loaded and plotted together.
+
+    npix: int
+        Points per spectrum.
+
+    repeat: int
+        Times the unit change, parameter edit and model replot are
+        repeated.
+
+    Returns
+    -------
+    dict
+        The report: session configuration, per-action timings and
+        object counts.
+    """
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    from astropy.units import Unit
+    from specview.ui.qt.pyqt_nonblock import pyqtapplication
+
+    app = pyqtapplication(sys.argv[:1])
+
+    from specview.ui.controller import Controller
+
+    controller = Controller()
+    viewer = controller.viewer
+    model = controller.model
+    viewer.show()
+    recorder = Recorder(app, viewer)
+
+    # Load and plot
+    items = []
+    for i in range(n_spectra):
+        with recorder.action('add_data_set'):
+            items.append(controller.add_data_set(
+                spectrum(npix, seed=i), name='Spectrum {}'.format(i)))
+
+    with recorder.action('create_display'):
+        controller.create_display(items[0])
+    sub_window = viewer.mdiarea.subWindowList()[-1]
+    viewer.mdiarea.setActiveSubWindow(sub_window)
+    graph = sub_window.graph
+
+    for item in items[1:]:
+        with recorder.action('add_item'):
+            controller.display_graph(item, sub_window)
+
+    # ROIs and layers
+    graph.select_active(items[0].layers[0])
+    for _ in range(2):
+        with recorder.action('add_roi'):
+            graph.add_roi()
+
+    with recorder.action('create_layer'):
+        layer = model.create_layer(graph.active_item.parent,
+                                   graph.active_mask)
+        controller.display_graph(layer, sub_window)
+
+    # Units
+    for i in range(repeat):
+        unit = Unit('micron') if i % 2 == 0 else Unit('Angstrom')
+        with recorder.action('change_units'):
+            graph.set_units(x=unit)
+
+    with recorder.action('update_all'):
+        graph.update_all()
+
+    # Models
+    with recorder.action('create_fit_model'):
+        model.create_fit_model(layer, 'Gaussian1D')
+
+    model_tree = viewer.model_editor_dock.wgt_model_tree
+    viewer.data_dock.wgt_data_tree.setCurrentIndex(layer.index())
+    parameter = layer.child(0).child(0, 1)
+    model_tree.setCurrentIndex(parameter.index())
+
+    for i in range(repeat):
+        with recorder.action('edit_parameter'):
+            model.setData(parameter.index(), str(1. + 0.1 * i))
+        with recorder.action('replot_model'):
+            controller._replot_model()
+
+    gc.collect()
+    n_layers = sum(len(item.layers) for item in model.items)
+    counts = OrderedDict([
+        ('python_objects', len(gc.get_objects())),
+        ('data_items', len(model.items)),
+        ('layers', n_layers),
+        ('sub_windows', len(viewer.mdiarea.subWindowList())),
+        ('plot_items', sum(len(sw.graph.plot_window.listDataItems())
+                           for sw in viewer.mdiarea.subWindowList())),
+    ])
+
+    return OrderedDict([
+        ('config', OrderedDict([('n_spectra', n_spectra),
+                                ('npix', npix),
+                                ('repeat', repeat),
+                                ('qt_platform',
+                                 os.environ.get('QT_QPA_PLATFORM'))])),
+        ('actions', recorder.summary()),
+        ('objects', counts),
+    ])
+
+
+def compare(report, baseline, tolerance=0.25):
+    """List the regressions of `report` relative to `baseline`
+
+    Parameters
+    ----------
+    report, baseline: dict
+        Reports as returned by `run_session`.
+
+    tolerance: float
+        Allowed relative increase of median latencies, frame times and
+        object counts.
+
+    Returns
+    -------
+    [str,]
+        A description of each regression.
+    """
+    regressions = []
+    for name, timings in report['actions'].items():
+        reference = baseline['actions'].get(name)
+        if reference is None:
+            continue
+        for kind in ('latency', 'frame'):
+            value = timings[kind]['median']
+            limit = max(reference[kind]['median'] * (1. + tolerance),
+                        reference[kind]['median'] + _NOISE_FLOOR)
+            if value > limit:
+                regressions.append('{} {}: {:.4f}s > {:.4f}s'.format(
+                    name, kind, value, limit))
+
+    for name, value in report['objects'].items():
+        reference = baseline['objects'].get(name)
+        if reference is not None and value > reference * (1. + tolerance):
+            regressions.append('{} count: {} > {}'.format(name, value,
+                                                          reference))
+    return regressions
+
+
+def main(argv=None):
+    args = _define_arguments(argv)
+    report = run_session(n_spectra=args.spectra, npix=args.npix,
+                         repeat=args.repeat)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as report_file:
+            report_file.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(report, baseline, tolerance=args.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression, file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+def _define_arguments(argv=None):
+    """Define the command line arguments"""
+    parser = argparse.ArgumentParser('Headless GUI session benchmark.')
+    parser.add_argument('--spectra', type=int, default=20,
+                        help='Number of spectra to load.')
+    parser.add_argument('--npix', type=int, default=10000,
+                        help='Points per spectrum.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Repetitions of the editing actions.')
+    parser.add_argument('--output',
+                        help='Write the JSON report here instead of stdout.')
+    parser.add_argument('--compare',
+                        help='Baseline report to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative slow down.')
+
+    args = parser.parse_args(argv)
+    if args.compare and not os.path.isfile(args.compare):
+        # Checked before the session, which takes a while.
+        parser.error('no baseline report {0}; record one on the reference '
+                     'machine with: python -m benchmarks.gui_session '
+                     '--output {0}'.format(args.compare))
+    return args
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Synthetic spectra and cubes shared by the benchmarks"""
+import os
+
+import numpy as np
+
+from specview.core.data_objects import CubeData, SpectrumData
+
+# Number of points benchmarked. The largest sizes take several GB of
+# memory; SPECVIEW_BENCH_MAX_SIZE drops those above it.
+SIZES = [n for n in [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7, 10 ** 8]
+         if n <= float(os.environ.get('SPECVIEW_BENCH_MAX_SIZE', 'inf'))]
+
+# Spatial size of the cubes; the spectral axis takes up the rest.
+CUBE_SPAXELS = (10, 10)
+
+_DISPERSION = (4000., 9000.)
+
+
+def spectrum(n, seed=0, start=_DISPERSION[0], stop=_DISPERSION[1]):
+    """A noisy continuum with an absorption line, on a linear grid.
+
+    Parameters
+    ----------
+    n: int
+        Number of points.
+
+    Returns
+    -------
+    SpectrumData
+    """
+    rng = np.random.RandomState(seed)
+    x = np.linspace(start, stop, n)
+    center = 0.5 * (start + stop)
+    sigma = 0.01 * (stop - start)
+    y = (1. - 0.5 * np.exp(-0.5 * ((x - center) / sigma) ** 2) +
+         rng.normal(scale=0.01, size=n))
+
+    result = SpectrumData()
+    result.set_x(x, unit='Angstrom')
+    result.set_y(y, unit='erg / (s cm2 Angstrom)')
+    return result
+
+
+def cube(n, seed=0):
+    """A cube of about `n` points of noise.
+
+    Returns
+    -------
+    CubeData
+    """
+    ny, nx = CUBE_SPAXELS
+    nz = max(1, n // (ny * nx))
+    rng = np.random.RandomState(seed)
+    result = CubeData(rng.normal(size=(nz, ny, nx)))
+    result.set_unit(0, 'Angstrom')
+    result.set_unit(1, 'arcsec')
+    result.set_unit(2, 'arcsec')
+    return result
+
+
+def line_regions(spectrum_data):
+    """Blue continuum, line and red continuum ranges around the line."""
+    x = spectrum_data.x.data
+    start, stop = x[0], x[-1]
+    width = stop - start
+    center = 0.5 * (start + stop)
+    return ((center - 0.20 * width, center - 0.10 * width),
+            (center - 0.05 * width, center + 0.05 * width),
+            (center + 0.10 * width, center + 0.20 * width))
@@ -5,6 +5,9 @@ from astropy.io.fits.hdu.table import _TableLikeHDU as FITS_table
 def deep21dconvert(hdul_in, separate=True):
     '''Convert a DEEP2 1D spectra to a more normalized spectra
 
+    Superseded by `specview.tools.preprocess.read_deep2`, which reads
+    the cells in place instead of copying them into new tables.
+
     Parameters
     ----------
     hdul_in: fits.HDUList
@@ -97,15 +97,20 @@ for root, dirs, files in os.walk(PACKAGENAME):
                     os.path.relpath(root, PACKAGENAME), filename))
 package_info['package_data'][PACKAGENAME].extend(c_files)
 
+install_requires = ['numpy>=1.9.1',
+                    'scipy>=0.15',
+                    'astropy>=1.0',
+                    'pyqtgraph>=0.9.10']
+# concurrent.futures backport
+if sys.version_info[0] < 3:
+    install_requires.append('futures')
+
 setup(name=PACKAGENAME,
       version=VERSION,
       description=DESCRIPTION,
       scripts=scripts,
       requires=['astropy'],
-      install_requires=['numpy>=1.9.1',
-                        'scipy>=0.15',
-                        'astropy>=1.0',
-                        'pyqtgraph>=0.9.10'],
+      install_requires=install_requires,
       provides=[PACKAGENAME],
       author=AUTHOR,
       author_email=AUTHOR_EMAIL,
@@ -1,30 +1,82 @@
+import importlib
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 import numpy as np
-from astropy.modeling import models, fitting
-
-all_models = {
-    'Gaussian1D': models.Gaussian1D,
-    'GaussianAbsorption1D': models.GaussianAbsorption1D,
-    'Lorentz1D': models.Lorentz1D,
-    'MexicanHat1D': models.MexicanHat1D,
-    'Trapezoid1D': models.Trapezoid1D,
-    'ExponentialCutoffPowerLaw1D': models.ExponentialCutoffPowerLaw1D,
-    'BrokenPowerLaw1D': models.BrokenPowerLaw1D,
-    'LogParabola1D': models.LogParabola1D,
-    'PowerLaw1D': models.PowerLaw1D,
-    'Linear1D': models.Linear1D,
-    'Const1D': models.Const1D,
-    'Redshift': models.Redshift,
-    'Scale': models.Scale,
-    'Shift': models.Shift,
-    'Sine1D': models.Sine1D,
-    'Chebyshev1D': models.Chebyshev1D,
-    'Legendre1D': models.Legendre1D,
-    'Polynomial1D': models.Polynomial1D,
-}
-
-all_fitters = {
-    'Levenberg-Marquardt': fitting.LevMarLSQFitter,
-}
+
+
+class _LazyRegistry(Mapping):
+    """Name to class mapping whose classes are imported on first lookup.
+
+    Listing the names does not import anything, so selectors can be
+    populated without paying for `astropy.modeling`.
+
+    Parameters
+    ----------
+    module: str
+        Module holding the classes.
+
+    names: {str: str}
+        Registered name to class name in `module`.
+    """
+    def __init__(self, module, names):
+        self._module = module
+        self._names = names
+        self._classes = None
+
+    def _load(self):
+        if self._classes is None:
+            module = importlib.import_module(self._module)
+            self._classes = dict((name, getattr(module, attr))
+                                 for name, attr in self._names.items())
+        return self._classes
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, key):
+        return key in self._names
+
+    def keys(self):
+        return list(self._names)
+
+    def values(self):
+        return list(self._load().values())
+
+
+all_models = _LazyRegistry('astropy.modeling.models', dict(
+    (name, name) for name in [
+        'Gaussian1D',
+        'GaussianAbsorption1D',
+        'Lorentz1D',
+        'MexicanHat1D',
+        'Trapezoid1D',
+        'ExponentialCutoffPowerLaw1D',
+        'BrokenPowerLaw1D',
+        'LogParabola1D',
+        'PowerLaw1D',
+        'Linear1D',
+        'Const1D',
+        'Redshift',
+        'Scale',
+        'Shift',
+        'Sine1D',
+        'Chebyshev1D',
+        'Legendre1D',
+        'Polynomial1D',
+    ]))
+
+all_fitters = _LazyRegistry('astropy.modeling.fitting', {
+    'Levenberg-Marquardt': 'LevMarLSQFitter',
+})
 
 
 def get_model(name):
@@ -42,6 +94,8 @@ def get_fitter(name):
 
 
 def gaussian(x, y):
+    from astropy.modeling import models, fitting
+
     amp, mean, stddev = _gaussian_parameter_estimates(x, y)
     g_init = models.Gaussian1D(amplitude=amp, mean=mean, stddev=stddev)
     fit_g = fitting.LevMarLSQFitter()
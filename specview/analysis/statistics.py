@@ -1,6 +1,9 @@
+import warnings
+
 import numpy as np
 
-from specview.core import SpectrumData
+from specview.core import SpectrumData, SpectrumCollection
+from specview.core.grid import searchsorted
 
 
 def extract(spectrum_data, x_range):
@@ -8,7 +11,7 @@ def extract(spectrum_data, x_range):
 
     Paramaters
     ----------
-    spectrum_data: SpectrumData
+    spectrum_data: SpectrumData or SpectrumCollection
       Contains the spectrum to be extracted.
     w_range: tuple
       A spectral coordinate range as in (wave1, wave2)
@@ -16,8 +19,23 @@ def extract(spectrum_data, x_range):
     Returns
     -------
     SpectrumData with extracted region.
+    A collection gives a collection of the columns where any row is in
+    the region; with a dispersion per row, the values of a row outside
+    of the region are masked.
 
     '''
+    if isinstance(spectrum_data, SpectrumCollection):
+        return _extract_collection(spectrum_data, x_range)
+
+    grid = spectrum_data.x.grid
+    if grid is not None and spectrum_data.x.mask is None and grid.step > 0:
+        # The region of a grid is a slice of it, found by arithmetic.
+        region = grid.range_slice(*x_range)
+        result = SpectrumData()
+        result.set_x(grid[region], unit=spectrum_data.x.unit)
+        result.set_y(spectrum_data.y.data[region], unit=spectrum_data.y.unit)
+        return result
+
     x = spectrum_data.x.data
     y = spectrum_data.y.data
 
@@ -30,27 +48,138 @@ def extract(spectrum_data, x_range):
     return result
 
 
-def stats(spectrum_data):
+def stats(spectrum_data, sigma=3., iters=5, percentiles=()):
     ''' Computes basic statistics for a spectral region
     contained in a SpectrumData instance.
 
+    The moments are computed in a single pass over the flux; the median,
+    percentiles and median absolute deviation use selection
+    (`np.partition`) instead of a full sort. The total is integrated
+    against the dispersion with the trapezoidal rule.
+
     Paramaters
     ----------
-    spectrum_data: SpectrumData
+    spectrum_data: SpectrumData or SpectrumCollection
       Typically this is returned by the extract() function
+    sigma: float
+      Clipping threshold, in standard deviations, of the clipped mean.
+    iters: int
+      Maximum number of clipping iterations.
+    percentiles: [float,]
+      Percentiles, in [0, 100], to compute.
+
+    Returns
+    -------
+    statistics: dict
+      mean, median, stddev, total and npoints, plus the median absolute
+      deviation 'mad', the sigma-clipped mean 'clipped_mean' and
+      'percentiles', a list matching `percentiles`. If the flux has an
+      uncertainty, 'mean_error' and 'total_error' are added.
+      For a collection, each value is an array with one entry per row,
+      and 'percentiles' an array of one row per spectrum.
+
+    '''
+    if isinstance(spectrum_data, SpectrumCollection):
+        return _stats_collection(spectrum_data, sigma, iters, percentiles)
+
+    x = np.asarray(spectrum_data.x.data)
+    flux = np.asarray(spectrum_data.y.data)
+
+    npoints, mean, stddev = _moments(flux)
+    q = _quantiles(flux, [0.5] + [p / 100. for p in percentiles])
+    median = q[0]
+    weights = _trapezoid_weights(x)
+
+    result = {'mean':    mean,
+              'median':  median,
+              'stddev':  stddev,
+              'total':   np.dot(weights, flux),
+              'npoints': npoints,
+              'mad':     _quantiles(np.abs(flux - median), [0.5])[0],
+              'clipped_mean': _clipped_mean(flux, median, stddev,
+                                            sigma, iters),
+              'percentiles': list(q[1:]),
+              }
+
+    variance = spectrum_data.y.variance
+    if variance is not None:
+        result['mean_error'] = np.sqrt(np.sum(variance)) / npoints
+        result['total_error'] = np.sqrt(np.dot(weights ** 2, variance))
+
+    return result
+
+
+def stats_regions(spectrum_data, x_ranges, median=True):
+    ''' Computes the statistics of many spectral regions at once.
+
+    Regions follow the convention of extract(): x_range[0] <= x <
+    x_range[1]. The dispersion must be increasing. Mean, standard
+    deviation, total and their errors come from cumulative sums, so
+    every region is computed in one vectorized call whatever its size.
+
+    Paramaters
+    ----------
+    spectrum_data: SpectrumData
+      Contains the spectrum.
+    x_ranges: [(float, float),]
+      Spectral coordinate ranges, as in [(wave1, wave2),]
+    median: bool
+      Also compute the median of each region. This is done region by
+      region, by selection on a view of the data.
 
     Returns
     -------
     statistics: dict
+      As stats(), without the robust estimators, with an array per key
+      in the order of `x_ranges`. Empty regions have NaN statistics.
 
     '''
-    flux = spectrum_data.y.data
-    return {'mean':    np.mean(flux),
-            'median':  np.median(flux),
-            'stddev':  np.std(flux),
-            'total':   np.trapz(flux),
-            'npoints': len(flux)
-            }
+    x = np.asarray(spectrum_data.x.data)
+    flux = np.asarray(spectrum_data.y.data)
+    x_ranges = np.asarray(x_ranges, dtype=np.float64).reshape(-1, 2)
+
+    start = searchsorted(spectrum_data.x, x_ranges[:, 0], side='left')
+    stop = searchsorted(spectrum_data.x, x_ranges[:, 1], side='left')
+    stop = np.maximum(start, stop)
+    npoints = stop - start
+
+    # Shift by a typical value so that the squares do not cancel out.
+    shift = flux[0] if len(flux) else 0.
+    shifted = np.asarray(flux, dtype=np.float64) - shift
+    s1 = _cumsum(shifted)
+    s2 = _cumsum(shifted ** 2)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sum1 = s1[stop] - s1[start]
+        mean = sum1 / npoints
+        var = (s2[stop] - s2[start]) / npoints - mean ** 2
+        mean += shift
+        stddev = np.sqrt(np.maximum(var, 0.))
+
+    # Trapezoid areas of each interval between consecutive points; a
+    # region of points [i0, i1) integrates intervals [i0, i1 - 1).
+    areas = _cumsum(0.5 * (flux[1:] + flux[:-1]) * np.diff(x))
+    first, last = _region_ends(start, stop, len(x))
+    total = areas[last] - areas[first]
+
+    result = {'mean': mean,
+              'stddev': stddev,
+              'total': total,
+              'npoints': npoints}
+
+    if median:
+        result['median'] = np.array(
+            [_quantiles(flux[i0:i1], [0.5])[0] if i1 > i0 else np.nan
+             for i0, i1 in zip(start, stop)])
+
+    variance = spectrum_data.y.variance
+    if variance is not None:
+        v1 = _cumsum(variance)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['mean_error'] = np.sqrt(v1[stop] - v1[start]) / npoints
+        result['total_error'] = _trapezoid_errors(x, variance, start, stop)
+
+    return result
 
 
 def eq_width(cont1_stats, cont2_stats, line):
@@ -60,7 +189,9 @@ def eq_width(cont1_stats, cont2_stats, line):
 
     This uses for now a very simple continuum subtraction method:
     it just subtracts a constant from the line spectrum, where the
-    constant is (continuum1[mean] + continuum2[mean]) / 2.
+    constant is (continuum1[mean] + continuum2[mean]) / 2. Each pixel
+    is weighted by its own width. See `specview.analysis.lines` for
+    sloped continua and whole line lists.
 
     Parameters
     ----------
@@ -80,13 +211,203 @@ def eq_width(cont1_stats, cont2_stats, line):
     # average of 2 continuum regions.
     avg_cont = (cont1_stats['mean'] + cont2_stats['mean']) / 2.0
 
-    # average dispersion in the line region.
-    avg_dx = np.mean(line.x.data[1:] - line.x.data[:-1])
+    # width of each pixel in the line region.
+    x = np.asarray(line.x.data)
+    dx = np.gradient(x) if len(x) > 1 else np.zeros_like(x)
 
     # flux
-    flux = np.sum(line.y.data - avg_cont) * avg_dx
+    flux = np.dot(line.y.data - avg_cont, dx)
 
     #  EW = Sum( (Fc-Fl)/Fc * dw
-    ew =  np.sum((avg_cont - line.y.data) / avg_cont * avg_dx)
+    ew = np.dot(avg_cont - line.y.data, dx) / avg_cont
 
     return flux, ew
+
+
+def _cumsum(values):
+    """Cumulative sum in float64 with a leading zero."""
+    result = np.zeros(len(values) + 1, dtype=np.float64)
+    np.cumsum(values, dtype=np.float64, out=result[1:])
+    return result
+
+
+def _moments(values):
+    """Number of points, mean and standard deviation in a single pass."""
+    n = len(values)
+    if n == 0:
+        return 0, np.nan, np.nan
+
+    # Shift by the first value so the sum of squares does not cancel out;
+    # float32 flux is summed in float64.
+    shifted = np.asarray(values, dtype=np.float64) - values[0]
+    total = np.sum(shifted, dtype=np.float64)
+    squares = np.dot(shifted, shifted)
+    mean = total / n
+    variance = max(squares / n - mean ** 2, 0.)
+    return n, mean + values[0], np.sqrt(variance)
+
+
+def _quantiles(values, qs):
+    """Linearly interpolated quantiles, in [0, 1], by selection."""
+    n = len(values)
+    if n == 0:
+        return [np.nan] * len(qs)
+
+    positions = np.asarray(qs, dtype=np.float64) * (n - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, n - 1)
+    kth = np.unique(np.concatenate((lower, upper)))
+    selected = np.partition(values, kth)
+
+    fraction = positions - lower
+    return list(selected[lower] * (1. - fraction) +
+                selected[upper] * fraction)
+
+
+def _clipped_mean(values, center, stddev, sigma, iters):
+    """Mean of `values` after iterative sigma clipping about the median."""
+    kept = values
+    for _ in range(iters):
+        if not len(kept) or not stddev > 0:
+            break
+        keep = np.abs(kept - center) <= sigma * stddev
+        if keep.all():
+            break
+        kept = kept[keep]
+        _, _, stddev = _moments(kept)
+        center = _quantiles(kept, [0.5])[0]
+    return _moments(kept)[1]
+
+
+def _trapezoid_weights(x):
+    """Weights w such that np.dot(w, y) is the trapezoid integral."""
+    weights = np.zeros(len(x), dtype=np.float64)
+    if len(x) > 1:
+        dx = np.diff(x)
+        weights[:-1] += 0.5 * dx
+        weights[1:] += 0.5 * dx
+    return weights
+
+
+def _region_ends(start, stop, n):
+    """Indices of the first and last point of regions [start, stop).
+
+    Empty regions, including those past the end of the data, get equal
+    valid indices so that differences of cumulative sums are zero.
+    """
+    first = np.minimum(start, max(n - 1, 0))
+    last = np.maximum(np.minimum(stop, n) - 1, first)
+    return first, last
+
+
+def _trapezoid_errors(x, variance, start, stop):
+    """Errors of the trapezoid integral of each region [start, stop)."""
+    dx = np.diff(x)
+    # Interior points have weight (dx[i - 1] + dx[i]) / 2, the first and
+    # last point of a region only the half interval inside it.
+    left = np.concatenate(([0.], 0.5 * dx))
+    right = np.concatenate((0.5 * dx, [0.]))
+    interior = _cumsum((left + right) ** 2 * variance)
+
+    first, last = _region_ends(start, stop, len(x))
+    inner = np.minimum(first + 1, last)
+    error = interior[last] - interior[inner]
+    ends = stop - start > 1
+    error += np.where(ends, right[first] ** 2 * variance[first], 0.)
+    error += np.where(ends, left[last] ** 2 * variance[last], 0.)
+    return np.sqrt(error)
+
+
+def _extract_collection(collection, x_range):
+    """extract() of all the rows of a collection at once."""
+    x = collection.x
+    inside = (x >= x_range[0]) & (x < x_range[1])
+    if collection.shared_dispersion:
+        return collection._select(columns=inside)
+
+    columns = inside.any(axis=0)
+    return collection._select(columns=columns,
+                              mask=np.logical_not(inside[:, columns]))
+
+
+def _stats_collection(collection, sigma, iters, percentiles):
+    """stats() of every row of a collection, with NaN for missing values.
+
+    Masked values are left out, as the masked values of a spectrum.
+    """
+    flux = np.array(collection.y, dtype=np.float64)
+    if collection.mask is not None:
+        flux[collection.mask] = np.nan
+    valid = np.logical_not(np.isnan(flux))
+    x = np.broadcast_to(collection.x, flux.shape)
+
+    with warnings.catch_warnings():
+        # Rows without values give NaN, as for an empty spectrum.
+        warnings.simplefilter('ignore', RuntimeWarning)
+        npoints = valid.sum(axis=1)
+        mean = np.nanmean(flux, axis=1)
+        stddev = np.nanstd(flux, axis=1)
+        q = np.nanpercentile(flux, [50.] + list(percentiles), axis=1)
+        median = q[0]
+        mad = np.nanmedian(np.abs(flux - median[:, None]), axis=1)
+        clipped_mean = _clipped_means(flux, median, stddev, sigma, iters)
+
+    weights = _trapezoid_weights_2d(x, valid)
+    result = {'mean': mean,
+              'median': median,
+              'stddev': stddev,
+              'total': np.sum(weights * np.where(valid, flux, 0.), axis=1),
+              'npoints': npoints,
+              'mad': mad,
+              'clipped_mean': clipped_mean,
+              'percentiles': q[1:].T,
+              }
+
+    variance = collection.variance
+    if variance is not None:
+        variance = np.where(valid, variance, 0.)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['mean_error'] = np.sqrt(variance.sum(axis=1)) / npoints
+        result['total_error'] = np.sqrt(np.sum(weights ** 2 * variance,
+                                               axis=1))
+
+    return result
+
+
+def _clipped_means(flux, center, stddev, sigma, iters):
+    """_clipped_mean() of every row of `flux`, NaN for missing values."""
+    kept = flux
+    for _ in range(iters):
+        keep = np.logical_not(np.abs(kept - center[:, None]) >
+                              sigma * stddev[:, None])
+        # Rows without spread are not clipped.
+        keep |= np.logical_not(stddev > 0)[:, None]
+        if keep.all():
+            break
+        kept = np.where(keep, kept, np.nan)
+        stddev = np.nanstd(kept, axis=1)
+        center = np.nanmedian(kept, axis=1)
+    return np.nanmean(kept, axis=1)
+
+
+def _trapezoid_weights_2d(x, valid):
+    """_trapezoid_weights() of the valid points of every row."""
+    n, npix = valid.shape
+    rows = np.arange(n)[:, None]
+    index = np.arange(npix)
+
+    # Previous and next valid point of every point, -1 and npix if none.
+    previous = np.maximum.accumulate(np.where(valid, index, -1), axis=1)
+    previous = np.concatenate((np.full((n, 1), -1), previous[:, :-1]),
+                              axis=1)
+    following = np.minimum.accumulate(
+        np.where(valid, index, npix)[:, ::-1], axis=1)[:, ::-1]
+    following = np.concatenate((following[:, 1:], np.full((n, 1), npix)),
+                               axis=1)
+
+    has_previous = valid & (previous >= 0)
+    has_following = valid & (following < npix)
+    left = x - x[rows, np.maximum(previous, 0)]
+    right = x[rows, np.minimum(following, npix - 1)] - x
+    return 0.5 * (np.where(has_previous, left, 0.) +
+                  np.where(has_following, right, 0.))
@@ -2,7 +2,11 @@
 # by importing them here in conftest.py they are discoverable by py.test
 # no matter how it is invoked within the source tree.
 
-from astropy.tests.pytest_plugins import *
+try:
+    from astropy.tests.pytest_plugins import *
+except ImportError:
+    # astropy 3.0 and later ship these as the pytest-astropy plugins.
+    pass
 
 ## Uncomment the following line to treat all DeprecationWarnings as
 ## exceptions
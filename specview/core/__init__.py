@@ -1 +1,5 @@
-from data_objects import CubeData, ImageArray, SpectrumArray, SpectrumData
+from .data_objects import (CubeData, ImageArray, SpectrumArray,
+                           SpectrumCollection, SpectrumData)
+from .grid import Grid
+from .masks import DQMask
+from .ring import SpectrumRing
@@ -1,8 +1,20 @@
 import numpy as np
-from astropy.nddata import (NDData, NDSlicingMixin, NDArithmeticMixin)
-from astropy.wcs import WCS
+from astropy.nddata import (NDData, NDSlicingMixin, NDArithmeticMixin,
+                            StdDevUncertainty)
 from astropy.units import Unit
 
+from .grid import Grid
+from .storage import as_stored, keep_dtype
+
+# Rows converted at a time by `native_byteorder`.
+BYTEORDER_CHUNK = 1 << 20
+
+# Variance-based uncertainties only exist from astropy 3.1 on.
+try:
+    from astropy.nddata import VarianceUncertainty, InverseVariance
+except ImportError:
+    VarianceUncertainty = InverseVariance = None
+
 
 class SpectrumArray(NDSlicingMixin, NDArithmeticMixin, NDData):
     """
@@ -10,20 +22,90 @@ class SpectrumArray(NDSlicingMixin, NDArithmeticMixin, NDData):
 
     Contains additional metadata such as uncertainties, a mask, units,
     and/or coordinate system.
+
+    Values in non-native byte order, as read from FITS files, are
+    converted once, when first used.
+
+    The data can be a `Grid`, for a linear or log-linear dispersion.
+    It is then kept parametric through slicing and unit scaling, and
+    only made into values by `data`.
     """
+    # Not converted while NDData sets up the array.
+    _native = True
+
     def __init__(self, *args, **kwargs):
         super(SpectrumArray, self).__init__(*args, **kwargs)
+        self._native = False
 
     @property
     def shape(self):
+        if self.mask is None:
+            return super(SpectrumArray, self).data.shape
         return self.data.shape
 
     @property
     def data(self):
+        self._to_native()
+        data = super(SpectrumArray, self).data
+        if isinstance(data, Grid):
+            data = data.values
         if self.mask is None:
-            return super(SpectrumArray, self).data
+            return data
+        else:
+            return data[np.logical_not(self.mask)]
+
+    @property
+    def grid(self):
+        """The `Grid` of the values, or None if they are an array."""
+        data = super(SpectrumArray, self).data
+        return data if isinstance(data, Grid) else None
+
+    @property
+    def variance(self):
+        """Variance of the unmasked data, or None without uncertainty."""
+        if self.uncertainty is None:
+            return None
+
+        self._to_native()
+        variance = _as_variance(self.uncertainty)
+        if self.mask is not None:
+            variance = variance[np.logical_not(self.mask)]
+        return variance
+
+    def _to_native(self):
+        if self._native:
+            return
+        if not isinstance(self._data, Grid):
+            self._data = native_byteorder(self._data)
+        if self.uncertainty is not None:
+            array = self.uncertainty.array
+            if not array.dtype.isnative:
+                self.uncertainty.array = native_byteorder(array)
+        self._native = True
+
+    def __getitem__(self, item):
+        # Index the unmasked values, as `data` and `shape` do; the
+        # result has no mask left.
+        keep = None if self.mask is None else np.logical_not(self.mask)
+        if keep is None:
+            # One run of selected values is a slice: a view of an array,
+            # or a grid.
+            item = _as_slice(item)
+        if keep is None and self.grid is not None:
+            data = self.grid[item]
         else:
-            return super(SpectrumArray, self).data[np.logical_not(self.mask)]
+            data = self.data[item]
+        uncertainty = None
+        if self.uncertainty is not None:
+            values = np.asarray(self.uncertainty.array)
+            if keep is not None:
+                values = values[keep]
+            uncertainty = self.uncertainty.__class__(values[item])
+        wcs = self.wcs[item] if (self.wcs is not None and keep is None and
+                                 isinstance(item, slice)) else None
+
+        return self.__class__(data, uncertainty=uncertainty, wcs=wcs,
+                              meta=self.meta, unit=self.unit)
 
     def convert_unit_to(self, unit, equivalencies=[]):
         """
@@ -50,14 +132,23 @@ class SpectrumArray(NDSlicingMixin, NDArithmeticMixin, NDData):
         """
         if self.unit is None:
             raise ValueError("No unit specified on source data")
-
-        data = self.unit.to(unit, self.data, equivalencies=equivalencies)
+        self._to_native()
+
+        # Convert all values; the mask is kept along. A grid is scaled,
+        # if the conversion is a scaling.
+        data = super(SpectrumArray, self).data
+        factor = None
+        if isinstance(data, Grid):
+            factor = _scale_factor(self.unit, unit, equivalencies)
+        if factor is not None:
+            data = data.scaled(factor)
+        else:
+            data = keep_dtype(self.unit.to(unit, np.asarray(data),
+                                           equivalencies=equivalencies), data)
 
         if self.uncertainty is not None:
-            uncertainty_values = self.unit.to(unit, self.uncertainty.array,
-                                              equivalencies=equivalencies)
-            # should work for any uncertainty class
-            uncertainty = self.uncertainty.__class__(uncertainty_values)
+            uncertainty = _convert_uncertainty(self.uncertainty, self.unit,
+                                               unit, equivalencies)
         else:
             uncertainty = None
 
@@ -83,18 +174,22 @@ class SpectrumData(object):
     def __init__(self, x=None, y=None):
         self._x = x
         self._y = y
+        self._dq = None
 
-    def set_x(self, data, wcs=None, unit=None, name=""):
-        if not isinstance(wcs, WCS) and wcs is not None:
-            raise TypeError("wcs object is not of type WCS.")
+    def set_x(self, data, wcs=None, unit=None, name="", mask=None):
+        _check_wcs(wcs)
 
-        self._x = SpectrumArray(data, wcs=wcs, unit=unit)
+        self._x = SpectrumArray(data, wcs=wcs, unit=unit, mask=mask)
 
-    def set_y(self, data, wcs=None, unit=None, name=""):
-        if not isinstance(wcs, WCS) and wcs is not None:
-            raise TypeError("wcs object is not of type WCS.")
+    def set_y(self, data, wcs=None, unit=None, name="", uncertainty=None,
+              mask=None):
+        _check_wcs(wcs)
 
-        self._y = SpectrumArray(data, wcs=wcs, unit=unit)
+        # Flux is kept in the storage precision.
+        if uncertainty is not None:
+            uncertainty.array = as_stored(np.asanyarray(uncertainty.array))
+        self._y = SpectrumArray(as_stored(np.asanyarray(data)), wcs=wcs,
+                                unit=unit, uncertainty=uncertainty, mask=mask)
 
     @property
     def x(self):
@@ -117,31 +212,67 @@ class SpectrumData(object):
         self.x.mask = value
         self.y.mask = value
 
-    def add(self, operand, propagate_uncertainties=False):
+    @property
+    def dq(self):
+        """The `DQMask` of the data quality flags, or None.
+
+        Setting it masks the values it rejects.
+        """
+        return self._dq
+
+    @dq.setter
+    def dq(self, dq):
+        self._dq = dq
+        self.mask = dq.mask if dq is not None else None
+
+    def reject(self, reject):
+        """Mask the values flagged with the bits `reject`, per plane.
+
+        Parameters
+        ----------
+        reject: dict
+            Bits rejected, as ints or bit names, by flag plane; other
+            planes are left as they are. See `DQMask`.
+        """
+        if self.dq is None:
+            raise ValueError('The spectrum has no data quality flags.')
+        self.dq.reject = reject
+        self.mask = self.dq.mask
+
+    def add(self, operand, propagate_uncertainties=True):
         # new_y = self._y.add(operand.y, propagate_uncertainties)
         a, b = self._fit_shape(self, operand)
-        new_y = a.y.add(b.y, propagate_uncertainties)
+        new_y = a.y.add(b.y, propagate_uncertainties=None)
+        _propagate('add', a.y, b.y, new_y, propagate_uncertainties)
         return SpectrumData(self._x, new_y)
 
-    def subtract(self, operand, propagate_uncertainties=False):
+    def subtract(self, operand, propagate_uncertainties=True):
         # new_y = self._y.subtract(operand.y, propagate_uncertainties)
         a, b = self._fit_shape(self, operand)
-        new_y = a.y.subtract(b.y, propagate_uncertainties)
+        new_y = a.y.subtract(b.y, propagate_uncertainties=None)
+        _propagate('subtract', a.y, b.y, new_y, propagate_uncertainties)
         return SpectrumData(self._x, new_y)
 
-    def multiply(self, operand, propagate_uncertainties=False):
+    def multiply(self, operand, propagate_uncertainties=True):
         # new_y = self._y.multiply(operand.y, propagate_uncertainties)
         a, b = self._fit_shape(self, operand, fill=1)
-        new_y = a.y.multiply(b.y, propagate_uncertainties)
+        new_y = a.y.multiply(b.y, propagate_uncertainties=None)
+        _propagate('multiply', a.y, b.y, new_y, propagate_uncertainties)
         return SpectrumData(self._x, new_y)
 
-    def divide(self, operand, propagate_uncertainties=False):
+    def divide(self, operand, propagate_uncertainties=True):
         # new_y = self._y.divide(operand.y, propagate_uncertainties)
         a, b = self._fit_shape(self, operand, fill=1)
-        new_y = a.y.divide(b.y, propagate_uncertainties)
+        new_y = a.y.divide(b.y, propagate_uncertainties=None)
+        _propagate('divide', a.y, b.y, new_y, propagate_uncertainties)
         return SpectrumData(self._x, new_y)
 
     def _fit_shape(self, a, b, fill=0):
+        if a.x.shape[0] != b.x.shape[0]:
+            fitted = _fit_grids(a, b, fill)
+            if fitted is not None:
+                return fitted
+
         if a.x.shape[0] == b.x.shape[0]:
             fin_x = a
             fin_y = b
@@ -158,11 +289,13 @@ class SpectrumData(object):
             y_end = y_fill[new_x > b.x.data[-1]]
             new_y = np.concatenate((y_start, b.y.data, y_end))
 
-            yp = np.interp(a.x.data, new_x, new_y)
+            yp = keep_dtype(np.interp(a.x.data, new_x, new_y), b.y.data)
+            up = _interp_uncertainty(a.x.data, new_x, b.x.data, b.y)
 
             fin_x = a
             fin_y = SpectrumData(SpectrumArray(new_x, unit=b.x.unit, wcs=b.x.wcs),
-                                 SpectrumArray(yp, unit=b.y.unit, wcs=b.y.wcs))
+                                 SpectrumArray(yp, unit=b.y.unit, wcs=b.y.wcs,
+                                               uncertainty=up))
 
         else:
             # Make y the same shape
@@ -177,10 +310,12 @@ class SpectrumData(object):
             y_end = y_fill[new_x > a.x.data[-1]]
             new_y = np.concatenate((y_start, a.y.data, y_end))
 
-            yp = np.interp(b.x.data, new_x, new_y)
+            yp = keep_dtype(np.interp(b.x.data, new_x, new_y), a.y.data)
+            up = _interp_uncertainty(b.x.data, new_x, a.x.data, a.y)
 
             fin_x = SpectrumData(SpectrumArray(new_x, unit=a.x.unit, wcs=a.x.wcs),
-                                 SpectrumArray(yp, unit=a.y.unit, wcs=a.y.wcs))
+                                 SpectrumArray(yp, unit=a.y.unit, wcs=a.y.wcs,
+                                               uncertainty=up))
             fin_y = b
 
         return fin_x, fin_y
@@ -198,6 +333,307 @@ class SpectrumData(object):
         return self.divide(other)
 
 
+class SpectrumCollection(object):
+    """
+    Many spectra on one grid, held as 2D arrays of one row per spectrum.
+
+    The dispersion is shared by all rows, a 1D array of the length of a
+    row, or given per row, a 2D array of the shape of the flux. Unit
+    conversion and arithmetic run on all rows at once; indexing with an
+    integer gives one row as a `SpectrumData` of views on the arrays.
+
+    Parameters
+    ----------
+    x: array
+        Dispersion, of shape (npix,) or (n, npix).
+    y: array
+        Flux, of shape (n, npix).
+    x_unit, y_unit: str or Unit
+        Units of the dispersion and flux.
+    uncertainty: NDUncertainty
+        Uncertainty of the flux, of shape (n, npix).
+    mask: array
+        True for the values to ignore, of shape (n, npix).
+    names: [str,]
+        Name of each spectrum.
+    """
+    def __init__(self, x, y, x_unit=None, y_unit=None, uncertainty=None,
+                 mask=None, names=None):
+        x, y = np.asanyarray(x), np.asanyarray(y)
+        if y.ndim != 2:
+            raise ValueError('Flux must have one row per spectrum, not '
+                             'shape {}'.format(y.shape))
+        if x.shape not in (y.shape, y.shape[1:]):
+            raise ValueError('Dispersion of shape {} does not fit flux of '
+                             'shape {}'.format(x.shape, y.shape))
+        if uncertainty is not None and \
+                np.shape(uncertainty.array) != y.shape:
+            raise ValueError('Uncertainty does not have the shape of the '
+                             'flux {}'.format(y.shape))
+        if mask is not None:
+            mask = np.asanyarray(mask, dtype=bool)
+            if mask.shape != y.shape:
+                raise ValueError('Mask does not have the shape of the flux '
+                                 '{}'.format(y.shape))
+        if names is not None and len(names) != len(y):
+            raise ValueError('{} names for {} spectra'.format(len(names),
+                                                              len(y)))
+
+        if uncertainty is not None:
+            uncertainty.array = as_stored(np.asanyarray(uncertainty.array))
+        self._x = x
+        self._y = as_stored(y)
+        self.x_unit = None if x_unit is None else Unit(x_unit)
+        self.y_unit = None if y_unit is None else Unit(y_unit)
+        self.uncertainty = uncertainty
+        self.mask = mask
+        self.names = names
+        self._native = False
+
+    @classmethod
+    def from_spectra(cls, spectra, names=None):
+        """Stack spectra of the same length and units into a collection.
+
+        The dispersion is shared if all spectra have the same.
+        """
+        spectra = list(spectra)
+        if not spectra:
+            raise ValueError('No spectra to collect.')
+        if len(set(len(spectrum.y.data) for spectrum in spectra)) > 1:
+            raise ValueError('Spectra of different lengths cannot be '
+                             'collected.')
+        x = np.array([spectrum.x.data for spectrum in spectra])
+        y = np.array([spectrum.y.data for spectrum in spectra])
+        if (x == x[0]).all():
+            x = x[0]
+
+        uncertainty = None
+        variances = [spectrum.y.variance for spectrum in spectra]
+        if any(variance is not None for variance in variances):
+            uncertainty = variance_uncertainty(np.array(
+                [np.zeros(y.shape[1]) if variance is None else variance
+                 for variance in variances]))
+
+        first = spectra[0]
+        return cls(x, y, x_unit=first.x.unit, y_unit=first.y.unit,
+                   uncertainty=uncertainty, names=names)
+
+    @property
+    def x(self):
+        self._to_native()
+        return self._x
+
+    @property
+    def y(self):
+        self._to_native()
+        return self._y
+
+    @property
+    def shape(self):
+        return self._y.shape
+
+    @property
+    def shared_dispersion(self):
+        """Whether all rows share one dispersion array."""
+        return self._x.ndim == 1
+
+    @property
+    def variance(self):
+        """Variance of all the flux values, or None without uncertainty."""
+        if self.uncertainty is None:
+            return None
+        self._to_native()
+        return _as_variance(self.uncertainty)
+
+    def __len__(self):
+        return len(self._y)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def __getitem__(self, item):
+        """One row as `SpectrumData`, or a collection of some rows."""
+        if isinstance(item, (int, np.integer)):
+            return self._row(item)
+        return self._select(item)
+
+    def _row(self, row):
+        mask = None
+        if self.mask is not None and self.mask[row].any():
+            mask = self.mask[row]
+        uncertainty = None
+        if self.uncertainty is not None:
+            uncertainty = self.uncertainty.__class__(
+                self.uncertainty.array[row], copy=False)
+
+        x = self.x if self.shared_dispersion else self.x[row]
+        return SpectrumData(SpectrumArray(x, unit=self.x_unit, mask=mask),
+                            SpectrumArray(self.y[row], unit=self.y_unit,
+                                          uncertainty=uncertainty, mask=mask))
+
+    def _select(self, rows=slice(None), columns=slice(None), mask=None):
+        """Collection of the given rows and columns.
+
+        `mask` is or-ed with the selected part of the mask.
+        """
+        x = self.x[columns] if self.shared_dispersion else \
+            self.x[rows][:, columns]
+        uncertainty = None
+        if self.uncertainty is not None:
+            uncertainty = self.uncertainty.__class__(
+                self.uncertainty.array[rows][:, columns], copy=False)
+        if self.mask is not None:
+            selected = self.mask[rows][:, columns]
+            mask = selected if mask is None else selected | mask
+        names = self.names
+        if names is not None:
+            names = list(np.asarray(names, dtype=object)[rows])
+
+        return self.__class__(x, self.y[rows][:, columns],
+                              x_unit=self.x_unit, y_unit=self.y_unit,
+                              uncertainty=uncertainty, mask=mask,
+                              names=names)
+
+    def _to_native(self):
+        if self._native:
+            return
+        self._x = native_byteorder(self._x)
+        self._y = native_byteorder(self._y)
+        if self.uncertainty is not None:
+            array = self.uncertainty.array
+            if not array.dtype.isnative:
+                self.uncertainty.array = native_byteorder(array)
+        self._native = True
+
+    def convert_unit_to(self, x_unit=None, y_unit=None, equivalencies=[]):
+        """
+        Returns a new collection with the dispersion, the flux, or both
+        converted to new units, in one call over all rows.
+
+        Parameters
+        ----------
+        x_unit, y_unit : `astropy.units.UnitBase` instance or str
+            The units to convert to. None keeps the unit.
+        equivalencies : list of equivalence pairs, optional
+           A list of equivalence pairs to try if the units are not
+           directly convertible.  See :ref:`unit_equivalencies`.
+
+        Raises
+        ------
+        UnitsError
+            If units are inconsistent.
+        """
+        x, y, uncertainty = self.x, self.y, self.uncertainty
+        if x_unit is not None:
+            if self.x_unit is None:
+                raise ValueError("No unit specified on the dispersion")
+            x = self.x_unit.to(x_unit, x, equivalencies=equivalencies)
+        if y_unit is not None:
+            if self.y_unit is None:
+                raise ValueError("No unit specified on the flux")
+            y = self.y_unit.to(y_unit, y, equivalencies=equivalencies)
+            if uncertainty is not None:
+                uncertainty = _convert_uncertainty(uncertainty, self.y_unit,
+                                                   y_unit, equivalencies)
+
+        return self.__class__(
+            x, y, x_unit=self.x_unit if x_unit is None else x_unit,
+            y_unit=self.y_unit if y_unit is None else y_unit,
+            uncertainty=uncertainty,
+            mask=None if self.mask is None else self.mask.copy(),
+            names=self.names)
+
+    def add(self, operand, propagate_uncertainties=True):
+        return self._arithmetic('add', operand, propagate_uncertainties)
+
+    def subtract(self, operand, propagate_uncertainties=True):
+        return self._arithmetic('subtract', operand, propagate_uncertainties)
+
+    def multiply(self, operand, propagate_uncertainties=True):
+        return self._arithmetic('multiply', operand, propagate_uncertainties)
+
+    def divide(self, operand, propagate_uncertainties=True):
+        return self._arithmetic('divide', operand, propagate_uncertainties)
+
+    def _arithmetic(self, operation, operand, propagate_uncertainties):
+        """Apply `operation` to all rows.
+
+        `operand` is a collection of the same shape, a `SpectrumData`,
+        interpolated onto the dispersion of every row, or numbers that
+        broadcast against the flux, taken as exact.
+        """
+        fill = 0. if operation in ('add', 'subtract') else 1.
+        mask = self.mask
+        variance = None
+        if isinstance(operand, SpectrumCollection):
+            if operand.shape != self.shape:
+                raise ValueError('Collections of shapes {} and {} do not '
+                                 'match'.format(self.shape, operand.shape))
+            values, unit = operand.y, operand.y_unit
+            variance = operand.variance
+            if operand.mask is not None:
+                mask = operand.mask if mask is None else mask | operand.mask
+        elif isinstance(operand, SpectrumData):
+            x = np.broadcast_to(self.x, self.shape).ravel()
+            xp = np.asarray(operand.x.data, dtype=np.float64)
+            values = np.interp(x, xp, operand.y.data, left=fill,
+                               right=fill).reshape(self.shape)
+            unit = operand.y.unit
+            if operand.y.variance is not None:
+                variance = np.interp(x, xp, operand.y.variance, left=0.,
+                                     right=0.).reshape(self.shape)
+        else:
+            values = getattr(operand, 'value', operand)
+            unit = getattr(operand, 'unit', None)
+
+        y_unit = self.y_unit
+        if operation in ('add', 'subtract'):
+            if unit is not None and y_unit is not None and unit != y_unit:
+                scale = unit.to(y_unit)
+                values = values * scale
+                if variance is not None:
+                    variance = variance * scale ** 2
+        elif unit is not None:
+            y_unit = (y_unit or Unit('')) * unit if operation == 'multiply' \
+                else (y_unit or Unit('')) / unit
+
+        y = np.asarray(self.y, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = {'add': np.add, 'subtract': np.subtract,
+                      'multiply': np.multiply,
+                      'divide': np.divide}[operation](y, values)
+
+        # Computed in float64, stored as the flux is.
+        result = keep_dtype(result, self.y)
+        uncertainty = None
+        if propagate_uncertainties:
+            var_a = self.variance
+            if var_a is not None or variance is not None:
+                variance = keep_dtype(_propagated_variance(
+                    operation, y, var_a, values, variance), result)
+                uncertainty = variance_uncertainty(
+                    np.broadcast_to(variance, self.shape).copy())
+
+        return self.__class__(self.x, result, x_unit=self.x_unit,
+                              y_unit=y_unit, uncertainty=uncertainty,
+                              mask=mask, names=self.names)
+
+    def __add__(self, other):
+        return self.add(other)
+
+    def __sub__(self, other):
+        return self.subtract(other)
+
+    def __mul__(self, other):
+        return self.multiply(other)
+
+    def __div__(self, other):
+        return self.divide(other)
+
+    __truediv__ = __div__
+
+
 class ImageArray(NDSlicingMixin, NDArithmeticMixin, NDData):
     """
     Basic container for image data.
@@ -221,6 +657,7 @@ class CubeData(NDSlicingMixin, NDArithmeticMixin, NDData):
     """
     def __init__(self, *args, **kwargs):
         super(CubeData, self).__init__(*args, **kwargs)
+        self._data = as_stored(self._data)
         self._units = [Unit(''), Unit(''), Unit('')]
 
     @property
@@ -242,6 +679,212 @@ class CubeData(NDSlicingMixin, NDArithmeticMixin, NDData):
         return self.data.shape
 
 
+def _as_slice(item):
+    """`item` as a slice, if it selects one run of values in order."""
+    if isinstance(item, (int, np.integer, slice)) or item is Ellipsis:
+        return item
+    item = np.asarray(item)
+    if item.dtype == bool and item.ndim == 1:
+        index = np.flatnonzero(item)
+    elif item.dtype.kind in 'iu' and item.ndim == 1:
+        index = item
+        if len(index) and index[0] < 0:
+            return item
+    else:
+        return item
+    if len(index) and index[-1] - index[0] == len(index) - 1 and \
+            (len(index) < 2 or (np.diff(index) == 1).all()):
+        return slice(int(index[0]), int(index[-1]) + 1)
+    return item
+
+
+def _scale_factor(from_unit, to_unit, equivalencies):
+    """Factor of a unit conversion that is a scaling, else None."""
+    try:
+        factor, double = from_unit.to(to_unit, [1., 2.],
+                                      equivalencies=equivalencies)
+    except Exception:
+        return None
+    if factor > 0 and np.isclose(double, 2. * factor, rtol=1e-12, atol=0):
+        return float(factor)
+    return None
+
+
+def native_byteorder(array, chunk=BYTEORDER_CHUNK):
+    """Return `array` in native byte order.
+
+    Arrays already native are returned as they are. Others are copied
+    `chunk` rows at a time, so that a memory mapped array is paged in
+    progressively and no full size temporary is made.
+    """
+    array = np.asanyarray(array)
+    if array.dtype.isnative:
+        return array
+
+    result = np.empty(array.shape, dtype=array.dtype.newbyteorder('='))
+    if result.ndim == 0:
+        result[()] = array
+        return result
+    for start in range(0, len(array), chunk):
+        result[start:start + chunk] = array[start:start + chunk]
+    return result
+
+
+def variance_uncertainty(variance):
+    """Uncertainty object holding `variance`.
+
+    Falls back to a standard deviation on astropy versions without
+    `VarianceUncertainty`.
+    """
+    if VarianceUncertainty is not None:
+        return VarianceUncertainty(variance, copy=False)
+    return StdDevUncertainty(np.sqrt(variance))
+
+
+def inverse_variance_uncertainty(ivar):
+    """Uncertainty object for the inverse variance `ivar`.
+
+    Where astropy supports it, `ivar` is kept as is, without a copy.
+    Otherwise, zero inverse variance becomes an infinite uncertainty.
+    """
+    if InverseVariance is not None:
+        return InverseVariance(ivar, copy=False)
+    with np.errstate(divide='ignore'):
+        return variance_uncertainty(1. / np.asarray(ivar, dtype=np.float64))
+
+
+def _as_variance(uncertainty):
+    """Variance of all values of an uncertainty object."""
+    array = np.asarray(uncertainty.array, dtype=np.float64)
+    kind = uncertainty.uncertainty_type
+    if kind == 'std':
+        return array ** 2
+    if kind == 'var':
+        return array
+    if kind == 'ivar':
+        with np.errstate(divide='ignore'):
+            return 1. / array
+    raise TypeError('Unsupported uncertainty type {}'.format(kind))
+
+
+def _convert_uncertainty(uncertainty, from_unit, to_unit, equivalencies):
+    """Convert an uncertainty object, keeping its type."""
+    kind = uncertainty.uncertainty_type
+    array = np.asarray(uncertainty.array)
+    if kind == 'var':
+        array = np.sqrt(array)
+    elif kind == 'ivar':
+        with np.errstate(divide='ignore'):
+            array = 1. / np.sqrt(array)
+
+    std = keep_dtype(from_unit.to(to_unit, array, equivalencies=equivalencies),
+                     array)
+
+    if kind == 'var':
+        return uncertainty.__class__(std ** 2)
+    if kind == 'ivar':
+        with np.errstate(divide='ignore'):
+            return uncertainty.__class__(1. / std ** 2)
+    # should work for any other uncertainty class
+    return uncertainty.__class__(std)
+
+
+def _propagate(operation, a, b, result, propagate_uncertainties=True):
+    """Set the uncertainty of `result` = `a` `operation` `b`.
+
+    First order propagation of uncorrelated errors, vectorized over the
+    unmasked values. An operand without uncertainty counts as exact.
+    """
+    # The values of `result` are already the unmasked ones.
+    result.mask = None
+
+    var_a, var_b = a.variance, b.variance
+    if not propagate_uncertainties or (var_a is None and var_b is None):
+        return
+
+    variance = _propagated_variance(operation, a.data, var_a, b.data, var_b)
+    variance = keep_dtype(variance, result.data)
+    result.uncertainty = variance_uncertainty(
+        np.broadcast_to(variance, np.shape(result.data)).copy())
+
+
+def _propagated_variance(operation, value_a, var_a, value_b, var_b):
+    """Variance of `value_a` `operation` `value_b`, for uncorrelated errors.
+
+    A variance of None counts as exact values.
+    """
+    var_a = 0. if var_a is None else var_a
+    var_b = 0. if var_b is None else var_b
+    if operation in ('add', 'subtract'):
+        return var_a + var_b
+
+    value_a = np.asarray(value_a, dtype=np.float64)
+    value_b = np.asarray(value_b, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if operation == 'multiply':
+            return var_a * value_b ** 2 + var_b * value_a ** 2
+        return (var_a + var_b * (value_a / value_b) ** 2) / value_b ** 2
+
+
+def _interp_uncertainty(x, xp, x_source, y_source):
+    """Uncertainty of `y_source` resampled from `xp` onto `x`.
+
+    Interpolating the variance linearly bounds the variance of the
+    interpolated values from above. Fill values outside of `x_source`
+    are exact.
+    """
+    variance = y_source.variance
+    if variance is None:
+        return None
+
+    filled = np.zeros(len(xp))
+    inside = (xp >= x_source[0]) & (xp <= x_source[-1])
+    filled[inside] = variance
+    return variance_uncertainty(np.interp(x, xp, filled))
+
+
+def _fit_grids(a, b, fill):
+    """`SpectrumData._fit_shape` of spectra on parametric grids.
+
+    The shorter spectrum is put on the grid of the longer one by index
+    when the grids are aligned. Returns None unless both dispersions are
+    unmasked grids of the same unit.
+    """
+    grid_a, grid_b = a.x.grid, b.x.grid
+    if grid_a is None or grid_b is None or a.x.unit != b.x.unit or \
+            a.x.mask is not None or b.x.mask is not None:
+        return None
+    if len(grid_a) > len(grid_b):
+        return a, _on_grid(b, a, fill)
+    return _on_grid(a, b, fill), b
+
+
+def _on_grid(source, target, fill):
+    """`source` resampled on the grid of `target`, `fill` outside of it."""
+    grid, source_grid = target.x.grid, source.x.grid
+    y = keep_dtype(grid.resample(source_grid, source.y.data, fill),
+                   source.y.data)
+    variance = source.y.variance
+    uncertainty = None
+    if variance is not None:
+        uncertainty = variance_uncertainty(keep_dtype(
+            grid.resample(source_grid, variance, 0.), y))
+    return SpectrumData(target.x,
+                        SpectrumArray(y, unit=source.y.unit, wcs=source.y.wcs,
+                                      uncertainty=uncertainty))
+
+
+def _check_wcs(wcs):
+    """Raise TypeError if `wcs` is neither None nor a `WCS`."""
+    if wcs is None:
+        return
+
+    # astropy.wcs is only needed, and imported, once a WCS is given.
+    from astropy.wcs import WCS
+    if not isinstance(wcs, WCS):
+        raise TypeError("wcs object is not of type WCS.")
+
+
 if __name__ == '__main__':
     arr = np.random.normal(size=10)
     sdarr = SpectrumData(arr)
@@ -0,0 +1,254 @@
+"""Parametric dispersion grids
+
+Most dispersion axes are linear or log-linear, so that they are given by
+a start, a step and a number of points. A `Grid` stores just these, and
+makes the values when asked for them. Finding the pixels of a range is
+index arithmetic, and slicing gives another grid.
+
+A grid has the shape, dtype, indexing and ``__array__`` of a 1D array,
+so it can be handed to `SpectrumArray` and numpy functions as is.
+"""
+import numpy as np
+
+# Scales of a grid: the values are start + step * i on a linear scale,
+# and 10 ** (start + step * i) on a log scale.
+SCALES = ('linear', 'log')
+
+# Relative tolerance, on the step, of `Grid.from_values`.
+GRID_RTOL = 1e-9
+
+
+class Grid(object):
+    """Values on a linear or log-linear grid.
+
+    Parameters
+    ----------
+    start: float
+        First value, or its log10 on a log scale.
+    step: float
+        Step between values, or between their log10 on a log scale.
+    n: int
+        Number of values.
+    scale: str
+        'linear' or 'log'.
+    """
+    dtype = np.dtype(np.float64)
+    ndim = 1
+
+    def __init__(self, start, step, n, scale='linear'):
+        if scale not in SCALES:
+            raise ValueError('Unknown grid scale "{}"'.format(scale))
+        if n < 0:
+            raise ValueError('Negative number of values {}'.format(n))
+        self.start = float(start)
+        self.step = float(step)
+        self.n = int(n)
+        self.scale = scale
+
+    @classmethod
+    def from_values(cls, values, rtol=GRID_RTOL):
+        """The grid of `values`, or None if they are on none.
+
+        Linear grids are tried first, then log-linear ones.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim != 1 or len(values) < 2:
+            return None
+
+        for scale in SCALES:
+            if scale == 'log':
+                if not (values > 0).all():
+                    return None
+                coordinates = np.log10(values)
+            else:
+                coordinates = values
+            start = coordinates[0]
+            step = (coordinates[-1] - start) / (len(values) - 1)
+            if step == 0:
+                return None
+            expected = start + step * np.arange(len(values))
+            if np.all(np.abs(coordinates - expected) <= rtol * abs(step)):
+                return cls(start, step, len(values), scale)
+        return None
+
+    @classmethod
+    def from_wcs(cls, wcs, n, rtol=GRID_RTOL):
+        """The grid of the first axis of a 1D WCS, or None if not linear.
+
+        Pixels are numbered as `read_image` has always done, from
+        0 in a 1-based WCS.
+        """
+        ends = wcs.all_pix2world([0., 1., max(n - 1., 1.)], 1)[0]
+        grid = cls(ends[0], ends[1] - ends[0], n)
+        if n > 1 and abs(grid[n - 1] - ends[2]) > rtol * abs(grid.step) * n:
+            return None
+        return grid
+
+    # --- array interface
+    @property
+    def shape(self):
+        return (self.n,)
+
+    @property
+    def size(self):
+        return self.n
+
+    def __len__(self):
+        return self.n
+
+    def __array__(self, dtype=None, copy=None):
+        values = self.values
+        return values if dtype is None else values.astype(dtype)
+
+    @property
+    def values(self):
+        """The values, as a new array."""
+        coordinates = self.start + self.step * np.arange(self.n,
+                                                         dtype=np.float64)
+        if self.scale == 'log':
+            return np.power(10., coordinates)
+        return coordinates
+
+    def __getitem__(self, item):
+        """A value for an integer, a grid for a slice, else an array."""
+        if isinstance(item, (int, np.integer)):
+            if item < 0:
+                item += self.n
+            if not 0 <= item < self.n:
+                raise IndexError('Index {} out of a grid of {} values'.format(
+                    item, self.n))
+            return self._value(self.start + self.step * item)
+        if isinstance(item, slice):
+            start, stop, stride = item.indices(self.n)
+            n = len(range(start, stop, stride))
+            return self.__class__(self.start + self.step * start,
+                                  self.step * stride, n, self.scale)
+        return self.values[item]
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __eq__(self, other):
+        return (isinstance(other, Grid) and self.n == other.n and
+                self.scale == other.scale and
+                _close(self.start, other.start, self.step) and
+                _close(self.step, other.step, self.step / max(self.n, 1)))
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}(start={!r}, step={!r}, n={!r}, scale={!r})'.format(
+            self.__class__.__name__, self.start, self.step, self.n,
+            self.scale)
+
+    # --- grid functions
+    def resize(self, n):
+        """The grid with the same start and step and `n` values."""
+        return self.__class__(self.start, self.step, n, self.scale)
+
+    def scaled(self, factor):
+        """The grid of the values times `factor`, as for a unit change."""
+        if self.scale == 'log':
+            if factor <= 0:
+                raise ValueError('Log grids can only be scaled by a '
+                                 'positive factor.')
+            return self.__class__(self.start + np.log10(factor), self.step,
+                                  self.n, self.scale)
+        return self.__class__(self.start * factor, self.step * factor, self.n,
+                              self.scale)
+
+    def searchsorted(self, values, side='left'):
+        """`np.searchsorted` of `values` in the grid values.
+
+        Computed from the grid parameters, without the values.
+        """
+        if self.step < 0:
+            return np.searchsorted(self.values, values, side=side)
+
+        position = (self._coordinate(values) - self.start) / self.step
+        # Values on the grid, to rounding, are found where
+        # np.searchsorted would.
+        nearest = np.round(position)
+        on_grid = np.abs(position - nearest) <= 1e-9 * np.maximum(
+            1., np.abs(nearest))
+        if side == 'left':
+            index = np.where(on_grid, nearest, np.floor(position) + 1)
+        else:
+            index = np.where(on_grid, nearest + 1, np.floor(position) + 1)
+        return np.clip(index, 0, self.n).astype(np.intp)
+
+    def range_slice(self, low, high):
+        """Slice of the values with low <= value < high."""
+        start, stop = self.searchsorted([low, high], side='left')
+        return slice(int(start), int(max(start, stop)))
+
+    def offset(self, other):
+        """Index in this grid of the first value of `other`.
+
+        None unless `other` has the same step and scale and its values
+        are on this grid.
+        """
+        if other.scale != self.scale or \
+                not _close(other.step, self.step, self.step / max(self.n, 1)):
+            return None
+        position = (other.start - self.start) / self.step
+        index = int(np.round(position))
+        if abs(position - index) > 1e-6:
+            return None
+        return index
+
+    def resample(self, other, values, fill=0.):
+        """Values given on the grid `other`, on this grid.
+
+        When `other` is aligned with this grid, values are copied by
+        index, with `fill` where `other` has none; otherwise they are
+        linearly interpolated.
+        """
+        values = np.asarray(values)
+        offset = self.offset(other)
+        if offset is None:
+            return np.interp(self.values, other.values, values, left=fill,
+                             right=fill)
+
+        result = np.full(self.n, fill, dtype=np.result_type(values, fill))
+        start, stop = max(offset, 0), min(offset + other.n, self.n)
+        if stop > start:
+            result[start:stop] = values[start - offset:stop - offset]
+        return result
+
+    def to_dict(self):
+        return {'start': self.start, 'step': self.step, 'n': self.n,
+                'scale': self.scale}
+
+    # --- protected functions
+    def _value(self, coordinate):
+        return 10. ** coordinate if self.scale == 'log' else coordinate
+
+    def _coordinate(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if self.scale == 'log':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.log10(values)
+        return values
+
+
+def grid_of(values):
+    """The `Grid` behind `values`, a grid or a `SpectrumArray`, or None."""
+    if isinstance(values, Grid):
+        return values
+    return getattr(values, 'grid', None)
+
+
+def searchsorted(values, v, side='left'):
+    """`np.searchsorted`, by index arithmetic when `values` has a grid."""
+    grid = grid_of(values)
+    if grid is not None and getattr(values, 'mask', None) is None:
+        return grid.searchsorted(v, side=side)
+    return np.searchsorted(getattr(values, 'data', values), v, side=side)
+
+
+def _close(a, b, tolerance):
+    return abs(a - b) <= 1e-9 * abs(tolerance) + 1e-12 * abs(a)
@@ -0,0 +1,215 @@
+"""Data quality bit flags
+
+A `DQMask` keeps the integer data quality flags of a spectrum as they
+are read, one array per flag plane (DQ, BITMASK, ORMASK, ...), without
+copies. Which bits reject a value is a selection, per plane, that can
+be changed at any time; the boolean mask of a selection is derived with
+vectorized bitwise operations and cached, so that going back to a
+previous selection is free.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+# Number of boolean masks kept per DQMask.
+MASK_CACHE_SIZE = 8
+
+# Rejects every bit of a plane.
+ALL_BITS = -1
+
+
+class DQMask(object):
+    """Integer data quality flags and the bits they are rejected on.
+
+    Parameters
+    ----------
+    planes: dict
+        Flag arrays, all of the same shape, by plane name. Boolean
+        planes, such as zero weight values, have the single bit 1.
+    reject: dict
+        Bits rejected, by plane name. Planes not given reject all their
+        bits; give 0 for an informational plane.
+    bit_names: dict
+        Names of the bits of each plane, as {plane: {name: bit value}},
+        so that selections can name bits.
+    """
+    def __init__(self, planes, reject=None, bit_names=None):
+        self._planes = OrderedDict(
+            (name, _as_flags(flags)) for name, flags in planes.items())
+        shapes = set(flags.shape for flags in self._planes.values())
+        if len(shapes) > 1:
+            raise ValueError('Flag planes of different shapes {}'.format(
+                sorted(shapes)))
+        self.bit_names = dict(bit_names or {})
+        self._cache = OrderedDict()
+        self._reject = dict((name, ALL_BITS) for name in self._planes)
+        self.reject = reject or {}
+
+    @property
+    def planes(self):
+        """The flag arrays, by plane name."""
+        return self._planes
+
+    @property
+    def shape(self):
+        for flags in self._planes.values():
+            return flags.shape
+        return (0,)
+
+    @property
+    def reject(self):
+        """Bits rejected, by plane name.
+
+        Setting it changes the planes given, and leaves the others as
+        they are.
+        """
+        return dict(self._reject)
+
+    @reject.setter
+    def reject(self, reject):
+        selection = dict(self._reject)
+        for name, bits in reject.items():
+            if name not in self._planes:
+                raise KeyError('No flag plane "{}"'.format(name))
+            selection[name] = self.bits(name, bits)
+        self._reject = selection
+
+    @property
+    def mask(self):
+        """Boolean mask of the rejected values, or None if there are none."""
+        return self.select(self._reject)
+
+    def bits(self, plane, bits):
+        """Bit value of `bits`: an int, a bit name, or a sequence of them."""
+        if bits is None:
+            return 0
+        if isinstance(bits, (int, np.integer)):
+            return int(bits)
+        if isinstance(bits, str):
+            bits = [bits]
+        names = self.bit_names.get(plane, {})
+        value = 0
+        for bit in bits:
+            if isinstance(bit, (int, np.integer)):
+                value |= int(bit)
+            elif bit in names:
+                value |= names[bit]
+            else:
+                raise KeyError('No bit "{}" in flag plane "{}"'.format(bit,
+                                                                     plane))
+        return value
+
+    def select(self, reject):
+        """Boolean mask of the values rejected by `reject`, cached.
+
+        Parameters
+        ----------
+        reject: dict
+            Bits rejected, by plane name; planes not given reject
+            nothing.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            None if no value is rejected.
+        """
+        key = tuple(sorted((name, self.bits(name, bits))
+                           for name, bits in reject.items()
+                           if self.bits(name, bits)))
+        if key in self._cache:
+            self._cache[key] = self._cache.pop(key)
+            return self._cache[key]
+
+        mask = None
+        for name, bits in key:
+            flags = self._planes[name]
+            if flags.dtype == bool:
+                rejected = flags if bits & 1 else None
+            elif bits == ALL_BITS:
+                rejected = flags != 0
+            else:
+                rejected = _bitwise_and(flags, bits) != 0
+            if rejected is None:
+                continue
+            mask = rejected if mask is None else np.logical_or(mask, rejected)
+        if mask is not None and not mask.any():
+            mask = None
+
+        self._cache[key] = mask
+        while len(self._cache) > MASK_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return mask
+
+    def flagged(self, plane, bits=ALL_BITS):
+        """Boolean array of the values with any of `bits` set in `plane`."""
+        flags = self._planes[plane]
+        if flags.dtype == bool:
+            return flags if self.bits(plane, bits) & 1 else \
+                np.zeros(flags.shape, dtype=bool)
+        return _bitwise_and(flags, self.bits(plane, bits)) != 0
+
+    def combine(self, other):
+        """Flags of both masks: planes of the same name are or-ed.
+
+        The rejection of this mask applies, then that of `other` for
+        the planes only it has.
+        """
+        planes = OrderedDict(self._planes)
+        for name, flags in other.planes.items():
+            planes[name] = np.bitwise_or(planes[name], flags) \
+                if name in planes else flags
+        reject = other.reject
+        reject.update(self._reject)
+        bit_names = dict(other.bit_names)
+        bit_names.update(self.bit_names)
+        return self.__class__(planes, reject, bit_names)
+
+    def __getitem__(self, item):
+        """Flags of some values, as views where `item` allows."""
+        return self.__class__(
+            OrderedDict((name, flags[item])
+                        for name, flags in self._planes.items()),
+            self._reject, self.bit_names)
+
+    @classmethod
+    def concatenate(cls, masks):
+        """Flags of masks one after the other.
+
+        Planes missing from some masks are taken as unflagged there.
+        """
+        names = []
+        for dq in masks:
+            names.extend(name for name in dq.planes if name not in names)
+        planes = OrderedDict()
+        for name in names:
+            dtype = np.result_type(*[dq.planes[name] for dq in masks
+                                     if name in dq.planes])
+            planes[name] = np.concatenate(
+                [dq.planes[name] if name in dq.planes
+                 else np.zeros(dq.shape, dtype=dtype) for dq in masks])
+
+        reject, bit_names = {}, {}
+        for dq in reversed(masks):
+            reject.update(dq.reject)
+            bit_names.update(dq.bit_names)
+        return cls(planes, reject, bit_names)
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, ', '.join(
+            '{}: reject {:#x}'.format(name, bits & 0xffffffff)
+            for name, bits in self._reject.items()))
+
+
+def _as_flags(flags):
+    """Integer or boolean flags, as they are if they already are."""
+    flags = np.asanyarray(flags)
+    if flags.dtype.kind == 'f':
+        # Flags read from text columns.
+        return flags.astype(np.int64)
+    return flags
+
+
+def _bitwise_and(flags, bits):
+    # Bits as the integer type of the flags, two's complement for
+    # ALL_BITS, so that numpy does not upcast or overflow.
+    return np.bitwise_and(flags, np.array(bits).astype(flags.dtype))
@@ -0,0 +1,114 @@
+"""Ring buffer of streamed spectra
+
+A `SpectrumRing` keeps the last `capacity` spectra of a stream, all on
+one dispersion, in one preallocated array; new spectra overwrite the
+oldest. Spectra can also arrive in parts, readouts of some pixels of
+the current spectrum. Producers, typically a stream source thread, and
+readers, the plot updates, can run concurrently.
+"""
+import threading
+
+import numpy as np
+
+from .data_objects import SpectrumData, SpectrumCollection
+from .storage import as_stored
+
+
+class SpectrumRing(object):
+    """The last spectra of a stream.
+
+    Parameters
+    ----------
+    x: numpy.ndarray or Grid
+        Dispersion of all the spectra.
+    capacity: int
+        Number of spectra kept.
+    x_unit, y_unit: astropy.units.Unit or str
+        Units of the dispersion and flux values.
+
+    Attributes
+    ----------
+    version: int
+        Number of writes so far; readers compare it to know if there is
+        anything new.
+    """
+    def __init__(self, x, capacity=100, x_unit=None, y_unit=None):
+        if capacity < 1:
+            raise ValueError('A ring holds at least one spectrum.')
+        self.x = x
+        self.x_unit = x_unit
+        self.y_unit = y_unit
+        self.version = 0
+        # Pixels not read yet are NaN. The flux is in the storage
+        # precision.
+        dtype = as_stored(np.empty(0)).dtype
+        self._y = np.full((capacity, len(x)), np.nan, dtype=dtype)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return self._y.shape[0]
+
+    @property
+    def count(self):
+        """Number of spectra started since the ring was made."""
+        return self._count
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def append(self, values):
+        """Start a new spectrum, with the values of its first pixels."""
+        values = np.asarray(values)
+        self._check(values, 0)
+        with self._lock:
+            row = self._y[self._count % self.capacity]
+            row[:len(values)] = values
+            row[len(values):] = np.nan
+            self._count += 1
+            self.version += 1
+
+    def update(self, values, start=0):
+        """Write a readout of the current spectrum, from pixel `start`.
+
+        A new spectrum is started if there is none.
+        """
+        values = np.asarray(values)
+        self._check(values, start)
+        with self._lock:
+            if self._count == 0:
+                self._y[0] = np.nan
+                self._count = 1
+            row = self._y[(self._count - 1) % self.capacity]
+            row[start:start + len(values)] = values
+            self.version += 1
+
+    def latest(self):
+        """The current spectrum, as a SpectrumData of its own values.
+
+        All NaN until a spectrum is received.
+        """
+        with self._lock:
+            y = self._y[max(self._count - 1, 0) % self.capacity].copy()
+        spectrum = SpectrumData()
+        spectrum.set_x(self.x, unit=self.x_unit)
+        spectrum.set_y(y, unit=self.y_unit)
+        return spectrum
+
+    def collection(self):
+        """The spectra kept, oldest first, as a SpectrumCollection."""
+        with self._lock:
+            n = len(self)
+            start = self._count % self.capacity if n == self.capacity else 0
+            y = np.concatenate([self._y[start:n], self._y[:start]])
+        x = getattr(self.x, 'values', self.x)
+        return SpectrumCollection(x, y, x_unit=self.x_unit,
+                                  y_unit=self.y_unit)
+
+    def _check(self, values, start):
+        if values.ndim != 1 or start < 0 or \
+                start + len(values) > self._y.shape[1]:
+            raise ValueError('{} values from pixel {} do not fit spectra of '
+                             '{} pixels'.format(values.size, start,
+                                                self._y.shape[1]))
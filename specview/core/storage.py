@@ -0,0 +1,149 @@
+"""Storage precision of data values
+
+Flux values are stored in the dtype they are read with ('native'), or,
+to halve the memory of large spectra and cubes, as float32 ('float32').
+Dispersion values are not affected. Computations that need the
+precision, such as fits and cumulative sums, upcast to float64 locally;
+their results are stored back in the storage dtype.
+
+The precision applies to the data created after it is set, and is saved
+with sessions.
+"""
+import numpy as np
+
+STORAGE_PRECISIONS = ('native', 'float32')
+
+_policy = {'precision': 'native'}
+
+
+def storage_precision():
+    """The current storage precision, one of `STORAGE_PRECISIONS`."""
+    return _policy['precision']
+
+
+def set_storage_precision(precision):
+    """Set the storage precision of the flux values created from now on."""
+    if precision not in STORAGE_PRECISIONS:
+        raise ValueError('Unknown storage precision "{}"; expected one of '
+                         '{}'.format(precision, STORAGE_PRECISIONS))
+    _policy['precision'] = precision
+
+
+def as_stored(values):
+    """Flux `values` in the storage dtype; a view when already in it."""
+    if values is None or not hasattr(values, 'dtype'):
+        return values
+    if storage_precision() == 'float32' and values.dtype.kind == 'f' and \
+            values.dtype.itemsize > 4:
+        return values.astype(np.float32)
+    return values
+
+
+def keep_dtype(values, like):
+    """`values` computed from `like`, back in the floating dtype of `like`.
+
+    Results in float64 of float32 data are stored as float32 again.
+    """
+    dtype = getattr(like, 'dtype', None)
+    if dtype is None or dtype.kind != 'f':
+        return values
+    values = np.asanyarray(values)
+    if values.dtype.kind == 'f' and values.dtype.itemsize > dtype.itemsize:
+        return values.astype(dtype)
+    return values
+
+
+def memory_summary(named_spectra):
+    """Memory held by spectra, per spectrum and array.
+
+    Parameters
+    ----------
+    named_spectra: [(str, SpectrumData),]
+        The spectra, with their names.
+
+    Returns
+    -------
+    [dict,]
+        Per spectrum: its 'name', and per array ('x', 'y', 'uncertainty'
+        and 'mask') its 'dtype' and 'nbytes', the bytes in memory, and
+        'mapped', the bytes of memory mapped files. Grids take no
+        bytes.
+    """
+    summary = []
+    for name, spectrum in named_spectra:
+        entry = {'name': name}
+        for key, array in _arrays(spectrum):
+            entry[key] = _array_summary(array)
+        summary.append(entry)
+    return summary
+
+
+def format_memory_summary(summary):
+    """`memory_summary` as a table, with the storage precision and totals."""
+    keys = ('x', 'y', 'uncertainty', 'mask')
+    lines = ['Storage precision: {}'.format(storage_precision()),
+             '{:<30} {:>12} {:>12} {:>12} {:>12}  {}'.format(
+                 'Name', 'x', 'y', 'uncertainty', 'mask', 'flux dtype')]
+    totals = {'nbytes': 0, 'mapped': 0}
+    for entry in summary:
+        cells = []
+        for key in keys:
+            array = entry.get(key)
+            if array is None:
+                cells.append('-')
+                continue
+            totals['nbytes'] += array['nbytes']
+            totals['mapped'] += array['mapped']
+            cells.append(_size(array['nbytes']) +
+                         ('+' + _size(array['mapped']) + 'm'
+                          if array['mapped'] else ''))
+        flux = entry.get('y')
+        lines.append('{:<30} {:>12} {:>12} {:>12} {:>12}  {}'.format(
+            entry['name'][:30], *(cells + [flux['dtype'] if flux else '-'])))
+    lines.append('Total: {} in memory, {} memory mapped'.format(
+        _size(totals['nbytes']), _size(totals['mapped'])))
+    return '\n'.join(lines)
+
+
+def _arrays(spectrum):
+    """(key, array) of the arrays of a spectrum; grids as they are."""
+    for key, spectrum_array in (('x', spectrum.x), ('y', spectrum.y)):
+        # All values, including the masked ones.
+        data = spectrum_array._data
+        yield key, data
+        if key == 'y':
+            uncertainty = spectrum_array.uncertainty
+            yield 'uncertainty', None if uncertainty is None else \
+                uncertainty.array
+            yield 'mask', spectrum_array.mask
+
+
+def _array_summary(array):
+    if array is None:
+        return None
+    if not isinstance(array, np.ndarray):
+        # A grid, or another parametric array.
+        return {'dtype': str(array.dtype), 'nbytes': 0, 'mapped': 0}
+    nbytes = array.nbytes
+    if _is_mapped(array):
+        return {'dtype': str(array.dtype), 'nbytes': 0, 'mapped': nbytes}
+    return {'dtype': str(array.dtype), 'nbytes': nbytes, 'mapped': 0}
+
+
+def _is_mapped(array):
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, 'base', None)
+        if not isinstance(array, np.ndarray):
+            # The base of a memory map opened by numpy is an mmap.
+            return array is not None and type(array).__name__ == 'mmap'
+    return False
+
+
+def _size(nbytes):
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if nbytes < 1024 or unit == 'GB':
+            return '{:.0f} {}'.format(nbytes, unit) if unit == 'B' else \
+                '{:.1f} {}'.format(nbytes, unit)
+        nbytes /= 1024.
@@ -9,11 +9,15 @@ _plugin_paths = [expanduser('~/.specview')]
 
 # TODO: get rid of nasty try/excepts
 try:
-    from .ui.controller import Controller
-    from .ui.ipython.kernel import ipython_kernel_start
+    from .tools.profiling import startup_profile
 except:
-    from ui.controller import Controller
-    from ui.ipython.kernel import ipython_kernel_start
+    from tools.profiling import startup_profile
+
+with startup_profile.phase('import controller'):
+    try:
+        from .ui.controller import Controller
+    except:
+        from ui.controller import Controller
 
 
 class SView(Controller):
@@ -41,15 +45,19 @@ class SView(Controller):
 
         # Start the Qt application, if necessary.
         if self.__class__.qt_app is None:
-            from specview.ui.qt.pyqt_nonblock import pyqtapplication
-            self.__class__.qt_app = pyqtapplication(argv)
-
-        # Start up the GUI.
-        self._kernel = ipython_kernel_start()
-        super(SView, self).__init__()
-        self.viewer.show()
+            with startup_profile.phase('qt application'):
+                from specview.ui.qt.pyqt_nonblock import pyqtapplication
+                self.__class__.qt_app = pyqtapplication(argv)
+
+        # Start up the GUI. The IPython kernel is only started when the
+        # console is first opened.
+        with startup_profile.phase('controller'):
+            super(SView, self).__init__()
+        with startup_profile.phase('show main window'):
+            self.viewer.show()
         if filename is not None:
-            self.open_file(filename)
+            with startup_profile.phase('open file'):
+                self.open_file(filename)
 
 
 def main():
@@ -57,6 +65,10 @@ def main():
 
     args = _define_arguments(sys.argv[1:])
     app_gui = SView(filename=args.datafile)
+    if args.profile_startup:
+        # Report once the event loop has drawn the main window.
+        from specview.external.qt import QtCore
+        QtCore.QTimer.singleShot(0, startup_profile.report)
     sys.exit(app_gui.qt_app.exec_())
 
 
@@ -65,6 +77,8 @@ def _define_arguments(argv=None):
     parser = argparse.ArgumentParser('Interactive spectral exploration.')
     parser.add_argument('datafile', nargs='?',
                         help='Initial file to display.')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Report the time spent in each startup phase.')
 
     return parser.parse_args(argv)
 
@@ -1,8 +1,12 @@
 """Data operations"""
+import numpy as np
+
 from specview.tools import decorate
+from specview.core.data_objects import SpectrumData
 
 # Stats functions
 from specview.analysis.statistics import stats, eq_width, extract
+from specview.analysis.lines import measure_lines, measure_lines_many
 
 
 # Basic math
@@ -25,3 +29,15 @@ def multiply(a, b):
 @decorate.display_result
 def divide(a, b):
     return a / b
+
+
+# Smoothing
+@decorate.display_result
+@decorate.cpu_bound
+def smooth(a, width=5):
+    """Boxcar smooth, run in the background"""
+    kernel = np.ones(width) / float(width)
+    result = SpectrumData(x=a.x)
+    result.set_y(np.convolve(a.y.data, kernel, mode='same'),
+                 wcs=a.y.wcs, unit=a.y.unit)
+    return result
@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pytest
+
+from specview.tools import ascii, cache
+
+ROWS = '\n'.join('{} {} {}'.format(4000 + i, i * 0.5, 0.1)
+                 for i in range(100)) + '\n'
+
+
+@pytest.fixture
+def write(tmpdir):
+    def write(text, name='spectrum.txt'):
+        path = str(tmpdir.join(name))
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+    return write
+
+
+@pytest.fixture
+def cache_dir(tmpdir, monkeypatch):
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmpdir.join('cache')))
+
+
+def check_rows(table, n=100):
+    assert table.columns.shape == (3, n)
+    np.testing.assert_array_equal(table.columns[0], 4000 + np.arange(n))
+    np.testing.assert_array_equal(table.columns[1], np.arange(n) * 0.5)
+    np.testing.assert_array_equal(table.columns[2], 0.1)
+
+
+@pytest.mark.parametrize('header, names, units', [
+    ('', ['col1', 'col2', 'col3'], [None, None, None]),
+    ('# wavelength [Angstrom]  flux (erg/s/cm2/Angstrom)  error\n',
+     ['wavelength', 'flux', 'error'],
+     ['Angstrom', 'erg/s/cm2/Angstrom', None]),
+    ('wavelength,flux,error\n', ['wavelength', 'flux', 'error'],
+     [None, None, None]),
+    ('# wave flux err\n# units: Angstrom Jy Jy\n', ['wave', 'flux', 'err'],
+     ['Angstrom', 'Jy', 'Jy']),
+    ('# wave flux err\n# flux_unit = Jy\n# err_unit: mJy\n',
+     ['wave', 'flux', 'err'], [None, 'Jy', 'mJy']),
+    ('# wavelength_unit = nm\n# y_unit = Jy\n', ['col1', 'col2', 'col3'],
+     ['nm', 'Jy', None]),
+    ('% An old header\n! wave flux err\n', ['wave', 'flux', 'err'],
+     [None, None, None])])
+def test_header(write, header, names, units):
+    table = ascii.read_ascii(write(header + ROWS), cache=False)
+    assert table.names == names
+    assert table.units == units
+    check_rows(table)
+
+
+@pytest.mark.parametrize('delimiter', [',', ';', '\t', ' , '])
+def test_delimiters(write, delimiter):
+    path = write(ROWS.replace(' ', delimiter))
+    assert ascii.sniff(path)
+    check_rows(ascii.read_ascii(path, cache=False))
+
+
+def test_comments_inside_blocks(write):
+    lines = ROWS.splitlines()
+    lines[10:10] = ['# a comment', '; another', '']
+    lines.insert(50, '   % indented')
+    check_rows(ascii.read_ascii(write('\n'.join(lines) + '\n'), cache=False))
+
+
+@pytest.mark.parametrize('bad_line', [
+    '4100 1 2 3',   # Too many values.
+    '4100 1',       # Too few; used to be re-wrapped with the next row.
+    '4100 nan? 1',  # Not a number.
+    '4100 1 x'])
+def test_bad_rows(write, bad_line):
+    lines = ROWS.splitlines()
+    lines.insert(50, bad_line)
+    path = write('\n'.join(lines) + '\n')
+    with pytest.raises(ValueError):
+        ascii.read_ascii(path, cache=False)
+
+
+def test_ragged_rows_that_sum_up(write):
+    # 2 + 4 values are two rows of 3 values to numpy.
+    path = write('1 2 3\n4 5\n6 7 8 9\n10 11 12\n')
+    with pytest.raises(ValueError, match='not 2'):
+        ascii.read_ascii(path, cache=False)
+
+
+@pytest.mark.parametrize('chunk_bytes', [7, 16, 64, 1000])
+def test_chunk_boundaries(write, monkeypatch, chunk_bytes):
+    lines = ROWS.splitlines()
+    lines.insert(30, '# a comment in the middle')
+    text = '# wave flux err\n' + '\n'.join(lines)   # No final newline.
+    monkeypatch.setattr(ascii, 'CHUNK_BYTES', chunk_bytes)
+    table = ascii.read_ascii(write(text), cache=False)
+    assert table.names == ['wave', 'flux', 'err']
+    check_rows(table)
+
+
+def test_no_data(write):
+    with pytest.raises(ValueError):
+        ascii.read_ascii(write('# wave flux\nwave flux\n'), cache=False)
+    assert not ascii.sniff(write('# wave flux\nwave flux\n'))
+    assert not ascii.sniff(write('1\n2\n3\n'))
+
+
+def test_cache(write, cache_dir, monkeypatch):
+    path = write('# wave flux err\n' + ROWS)
+    table = ascii.read_ascii(path)
+    assert isinstance(table.columns, np.memmap)
+    check_rows(table)
+
+    def parse(f, n_columns):
+        raise AssertionError('The file was parsed again.')
+
+    original = ascii._parse
+    monkeypatch.setattr(ascii, '_parse', parse)
+    table = ascii.read_ascii(path)
+    assert table.names == ['wave', 'flux', 'err']
+    check_rows(table)
+
+    # A change of size, or of mtime, is a change of content.
+    monkeypatch.setattr(ascii, '_parse', original)
+    path = write('# wave flux err\n' + '\n'.join(ROWS.splitlines()[:50]))
+    check_rows(ascii.read_ascii(path), 50)
+
+    stat = os.stat(path)
+    with open(path, 'r+') as f:
+        f.write('# wave flux sig')
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert os.stat(path).st_size == stat.st_size
+    table = ascii.read_ascii(path)
+    assert table.names == ['wave', 'flux', 'sig']
+    check_rows(table, 50)
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from specview.tools.catalog import Catalog
+from specview.tools.preprocess import read_data
+
+
+def write_image(path, object_name):
+    hdu = fits.PrimaryHDU(np.arange(100, dtype=float))
+    hdu.header['OBJECT'] = object_name
+    hdu.header['CRVAL1'] = 4000.
+    hdu.header['CDELT1'] = 10.
+    hdu.header['CRPIX1'] = 2.
+    hdu.header['CUNIT1'] = 'Angstrom'
+    hdu.writeto(path, overwrite=True)
+
+
+@pytest.fixture
+def directory(tmpdir):
+    tmpdir.mkdir('sub')
+    write_image(str(tmpdir.join('a.fits')), 'A')
+    write_image(str(tmpdir.join('sub', 'b.fits')), 'B')
+    return str(tmpdir)
+
+
+@pytest.fixture
+def catalog(tmpdir):
+    return Catalog(str(tmpdir.join('catalog.sqlite')))
+
+
+def test_scan(directory, catalog):
+    assert catalog.scan(directory, max_workers=2) == (2, 0)
+    assert len(catalog) == 2
+
+    entry = catalog.entry(os.path.join(directory, 'a.fits'))
+    assert entry.object == 'A'
+    # The range of the values read.
+    x = read_data(entry.path).x.data
+    assert (entry.disp_min, entry.disp_max) == (x[0], x[-1])
+    assert [e.object for e in catalog.query(object='b')] == ['B']
+    assert [e.object for e in catalog.query(wavelength=4500.)] == ['A', 'B']
+
+
+def test_rescan_reads_changed_files(directory, catalog):
+    catalog.scan(directory)
+    assert catalog.scan(directory) == (0, 0)
+
+    path = os.path.join(directory, 'a.fits')
+    write_image(path, 'C')
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert catalog.scan(directory) == (1, 0)
+    assert catalog.entry(path).object == 'C'
+
+
+def test_rescan_of_part_keeps_the_rest(directory, catalog):
+    catalog.scan(directory)
+    assert catalog.scan(directory, recursive=False) == (0, 0)
+    assert catalog.scan(directory, patterns=['a*.fits']) == (0, 0)
+    assert catalog.scan(os.path.join(directory, 'sub')) == (0, 0)
+    assert len(catalog) == 2
+
+
+def test_rescan_drops_removed_files(directory, catalog):
+    catalog.scan(directory)
+    os.remove(os.path.join(directory, 'sub', 'b.fits'))
+
+    # Out of this scan; left as is.
+    assert catalog.scan(directory, recursive=False) == (0, 0)
+    assert len(catalog) == 2
+
+    assert catalog.scan(directory) == (0, 1)
+    assert catalog.entry(os.path.join(directory, 'sub', 'b.fits')) is None
+    assert catalog.entry(os.path.join(directory, 'a.fits')) is not None
+
+
+def test_scan_prefix_is_case_sensitive(tmpdir, catalog):
+    upper = tmpdir.mkdir('FX')
+    write_image(str(upper.join('a.fits')), 'A')
+    catalog.scan(str(upper))
+    tmpdir.mkdir('fx')
+
+    assert catalog.scan(str(tmpdir.join('fx'))) == (0, 0)
+    assert len(catalog) == 1
@@ -0,0 +1,117 @@
+import glob
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from specview.core.data_objects import SpectrumCollection, SpectrumData
+
+# The client is a QObject, and astropy.samp is deprecated.
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    interop = pytest.importorskip('specview.tools.interop')
+    samp = interop._samp()
+
+NPIX = 100
+X = np.linspace(4000., 5000., NPIX)
+
+
+@pytest.fixture
+def clients():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        hub = samp.SAMPHubServer(web_profile=False, mode='multiple')
+        hub.start()
+        receiver = interop.SampClient('viewer')
+        sender = interop.SampClient('producer')
+        received = []
+        receiver.sig_received.connect(
+            lambda data, name: received.append((data, name)))
+        try:
+            receiver.connect(hub=hub)
+            sender.connect(hub=hub)
+            yield hub, sender, receiver, received
+        finally:
+            sender.disconnect()
+            receiver.disconnect()
+            hub.stop()
+
+
+def spectra(n):
+    y = np.random.RandomState(0).rand(n, NPIX)
+    return SpectrumCollection(X, y, x_unit='Angstrom', y_unit='Jy')
+
+
+def test_send_shared(clients):
+    hub, sender, receiver, received = clients
+    batch = spectra(20)
+    responses = sender.send_spectra(batch, name='batch')
+
+    receiver_id = receiver.client.get_public_id()
+    assert responses[receiver_id]['samp.status'] == 'samp.ok'
+    assert len(received) == 1
+    data, name = received[0]
+    assert name == 'batch'
+    assert isinstance(data, SpectrumCollection)
+    assert isinstance(data.y, np.memmap)
+    assert data.names == ['batch[{}]'.format(i) for i in range(20)]
+    np.testing.assert_allclose(data.y, batch.y)
+    assert str(data.x_unit) == 'Angstrom'
+    # The sender removes its files once the receiver replied.
+    assert not glob.glob(os.path.join(
+        interop.SHARED_DIR, 'specview-{}-*'.format(os.getpid())))
+
+
+def test_map_spectra(tmpdir):
+    x_path, y_path = str(tmpdir.join('x.npy')), str(tmpdir.join('y.npy'))
+    np.save(x_path, X)
+    np.save(y_path, np.ones((1, NPIX)))
+    params = {'x': x_path, 'y': y_path, 'x-unit': 'Angstrom', 'y-unit': '',
+              'names': ['one'], interop.HOST_KEY: interop.HOST}
+
+    spectrum = interop._map_spectra(params)
+    assert isinstance(spectrum, SpectrumData)
+    np.testing.assert_array_equal(spectrum.y.data, 1.)
+
+    params[interop.HOST_KEY] = 'elsewhere'
+    with pytest.raises(ValueError):
+        interop._map_spectra(params)
+
+
+def test_send_fits_to_other_hosts(clients, monkeypatch):
+    hub, sender, receiver, received = clients
+    # The receiver declared this host; the sender is elsewhere.
+    monkeypatch.setattr(interop, 'HOST', 'elsewhere')
+    batch = spectra(3)
+    responses = sender.send_spectra(batch, name='std')
+
+    receiver_id = receiver.client.get_public_id()
+    assert responses[receiver_id]['samp.status'] == 'samp.ok'
+    assert [name for _, name in received] == ['std[0]', 'std[1]', 'std[2]']
+    for (data, _), y in zip(received, batch.y):
+        assert isinstance(data, SpectrumData)
+        np.testing.assert_allclose(data.y.data, y)
+
+
+def test_send_timeout(clients):
+    hub, sender, receiver, received = clients
+    # A client of this host that never replies; the receiver still gets
+    # the batch.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        silent = samp.SAMPIntegratedClient(
+            metadata={interop.HOST_KEY: interop.HOST})
+        silent.connect(hub=hub)
+    silent_id = silent.get_public_id()
+    try:
+        for mtype in (interop.SPECTRA_MTYPE, interop.SPECTRUM_MTYPE):
+            silent.bind_receive_call(mtype, lambda *args: None)
+        responses = sender.send_spectra(spectra(2), timeout=1)
+    finally:
+        silent.disconnect()
+
+    assert responses[silent_id]['samp.status'] == 'samp.error'
+    assert responses[receiver.client.get_public_id()]['samp.status'] == \
+        'samp.ok'
+    assert len(received) == 1
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from specview.core import masks
+from specview.core.data_objects import SpectrumData
+from specview.core.masks import ALL_BITS, DQMask
+
+BIT_NAMES = {'DQ': {'hot': 2, 'cold': 1, 'saturated': 8}}
+
+
+@pytest.fixture
+def dq():
+    return DQMask(OrderedDict([('DQ', np.array([0, 1, 2, 4, 8, 3], 'i2')),
+                               ('WEIGHT', np.array([0, 0, 0, 0, 0, 1],
+                                                   bool))]),
+                  bit_names=BIT_NAMES)
+
+
+def test_reject_all_bits_by_default(dq):
+    assert dq.reject == {'DQ': ALL_BITS, 'WEIGHT': ALL_BITS}
+    np.testing.assert_array_equal(dq.mask, [0, 1, 1, 1, 1, 1])
+
+
+@pytest.mark.parametrize('reject, expected', [
+    ({'DQ': 'hot', 'WEIGHT': 0}, [0, 0, 1, 0, 0, 1]),
+    ({'DQ': ['hot', 'cold'], 'WEIGHT': 0}, [0, 1, 1, 0, 0, 1]),
+    ({'DQ': ['saturated', 4], 'WEIGHT': 0}, [0, 0, 0, 1, 1, 0]),
+    ({'DQ': 0, 'WEIGHT': 1}, [0, 0, 0, 0, 0, 1]),
+    ({'DQ': 16, 'WEIGHT': 1}, [0, 0, 0, 0, 0, 1])])
+def test_select_bits(dq, reject, expected):
+    dq.reject = reject
+    np.testing.assert_array_equal(dq.mask, expected)
+    np.testing.assert_array_equal(dq.select(reject), expected)
+
+
+def test_select_nothing(dq):
+    assert dq.select({}) is None
+    assert dq.select({'DQ': 16, 'WEIGHT': 0}) is None
+
+
+def test_unknown_bits_and_planes(dq):
+    with pytest.raises(KeyError):
+        dq.reject = {'DQ': 'warm'}
+    with pytest.raises(KeyError):
+        dq.reject = {'BITMASK': 1}
+    # Left as it was.
+    assert dq.reject['DQ'] == ALL_BITS
+
+
+@pytest.mark.parametrize('dtype, high_bit', [
+    ('u1', 1 << 7), ('i1', -(1 << 7)), ('>u2', 1 << 15), ('>i2', -(1 << 15)),
+    ('u4', 1 << 31), ('i4', -(1 << 31)), ('u8', 1 << 63), ('i8', -(1 << 63))])
+def test_all_bits_of_any_integer_type(dtype, high_bit):
+    flags = np.array([0, 1, high_bit], dtype=dtype)
+    dq = DQMask({'DQ': flags})
+    np.testing.assert_array_equal(dq.mask, [False, True, True])
+    np.testing.assert_array_equal(dq.flagged('DQ'), [False, True, True])
+    np.testing.assert_array_equal(dq.flagged('DQ', 1), [False, True, False])
+    assert dq.select({'DQ': 2}) is None
+
+
+def test_float_flags():
+    # Text columns hold flags as floats.
+    dq = DQMask({'DQ': np.array([0., 1., 6.])}, {'DQ': 4})
+    np.testing.assert_array_equal(dq.mask, [False, False, True])
+
+
+def test_cache(dq, monkeypatch):
+    monkeypatch.setattr(masks, 'MASK_CACHE_SIZE', 2)
+    hot = dq.select({'DQ': 'hot'})
+    assert dq.select({'DQ': 2}) is hot
+
+    # A change of selection is a new mask; going back is free.
+    dq.reject = {'DQ': 'cold', 'WEIGHT': 0}
+    cold = dq.mask
+    np.testing.assert_array_equal(cold, [0, 1, 0, 0, 0, 1])
+    dq.reject = {'DQ': 'hot'}
+    assert dq.select({'DQ': 'hot'}) is hot
+    assert dq.mask is not cold
+
+    # Least recently used masks are dropped.
+    dq.select({'DQ': 4})
+    dq.select({'DQ': 8})
+    assert dq.select({'DQ': 'hot'}) is not hot
+    np.testing.assert_array_equal(dq.select({'DQ': 'hot'}), hot)
+
+
+def test_spectrum_reject(dq):
+    spectrum = SpectrumData()
+    spectrum.set_x(np.arange(6.))
+    spectrum.set_y(np.arange(6.) * 10)
+    spectrum.dq = dq
+    np.testing.assert_array_equal(spectrum.y.data, [0.])
+
+    spectrum.reject({'DQ': 'hot', 'WEIGHT': 0})
+    np.testing.assert_array_equal(spectrum.x.data, [0., 1., 3., 4.])
+    np.testing.assert_array_equal(spectrum.y.data, [0., 10., 30., 40.])
+
+
+def test_slice_and_concatenate(dq):
+    dq.reject = {'DQ': 'hot'}
+    head = dq[:3]
+    assert head.reject == dq.reject
+    np.testing.assert_array_equal(head.mask, [0, 0, 1])
+
+    joined = DQMask.concatenate([head, DQMask({'OTHER': np.ones(2, 'u1')})])
+    assert joined.shape == (5,)
+    np.testing.assert_array_equal(joined.planes['DQ'], [0, 1, 2, 0, 0])
+    np.testing.assert_array_equal(joined.mask, [0, 0, 1, 1, 1])
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+from astropy.nddata import StdDevUncertainty
+
+from specview.tools.preprocess import read_data
+
+NPIX = 10
+
+
+@pytest.fixture
+def image_file(tmpdir):
+    """An image laid out as [PRIMARY, ERR, DQ, SHORT]."""
+    path = str(tmpdir.join('image.fits'))
+    flags = np.zeros(NPIX, dtype='i2')
+    flags[3] = 4
+    fits.HDUList([fits.PrimaryHDU(np.arange(NPIX, dtype=float)),
+                  fits.ImageHDU(np.full(NPIX, 0.5), name='ERR'),
+                  fits.ImageHDU(flags, name='DQ'),
+                  fits.ImageHDU(np.ones(NPIX - 1), name='SHORT')]
+                 ).writeto(path)
+    return path
+
+
+@pytest.mark.parametrize('uncertainty, mask', [(1, 2), ('err', 'dq'),
+                                               (-3, -2)])
+def test_image_extensions(image_file, uncertainty, mask):
+    spectrum = read_data(image_file, uncertainty=uncertainty, mask=mask)
+
+    assert isinstance(spectrum.y.uncertainty, StdDevUncertainty)
+    np.testing.assert_array_equal(spectrum.y.uncertainty.array, 0.5)
+    assert list(spectrum.dq.planes) == ['DQ']
+    np.testing.assert_array_equal(spectrum.dq.mask, np.arange(NPIX) == 3)
+
+
+def test_image_extensions_found_by_name(image_file):
+    spectrum = read_data(image_file)
+    np.testing.assert_array_equal(spectrum.y.uncertainty.array, 0.5)
+    assert list(spectrum.dq.planes) == ['DQ']
+
+
+@pytest.mark.parametrize('kwargs', [
+    # The data itself, or out of the file.
+    {'uncertainty': 0}, {'mask': 0}, {'uncertainty': 4}, {'mask': -5},
+    # Not of the shape of the data.
+    {'uncertainty': 3}, {'uncertainty': 'short'}, {'mask': 3},
+    {'mask': 'short'},
+    # Not in the file.
+    {'uncertainty': 'ivar'}, {'mask': 'flags'}])
+def test_image_bad_extensions(image_file, kwargs):
+    with pytest.raises(ValueError):
+        read_data(image_file, **kwargs)
+
+
+@pytest.fixture
+def cache_dir(tmpdir, monkeypatch):
+    from specview.tools import cache
+    monkeypatch.setattr(cache, 'CACHE_DIR', str(tmpdir.join('cache')))
+
+
+def test_cache_keeps_grids(image_file, cache_dir):
+    with fits.open(image_file, mode='update') as hdulist:
+        hdulist[0].header.update(CRVAL1=4000., CDELT1=10., CUNIT1='Angstrom')
+    read = read_data(image_file)
+    assert read.x.grid is not None
+
+    for _ in range(2):
+        cached = read_data(image_file, cache=True)
+        assert cached.x.grid == read.x.grid
+        assert str(cached.x.unit) == 'Angstrom'
+        np.testing.assert_array_equal(cached.x.data, read.x.data)
+        np.testing.assert_array_equal(cached.y.data, read.y.data)
+        np.testing.assert_array_equal(cached.y.uncertainty.array, 0.5)
+        np.testing.assert_array_equal(cached.dq.mask, read.dq.mask)
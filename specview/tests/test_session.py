@@ -0,0 +1,67 @@
+import contextlib
+import glob
+import os
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from specview.core.data_objects import SpectrumArray
+from specview.tools.preprocess import read_data
+from specview.tools.session import SessionWriter, load_session
+
+
+class DataItem(object):
+    def __init__(self, item, name):
+        self.item = item
+        self.layers = []
+        self._name = name
+
+    def text(self):
+        return self._name
+
+
+class Model(object):
+    """Stand-in for the data tree model."""
+    def __init__(self, items=()):
+        self.items = list(items)
+
+    @contextlib.contextmanager
+    def suspend_notifications(self):
+        yield
+
+    def create_data_item(self, item, name):
+        data_item = DataItem(item, name)
+        self.items.append(data_item)
+        return data_item
+
+
+@pytest.fixture
+def spectrum(tmpdir):
+    """A spectrum read from FITS, so in big endian byte order."""
+    path = str(tmpdir.join('image.fits'))
+    flags = np.zeros(10, dtype='i2')
+    flags[3] = 4
+    fits.HDUList([fits.PrimaryHDU(np.arange(10.)),
+                  fits.ImageHDU(np.full(10, 0.5), name='ERR'),
+                  fits.ImageHDU(flags, name='DQ')]).writeto(path)
+    return read_data(path)
+
+
+def test_reload_and_save_again(spectrum, tmpdir):
+    path = str(tmpdir.join('my.session'))
+    writer = SessionWriter(path)
+    assert writer.save(Model([DataItem(spectrum, 'a')])) > 0
+    for name in glob.glob(os.path.join(path, 'arrays', '*.npy')):
+        assert np.load(name, mmap_mode='r').dtype.isnative
+
+    model = Model()
+    loaded = load_session(model, path, writer=writer)[0].item
+    np.testing.assert_array_equal(loaded.y.data, np.delete(np.arange(10.),
+                                                           3))
+    np.testing.assert_array_equal(loaded.y.uncertainty.array, 0.5)
+    assert loaded.dq.planes['DQ'][3] == 4
+    # Still mapped once the values are used.
+    assert isinstance(super(SpectrumArray, loaded.y).data, np.memmap)
+
+    assert writer.save(model) == 0
@@ -0,0 +1,176 @@
+import os
+import socket
+import struct
+import time
+
+import numpy as np
+import pytest
+
+from specview.core.ring import SpectrumRing
+from specview.tools import streaming
+from specview.tools.streaming import (FileWatchSource, SocketSource,
+                                      send_spectrum)
+
+NPIX = 50
+
+
+def wait_for(condition, timeout=5.):
+    end = time.time() + timeout
+    while not condition():
+        if time.time() > end:
+            raise AssertionError('Timed out')
+        time.sleep(0.01)
+
+
+def disconnected(connection):
+    # Bytes left unread make the close a reset rather than an EOF.
+    connection.settimeout(5.)
+    try:
+        return connection.recv(1) == b''
+    except socket.error:
+        return True
+
+
+@pytest.fixture
+def ring():
+    return SpectrumRing(np.linspace(4000., 5000., NPIX), capacity=4,
+                        x_unit='Angstrom', y_unit='Jy')
+
+
+@pytest.fixture
+def fast_poll(monkeypatch):
+    monkeypatch.setattr(streaming, 'POLL_INTERVAL', 0.02)
+
+
+def test_ring_empty(ring):
+    assert len(ring) == 0
+    assert np.isnan(ring.latest().y.data).all()
+
+
+def test_ring_wraparound(ring):
+    for i in range(6):
+        ring.append(np.full(NPIX, float(i)))
+
+    assert ring.count == 6
+    assert len(ring) == 4
+    assert ring.version == 6
+    collection = ring.collection()
+    assert collection.shape == (4, NPIX)
+    np.testing.assert_array_equal(collection.y[:, 0], [2., 3., 4., 5.])
+    np.testing.assert_array_equal(ring.latest().y.data, 5.)
+    assert str(ring.latest().x.unit) == 'Angstrom'
+
+
+def test_ring_partial_readouts(ring):
+    ring.update(np.ones(10), start=20)
+    latest = ring.latest().y.data
+    assert ring.count == 1
+    np.testing.assert_array_equal(latest[20:30], 1.)
+    assert np.isnan(latest[:20]).all() and np.isnan(latest[30:]).all()
+
+    ring.append(np.arange(5.))
+    ring.update([7., 8.], start=3)
+    latest = ring.latest().y.data
+    np.testing.assert_array_equal(latest[:5], [0., 1., 2., 7., 8.])
+    assert np.isnan(latest[5:]).all()
+    assert ring.count == 2
+
+
+def test_ring_latest_is_a_copy(ring):
+    ring.append(np.zeros(NPIX))
+    latest = ring.latest()
+    ring.update(np.ones(NPIX))
+    np.testing.assert_array_equal(latest.y.data, 0.)
+
+
+def test_ring_rejects_values_out_of_the_spectrum(ring):
+    with pytest.raises(ValueError):
+        ring.append(np.ones(NPIX + 1))
+    with pytest.raises(ValueError):
+        ring.update(np.ones(10), start=NPIX - 5)
+    assert ring.version == 0
+
+
+def test_socket_source(ring, fast_poll):
+    source = SocketSource(ring).start()
+    try:
+        connection = socket.create_connection(source.address)
+        for i in range(100):
+            send_spectrum(connection, np.full(NPIX, float(i)))
+        send_spectrum(connection, [-1., -1.], start=10)
+        connection.close()
+        wait_for(lambda: ring.version == 101)
+
+        assert ring.count == 100
+        latest = ring.latest().y.data
+        np.testing.assert_array_equal(latest[10:12], -1.)
+        np.testing.assert_array_equal(latest[12:], 99.)
+        np.testing.assert_array_equal(ring.collection().y[:, 0],
+                                      [96., 97., 98., 99.])
+    finally:
+        source.stop()
+    assert not source.running
+    assert source.error is None
+
+
+@pytest.mark.parametrize('frame', [
+    struct.pack('<4sBII', b'JUNK', 0, 0, 1) + b'\0' * 8,
+    struct.pack('<4sBII', b'SVSP', 7, 0, 1) + b'\0' * 8,
+    struct.pack('<4sBII', b'SVSP', 0, 0, NPIX + 1),
+    struct.pack('<4sBII', b'SVSP', 1, NPIX - 1, 2) + b'\0' * 16])
+def test_socket_source_drops_bad_producers(ring, fast_poll, frame):
+    source = SocketSource(ring).start()
+    try:
+        connection = socket.create_connection(source.address)
+        with pytest.warns(UserWarning, match='Dropped a stream producer'):
+            connection.sendall(frame)
+            assert disconnected(connection)
+        connection.close()
+
+        connection = socket.create_connection(source.address)
+        send_spectrum(connection, np.ones(NPIX))
+        connection.close()
+        wait_for(lambda: ring.count == 1)
+    finally:
+        source.stop()
+    assert source.error is None
+
+
+def test_socket_source_restarts(ring, fast_poll):
+    source = SocketSource(ring).start()
+    address = source.address
+    source.stop()
+    source.start()
+    try:
+        assert source.address == address
+        connection = socket.create_connection(address)
+        send_spectrum(connection, np.ones(NPIX))
+        connection.close()
+        wait_for(lambda: ring.count == 1)
+    finally:
+        source.stop()
+
+
+def test_file_watch_source(ring, tmpdir):
+    directory = str(tmpdir)
+    np.save(os.path.join(directory, 'before.npy'), np.zeros(NPIX))
+    source = FileWatchSource(ring, directory, pattern='*.npy',
+                             interval=0.02, read=np.load).start()
+    try:
+        for i in range(3):
+            np.save(os.path.join(directory, 's{}.npy'.format(i)),
+                    np.full(NPIX, i + 1.))
+        with open(os.path.join(directory, 's3.npy'), 'w') as f:
+            f.write('not an array')
+        with open(os.path.join(directory, 'ignored.txt'), 'w') as f:
+            f.write('1 2 3')
+
+        with pytest.warns(UserWarning, match='Skipped'):
+            wait_for(lambda: ring.count == 3)
+            time.sleep(0.2)
+    finally:
+        source.stop()
+
+    assert ring.count == 3
+    np.testing.assert_array_equal(ring.collection().y[:, 0], [1., 2., 3.])
+    assert source.error is None
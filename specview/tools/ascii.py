@@ -0,0 +1,325 @@
+"""Column oriented text spectra
+
+Parses files of numeric columns, separated by white space, commas,
+semicolons or tabs, with optional header lines giving column names and
+units. The data are parsed in blocks of `CHUNK_BYTES` by numpy's C
+parser rather than line by line, so multi-million row files take
+seconds.
+
+The parsed columns are kept in a binary cache, keyed by path, size and
+mtime; opening the file again memory maps the cache instead.
+
+Header conventions understood, in comment lines or as a first line of
+names::
+
+    # wavelength [Angstrom]  flux (erg/s/cm2/Angstrom)  error
+    wavelength,flux,error
+    # units: Angstrom erg/s/cm2/Angstrom
+    # flux_unit = erg/s/cm2/Angstrom
+"""
+import hashlib
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from .cache import cache_path, replace
+
+# Size of the blocks of text parsed at once.
+CHUNK_BYTES = 1 << 24
+
+# First characters of comment lines.
+COMMENTS = b'#;%!'
+
+# Bytes read to sniff a file.
+SNIFF_BYTES = 1 << 16
+
+# Version of the cache layout; caches of another version are ignored.
+_CACHE_VERSION = 1
+
+_DELIMITERS = (b',', b';', b'\t')
+_NAME_WITH_UNIT = re.compile(r'^(.*?)\s*[\[(](.*)[\])]$')
+_HEADER_TOKEN = re.compile(r'[^\s\[(]+(?:\s*[\[(][^\])]*[\])])?')
+_UNIT_KEYWORD = re.compile(r'^(\w+?)_?unit\s*[=:]\s*(.+)$', re.IGNORECASE)
+_UNITS_LINE = re.compile(r'^units?\s*[=:]\s*(.+)$', re.IGNORECASE)
+
+AsciiTable = namedtuple('AsciiTable', ['names', 'units', 'columns'])
+AsciiTable.__doc__ = """Columns of a text file
+
+names: [str,]
+    Column names, from the header or col1, col2, ...
+units: [str,]
+    Column units, None when not given.
+columns: numpy.ndarray
+    (number of columns, number of rows) float64 values.
+"""
+
+
+def sniff(path):
+    """Whether `path` looks like a text file of at least two columns."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+    except (IOError, OSError):
+        return False
+    if b'\0' in head:
+        return False
+
+    for line in head.splitlines()[:-1] or head.splitlines():
+        line = line.strip()
+        if not line or line[:1] in _comment_bytes():
+            continue
+        values = _split(line)
+        try:
+            [float(value) for value in values]
+        except ValueError:
+            # A line of column names is allowed before the data.
+            continue
+        return len(values) >= 2
+    return False
+
+
+def read_ascii(path, cache=True):
+    """Read the columns of a text file.
+
+    Parameters
+    ----------
+    path: str
+        The file.
+
+    cache: bool
+        Use, and write, the binary cache.
+
+    Returns
+    -------
+    AsciiTable
+    """
+    path = os.path.abspath(str(path))
+    stat = os.stat(path)
+    cache_dir = None
+    if cache:
+        cache_dir = cache_path(
+            'ascii', hashlib.sha1(path.encode('utf-8')).hexdigest(), '')
+        table = _load_cache(cache_dir, stat)
+        if table is not None:
+            return table
+
+    with open(path, 'rb') as f:
+        header, first_line, offset = _read_header(f)
+        n_columns = len(_split(first_line))
+        f.seek(offset)
+        columns = _parse(f, n_columns)
+
+    names, units = _parse_header(header, n_columns)
+    table = AsciiTable(names, units, columns)
+
+    if cache:
+        try:
+            _save_cache(cache_dir, stat, table)
+        except (IOError, OSError):
+            return table
+        return _load_cache(cache_dir, stat)
+    return table
+
+
+def _comment_bytes():
+    return [COMMENTS[i:i + 1] for i in range(len(COMMENTS))]
+
+
+def _split(line):
+    """Split a line of bytes on its delimiter."""
+    for delimiter in _DELIMITERS:
+        if delimiter in line:
+            return [value.strip() for value in line.split(delimiter)
+                    if value.strip()]
+    return line.split()
+
+
+def _read_header(f):
+    """Read up to the first line of numbers.
+
+    Returns
+    -------
+    ([str,], bytes, int)
+        Header lines, first data line, and its offset in the file.
+    """
+    header = []
+    comments = _comment_bytes()
+    while True:
+        offset = f.tell()
+        line = f.readline()
+        if not line:
+            raise ValueError('No numeric data found.')
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped[:1] in comments:
+            header.append(stripped[1:].strip().decode('utf-8', 'replace'))
+            continue
+        try:
+            [float(value) for value in _split(stripped)]
+        except ValueError:
+            header.append(stripped.decode('utf-8', 'replace'))
+            continue
+        return header, stripped, offset
+
+
+def _parse(f, n_columns):
+    """Parse the rest of `f` into (n_columns, n_rows) values."""
+    blocks = []
+    rest = b''
+    while True:
+        chunk = f.read(CHUNK_BYTES)
+        if not chunk:
+            text, rest = rest, b''
+        else:
+            text = rest + chunk
+            end = text.rfind(b'\n') + 1
+            if end == 0:
+                rest = text
+                continue
+            text, rest = text[:end], text[end:]
+        if text.strip():
+            blocks.append(_parse_block(text, n_columns))
+        if not chunk:
+            break
+
+    # Blocks are transposed views: the values are copied once, into
+    # contiguous columns.
+    columns = np.empty((n_columns, sum(block.shape[1] for block in blocks)))
+    start = 0
+    for block in blocks:
+        columns[:, start:start + block.shape[1]] = block
+        start += block.shape[1]
+    return columns
+
+
+def _parse_block(text, n_columns):
+    """Parse whole lines of text at once, as (n_columns, n_rows) values."""
+    comments = _comment_bytes()
+    if any(comment in text for comment in comments):
+        text = b'\n'.join(line for line in text.splitlines()
+                          if line.strip()[:1] not in comments)
+    for delimiter in _DELIMITERS:
+        if delimiter in text:
+            text = text.replace(delimiter, b' ')
+
+    values = np.fromstring(text, dtype=np.float64, sep=' ')
+    counts = _values_per_line(text)
+    if values.size != counts.sum():
+        # fromstring stops at the first value it cannot parse.
+        raise ValueError('Rows of {} numeric columns expected, near '
+                         '"{}"'.format(n_columns,
+                                       _context(text, values.size)))
+    ragged = np.flatnonzero((counts != 0) & (counts != n_columns))
+    if ragged.size:
+        # fromstring does not see lines: values would be re-wrapped.
+        line = text.split(b'\n')[ragged[0]]
+        raise ValueError('Rows of {} numeric columns expected, not {} in '
+                         '"{}"'.format(n_columns, counts[ragged[0]],
+                                       line.strip().decode('utf-8',
+                                                           'replace')))
+    return values.reshape(-1, n_columns).T
+
+
+def _values_per_line(text):
+    """Number of white space separated values on each line of `text`."""
+    chars = np.frombuffer(text, dtype=np.uint8)
+    newlines = chars == ord('\n')
+    blanks = newlines | (chars == ord(' ')) | (chars == ord('\t')) | \
+        (chars == ord('\r'))
+    # A value starts at a non blank character after a blank one.
+    starts = ~blanks
+    starts[1:] &= blanks[:-1]
+    lines = np.concatenate([[0], np.cumsum(newlines)[:-1]])
+    return np.bincount(lines[starts], minlength=newlines.sum() + 1)
+
+
+def _context(text, n_values):
+    tokens = text.split()
+    return b' '.join(tokens[n_values:n_values + 3]).decode('utf-8', 'replace')
+
+
+def _parse_header(header, n_columns):
+    """Column names and units from the header lines."""
+    names = ['col{}'.format(i + 1) for i in range(n_columns)]
+    units = [None] * n_columns
+    keyword_units = {}
+
+    for line in header:
+        match = _UNITS_LINE.match(line)
+        if match:
+            tokens = _tokens(match.group(1))
+            if len(tokens) == n_columns:
+                units = tokens
+            continue
+        match = _UNIT_KEYWORD.match(line)
+        if match:
+            keyword_units[match.group(1).lower()] = match.group(2).strip()
+            continue
+        tokens = _tokens(line)
+        if len(tokens) == n_columns:
+            # The last line naming all the columns wins.
+            names, line_units = zip(*[_name_and_unit(token)
+                                      for token in tokens])
+            names = list(names)
+            units = [unit or units[i] for i, unit in enumerate(line_units)]
+
+    for i, name in enumerate(names):
+        unit = keyword_units.get(name.lower())
+        if unit is not None:
+            units[i] = unit
+    # x/y keywords for the first two columns.
+    for i, keys in enumerate((('x', 'dispersion', 'wavelength', 'wave'),
+                              ('y', 'flux'))):
+        for key in keys:
+            if units[i] is None and key in keyword_units:
+                units[i] = keyword_units[key]
+
+    return names, units
+
+
+def _tokens(line):
+    for delimiter in (',', ';', '\t'):
+        if delimiter in line:
+            return [token.strip() for token in line.split(delimiter)
+                    if token.strip()]
+    return _HEADER_TOKEN.findall(line)
+
+
+def _name_and_unit(token):
+    match = _NAME_WITH_UNIT.match(token)
+    if match and match.group(1):
+        return match.group(1).strip(), match.group(2).strip() or None
+    return token, None
+
+
+def _load_cache(cache_dir, stat):
+    try:
+        with open(os.path.join(cache_dir, 'meta.json')) as f:
+            meta = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if meta.get('version') != _CACHE_VERSION or \
+            meta['mtime'] != stat.st_mtime or meta['size'] != stat.st_size:
+        return None
+    columns = np.load(os.path.join(cache_dir, 'columns.npy'), mmap_mode='r')
+    return AsciiTable(meta['names'], meta['units'], columns)
+
+
+def _save_cache(cache_dir, stat, table):
+    file_name = os.path.join(cache_dir, 'columns.npy')
+    with open(file_name + '.tmp', 'wb') as f:
+        np.save(f, table.columns)
+    replace(file_name + '.tmp', file_name)
+
+    meta_name = os.path.join(cache_dir, 'meta.json')
+    with open(meta_name + '.tmp', 'w') as f:
+        json.dump({'version': _CACHE_VERSION,
+                   'mtime': stat.st_mtime,
+                   'size': stat.st_size,
+                   'names': list(table.names),
+                   'units': list(table.units)}, f)
+    replace(meta_name + '.tmp', meta_name)
@@ -0,0 +1,45 @@
+"""On-disk cache location
+
+Parameters
+----------
+CACHE_DIR: str
+    Root of all specview caches. Defaults to ``~/.specview/cache`` and can
+    be overridden with the ``SPECVIEW_CACHE_DIR`` environment variable.
+"""
+import os
+from os.path import dirname, expanduser, join
+
+CACHE_DIR = os.environ.get('SPECVIEW_CACHE_DIR',
+                           join(expanduser('~/.specview'), 'cache'))
+
+
+def cache_path(*parts):
+    """Return a path under `CACHE_DIR`, creating its directory
+
+    Parameters
+    ----------
+    parts: [str,]
+        Path components relative to `CACHE_DIR`.
+
+    Returns
+    -------
+    str
+        The full path. The file itself is not created.
+    """
+    path = join(CACHE_DIR, *parts)
+    try:
+        os.makedirs(dirname(path))
+    except OSError:
+        pass
+    return path
+
+
+def replace(source, destination):
+    """Atomically move `source` over `destination` where the OS allows."""
+    try:
+        os.replace(source, destination)
+    except AttributeError:
+        # Python 2: rename cannot overwrite on Windows.
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
@@ -0,0 +1,297 @@
+"""Local catalog of FITS products
+
+Directories are scanned by a pool of threads that read FITS headers
+only. For each file, the object name, instrument, extension layout,
+column names and units, and dispersion range are kept in a SQLite
+index. Scanning again only reads the files whose mtime changed, so
+keeping a catalog of 100k spectra current is cheap.
+
+Each operation opens its own connection, so a catalog can be scanned
+from a worker thread while being queried from the GUI.
+"""
+import fnmatch
+import json
+import multiprocessing
+import os
+import sqlite3
+import warnings
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from .cache import cache_path
+from .headers import (open_fits, extensions, dispersion_range,
+                      spectrum_extension)
+
+# Files scanned by default.
+FITS_PATTERNS = ('*.fits', '*.fit', '*.fts', '*.fits.gz')
+
+# Version of the index layout; indexes of another version are rebuilt.
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime REAL,
+    size INTEGER,
+    object TEXT,
+    instrument TEXT,
+    n_extensions INTEGER,
+    spectrum_ext INTEGER,
+    disp_min REAL,
+    disp_max REAL,
+    disp_unit TEXT,
+    layout TEXT
+);
+CREATE TABLE IF NOT EXISTS columns (
+    path TEXT,
+    ext INTEGER,
+    name TEXT,
+    unit TEXT
+);
+CREATE INDEX IF NOT EXISTS files_object ON files (object);
+CREATE INDEX IF NOT EXISTS files_instrument ON files (instrument);
+CREATE INDEX IF NOT EXISTS columns_path ON columns (path);
+CREATE INDEX IF NOT EXISTS columns_name ON columns (name);
+"""
+
+CatalogEntry = namedtuple('CatalogEntry', ['path', 'mtime', 'size', 'object',
+                                           'instrument', 'n_extensions',
+                                           'spectrum_ext', 'disp_min',
+                                           'disp_max', 'disp_unit',
+                                           'layout'])
+
+
+class Catalog(object):
+    """SQLite index of the FITS files of some directories.
+
+    Parameters
+    ----------
+    path: str
+        The index file. Defaults to ``catalog.sqlite`` in the cache.
+    """
+    def __init__(self, path=None):
+        self.path = path if path is not None else cache_path('catalog.sqlite')
+        with closing(self._connect()) as connection:
+            version = connection.execute('PRAGMA user_version').fetchone()[0]
+            if version != _SCHEMA_VERSION:
+                connection.executescript('DROP TABLE IF EXISTS files;'
+                                         'DROP TABLE IF EXISTS columns;')
+            connection.executescript(_SCHEMA)
+            connection.execute('PRAGMA user_version = {}'.format(
+                _SCHEMA_VERSION))
+            connection.commit()
+
+    def __len__(self):
+        with closing(self._connect()) as connection:
+            return connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def scan(self, directory, patterns=FITS_PATTERNS, recursive=True,
+             max_workers=None):
+        """Index the FITS files of `directory`.
+
+        Files already indexed with the same mtime are not read. Indexed
+        files that the scan covers, those of `directory` matching
+        `patterns`, but that no longer exist are dropped; files out of
+        the scan are left as they are.
+
+        Parameters
+        ----------
+        directory: str
+            Directory to scan.
+
+        patterns: [str,]
+            File name patterns to index.
+
+        recursive: bool
+            Scan the subdirectories too.
+
+        max_workers: int
+            Number of threads reading headers. Defaults to the number
+            of CPUs.
+
+        Returns
+        -------
+        (int, int)
+            The number of files indexed and dropped.
+        """
+        directory = os.path.abspath(directory)
+        # Compared as is: LIKE ignores case.
+        prefix = os.path.join(directory, '')
+        found = dict(_find_files(directory, patterns, recursive))
+
+        with closing(self._connect()) as connection:
+            indexed = dict(connection.execute(
+                'SELECT path, mtime FROM files WHERE substr(path, 1, ?) = ?',
+                (len(prefix), prefix)))
+
+        changed = [path for path, (mtime, _) in found.items()
+                   if indexed.get(path) != mtime]
+        removed = [path for path in indexed if path not in found and
+                   _in_scan(path, directory, patterns, recursive)]
+
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers or multiprocessing.cpu_count())
+        try:
+            summaries = [summary for summary in
+                         executor.map(_summarize, changed,
+                                      [found[path] for path in changed])
+                         if summary is not None]
+        finally:
+            executor.shutdown()
+
+        with closing(self._connect()) as connection:
+            stale = [(path,) for path in removed + changed]
+            connection.executemany('DELETE FROM files WHERE path = ?', stale)
+            connection.executemany('DELETE FROM columns WHERE path = ?',
+                                   stale)
+            connection.executemany(
+                'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [summary[0] for summary in summaries])
+            connection.executemany(
+                'INSERT INTO columns VALUES (?, ?, ?, ?)',
+                [column for summary in summaries for column in summary[1]])
+            connection.commit()
+
+        return len(summaries), len(removed)
+
+    def query(self, object=None, instrument=None, column=None,
+              wavelength=None, path=None, limit=None):
+        """Find indexed files.
+
+        The string criteria are case insensitive and accept the
+        wildcards ``*`` and ``?``.
+
+        Parameters
+        ----------
+        object, instrument: str
+            OBJECT and INSTRUME of the file.
+
+        column: str
+            Name of a table column the file has.
+
+        wavelength: float
+            A dispersion value the file covers, in its own unit.
+
+        path: str
+            Path of the file.
+
+        limit: int
+            Maximum number of results.
+
+        Returns
+        -------
+        [CatalogEntry,]
+            Sorted by path.
+        """
+        conditions, values = [], []
+        for name, pattern in (('object', object), ('instrument', instrument),
+                              ('path', path)):
+            if pattern:
+                conditions.append("{} LIKE ? ESCAPE '\\'".format(name))
+                values.append(_like_pattern(pattern))
+        if column:
+            conditions.append('path IN (SELECT path FROM columns '
+                              "WHERE name LIKE ? ESCAPE '\\')")
+            values.append(_like_pattern(column))
+        if wavelength is not None:
+            conditions.append('disp_min <= ? AND disp_max >= ?')
+            values.extend([wavelength, wavelength])
+
+        sql = 'SELECT * FROM files'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY path'
+        if limit is not None:
+            sql += ' LIMIT {:d}'.format(limit)
+
+        with closing(self._connect()) as connection:
+            return [_entry(row) for row in connection.execute(sql, values)]
+
+    def entry(self, path):
+        """The entry of `path`, or None if not indexed."""
+        with closing(self._connect()) as connection:
+            row = connection.execute('SELECT * FROM files WHERE path = ?',
+                                     (os.path.abspath(path),)).fetchone()
+        return None if row is None else _entry(row)
+
+    def _connect(self):
+        return sqlite3.connect(self.path)
+
+
+def _find_files(directory, patterns, recursive):
+    """Yield (path, (mtime, size)) of the matching files."""
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if _matches(name, patterns):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, (stat.st_mtime, stat.st_size)
+        if not recursive:
+            del dirs[:]
+
+
+def _in_scan(path, directory, patterns, recursive):
+    """Whether scanning `directory` looks for `path`."""
+    parent, name = os.path.split(path)
+    return _matches(name, patterns) and (recursive or parent == directory)
+
+
+def _matches(name, patterns):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+
+def _summarize(path, stat):
+    """Read the headers of `path` into rows of the files and columns tables.
+
+    Returns None, with a warning, for unreadable files.
+    """
+    mtime, size = stat
+    try:
+        with open_fits(path) as hdulist:
+            layout = extensions(hdulist)
+            headers = [hdu.header for hdu in hdulist]
+    except Exception as e:
+        warnings.warn('Cannot index {}: {}'.format(path, e))
+        return None
+
+    object_name = _first_keyword(headers, 'OBJECT')
+    instrument = _first_keyword(headers, 'INSTRUME')
+    spectrum_ext = spectrum_extension(layout)
+    disp_min = disp_max = disp_unit = None
+    if spectrum_ext is not None:
+        disp_min, disp_max, disp_unit = dispersion_range(
+            headers[spectrum_ext], layout[spectrum_ext])
+
+    file_row = (path, mtime, size, object_name, instrument, len(layout),
+                spectrum_ext, disp_min, disp_max, disp_unit,
+                json.dumps([ext._asdict() for ext in layout]))
+    column_rows = [(path, ext.index, name, unit)
+                   for ext in layout
+                   for name, unit in zip(ext.columns, ext.units)]
+    return file_row, column_rows
+
+
+def _first_keyword(headers, keyword):
+    for header in headers:
+        value = header.get(keyword)
+        if value not in (None, ''):
+            return str(value).strip()
+    return None
+
+
+def _entry(row):
+    entry = CatalogEntry(*row)
+    return entry._replace(layout=json.loads(entry.layout))
+
+
+def _like_pattern(pattern):
+    return _escape_like(pattern).replace('*', '%').replace('?', '_')
+
+
+def _escape_like(text):
+    return (text.replace('\\', '\\\\').replace('%', '\\%')
+            .replace('_', '\\_'))
@@ -7,13 +7,63 @@ controller = None
 
 
 def display_result(func):
-    """Display result of func immediately."""
+    """Display result of func immediately.
+
+    If func is marked `cpu_bound`, it is run by the controller's task
+    manager instead, and its result is displayed once ready. The task
+    is returned in place of the data item.
+
+    A func returning a list or tuple of data, or a SpectrumCollection,
+    has them added to the data tree at once and shown in one plot; the
+    data items are returned as a list.
+    """
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        result = func(*args, **kwargs)
-        item = controller.add_data_set(result)
-        controller.create_display(item)
-        return item
+        executor = getattr(func, 'executor', None)
+        if executor is not None:
+            return controller.tasks.submit(func, args, kwargs,
+                                           executor=executor,
+                                           name=func.__name__,
+                                           callback=_display)
 
+        return _display(func(*args, **kwargs))
+
+    wrapper.__wrapped__ = func
     return wrapper
+
+
+def cpu_bound(func=None, executor='thread'):
+    """Mark func to be run in a worker pool by `display_result`.
+
+    Parameters
+    ----------
+    executor: str
+        'thread' for functions that release the GIL, such as most
+        numpy operations, or 'process' for pure Python work. Functions
+        run in a process must be defined at module level and take and
+        return picklable objects.
+
+    Examples
+    --------
+    >>> @display_result
+    ... @cpu_bound(executor='process')
+    ... def smooth(spectrum_data, width=5):
+    ...     pass
+    """
+    def mark(func):
+        func.executor = executor
+        return func
+
+    if func is None:
+        return mark
+    return mark(func)
+
+
+def _display(result):
+    if isinstance(result, (list, tuple)):
+        item = controller.add_data_sets(result)
+    else:
+        item = controller.add_data_set(result)
+    controller.create_display(item)
+    return item
@@ -0,0 +1,184 @@
+"""FITS introspection from headers only
+
+Lists the extensions of a FITS file, their kind, shape, columns and
+units, and the dispersion range they cover, from the header keywords
+alone. No data array is read, so this is cheap even for large files.
+"""
+import os
+import threading
+from collections import namedtuple, OrderedDict
+
+from astropy.io import fits
+from astropy.io.fits.hdu.image import _ImageBaseHDU as FITS_image
+from astropy.io.fits.hdu.table import _TableLikeHDU as FITS_table
+
+Extension = namedtuple('Extension', ['index', 'name', 'kind', 'shape',
+                                     'columns', 'units'])
+Extension.__doc__ = """Layout of one extension
+
+index: int
+    Position in the file.
+name: str
+    EXTNAME, or PRIMARY.
+kind: str
+    'image', 'table', or None for an extension without data.
+shape: tuple
+    Shape of the data, in numpy order; the number of rows for tables.
+columns, units: [str,]
+    Column names and units (None when absent) of a table.
+"""
+
+# Column names taken as the dispersion axis of a table, in order.
+DISPERSION_COLUMNS = ('WAVELENGTH', 'WAVE', 'LAMBDA', 'LOGLAM', 'FREQUENCY')
+
+# Number of file layouts kept by `file_layout`.
+LAYOUT_CACHE_SIZE = 64
+
+# path -> (mtime, [Extension,]), most recently used last. Layouts are
+# read from several threads at once.
+_layouts = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+def open_fits(path):
+    """Open a FITS file memory mapped, reading headers as needed."""
+    try:
+        return fits.open(str(path), memmap=True, lazy_load_hdus=True)
+    except TypeError:
+        # astropy before 1.3 has no lazy_load_hdus.
+        return fits.open(str(path), memmap=True)
+
+
+def extensions(hdulist):
+    """Describe all the extensions of `hdulist` from their headers.
+
+    Returns
+    -------
+    [Extension,]
+    """
+    return [extension(index, hdu) for index, hdu in enumerate(hdulist)]
+
+
+def file_layout(path, hdulist=None):
+    """Describe the extensions of the file `path`, cached by mtime.
+
+    Parameters
+    ----------
+    path: str
+        The FITS file.
+
+    hdulist: HDUList
+        `path`, already open. Its headers are read if the layout is not
+        cached.
+
+    Returns
+    -------
+    [Extension,]
+    """
+    path = os.path.abspath(str(path))
+    mtime = os.path.getmtime(path)
+    with _layouts_lock:
+        cached = _layouts.get(path)
+    if cached is not None and cached[0] == mtime:
+        layout = cached[1]
+    elif hdulist is not None:
+        layout = extensions(hdulist)
+    else:
+        with open_fits(path) as hdulist:
+            layout = extensions(hdulist)
+
+    with _layouts_lock:
+        _layouts.pop(path, None)
+        _layouts[path] = (mtime, layout)
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+    return layout
+
+
+def extension(index, hdu):
+    """Describe the extension `hdu` at position `index`."""
+    header = hdu.header
+    naxis = header.get('NAXIS', 0)
+    shape = tuple(header.get('NAXIS{}'.format(axis), 0)
+                  for axis in range(naxis, 0, -1))
+
+    columns, units = [], []
+    if isinstance(hdu, FITS_table):
+        kind = 'table'
+        shape = (header.get('NAXIS2', 0),)
+        for field in range(1, header.get('TFIELDS', 0) + 1):
+            columns.append(header.get('TTYPE{}'.format(field),
+                                      'col{}'.format(field)))
+            units.append(header.get('TUNIT{}'.format(field)))
+    elif isinstance(hdu, FITS_image) and naxis > 0 and all(shape):
+        kind = 'image'
+    else:
+        kind = None
+
+    return Extension(index, hdu.name, kind, shape, columns, units)
+
+
+def dispersion_range(header, ext):
+    """Dispersion range covered by an extension, from header keywords.
+
+    Images use the linear WCS of their first axis, with the pixels
+    numbered as `read_image` does; tables the TDMIN and
+    TDMAX keywords of their dispersion column, when present.
+
+    Parameters
+    ----------
+    header: astropy.io.fits.Header
+        Header of the extension.
+
+    ext: Extension
+        The extension, as returned by `extension`.
+
+    Returns
+    -------
+    (float, float, str)
+        Minimum, maximum and unit; None for what is unknown.
+    """
+    if ext.kind == 'image' and len(ext.shape) == 1:
+        start = header.get('CRVAL1')
+        step = header.get('CDELT1', header.get('CD1_1'))
+        if start is None or step is None:
+            return None, None, None
+        # Pixels numbered from 0 in the 1-based WCS, as `read_image`
+        # does.
+        start = start - header.get('CRPIX1', 1.) * step
+        stop = start + (ext.shape[0] - 1) * step
+        return min(start, stop), max(start, stop), header.get('CUNIT1')
+
+    if ext.kind == 'table':
+        upper = [name.upper() for name in ext.columns]
+        for name in DISPERSION_COLUMNS:
+            if name in upper:
+                field = upper.index(name) + 1
+                return (header.get('TDMIN{}'.format(field)),
+                        header.get('TDMAX{}'.format(field)),
+                        ext.units[field - 1])
+
+    return None, None, None
+
+
+def spectrum_extension(layout):
+    """Index of the first extension a spectrum can be read from, or None.
+
+    That is a table with a dispersion column, else a 1D image.
+    """
+    for ext in layout:
+        if ext.kind == 'table' and dispersion_column(ext) is not None:
+            return ext.index
+    for ext in layout:
+        if ext.kind == 'image' and len(ext.shape) == 1:
+            return ext.index
+    return None
+
+
+def dispersion_column(ext):
+    """Name of the dispersion column of a table extension, or None."""
+    upper = [name.upper() for name in ext.columns]
+    for name in DISPERSION_COLUMNS:
+        if name in upper:
+            return ext.columns[upper.index(name)]
+    return None
@@ -0,0 +1,340 @@
+"""SAMP interoperability
+
+`SampClient` connects the viewer to a SAMP hub. It loads the spectra and
+tables that other applications send, with the standard messages:
+
+    spectrum.load.ssa-generic
+    table.load.fits
+    table.load.votable
+
+Standard messages name a file by URL, so the sender writes a file per
+spectrum and the receiver parses it again. Between applications on the
+same host, `SPECTRA_MTYPE` messages carry many spectra at once, as
+arrays in ``.npy`` files under `SHARED_DIR`, which the receiver memory
+maps instead of reading. Clients declare their host in their metadata,
+under `HOST_KEY`; `SampClient.send_spectra` uses the shared files with
+the clients of the same host, and standard messages with the others.
+
+The parameters of a `SPECTRA_MTYPE` message are:
+
+    x, y            paths of the dispersion, of shape (npix,) or
+                    (n, npix), and of the flux, of shape (n, npix)
+    variance        optional path of the variance of the flux
+    mask            optional path of the mask, True for bad values
+    x-unit, y-unit  units of the dispersion and flux
+    names           name of each spectrum
+    name            name of the batch
+    specview.host   host of the files
+
+The sender removes the files once the receiver replied; on POSIX, the
+receiver's maps stay valid.
+"""
+import itertools
+import os
+import socket
+import tempfile
+import warnings
+
+import numpy as np
+from astropy.io import fits
+
+try:
+    from urllib.parse import urlparse
+    from urllib.request import pathname2url, url2pathname
+except ImportError:
+    from urlparse import urlparse
+    from urllib import pathname2url, url2pathname
+
+from ..external.qt import QtCore
+from specview.core.data_objects import (SpectrumCollection,
+                                        variance_uncertainty)
+
+SPECTRUM_MTYPE = 'spectrum.load.ssa-generic'
+TABLE_MTYPES = ('table.load.fits', 'table.load.votable')
+SPECTRA_MTYPE = 'specview.spectra.load'
+
+# Metadata key of the host of a client, and the host of this one.
+HOST_KEY = 'specview.host'
+HOST = socket.gethostname()
+
+# Directory of the arrays shared with clients of the same host; memory
+# backed where available.
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else \
+    tempfile.gettempdir()
+
+# Seconds to wait for a receiver to load what was sent.
+SEND_TIMEOUT = 30
+
+
+class SampClient(QtCore.QObject):
+    """A SAMP client receiving, and sending, spectra.
+
+    Messages are received on the SAMP client's thread; what they hold is
+    handed to the GUI thread by `sig_received`.
+
+    Parameters
+    ----------
+    name: str
+        Name of the client on the hub.
+    """
+    # TODO: get rid of nasty try/excepts
+    try:
+        sig_received = QtCore.pyqtSignal(object, str)
+    except AttributeError:
+        sig_received = QtCore.Signal(object, str)
+
+    def __init__(self, name='specview'):
+        super(SampClient, self).__init__()
+        samp = _samp()
+        self.client = samp.SAMPIntegratedClient(
+            name=name, description='Spectrum viewer',
+            metadata={HOST_KEY: HOST})
+        self._files = itertools.count()
+
+    @property
+    def connected(self):
+        return self.client.is_connected
+
+    def connect(self, hub=None, **kwargs):
+        """Register with a hub, the running one if None.
+
+        Keyword arguments are passed to `SAMPIntegratedClient.connect`.
+        """
+        self.client.connect(hub=hub, **kwargs)
+        for mtype in (SPECTRUM_MTYPE, SPECTRA_MTYPE) + TABLE_MTYPES:
+            self.client.bind_receive_call(mtype, self._receive_call)
+            self.client.bind_receive_notification(mtype,
+                                                  self._receive_notification)
+
+    def disconnect(self):
+        if self.connected:
+            self.client.disconnect()
+
+    def send_spectra(self, spectra, name='Data', recipient=None,
+                     timeout=SEND_TIMEOUT):
+        """Send spectra to the clients that load them.
+
+        Clients of this host get all of them in one `SPECTRA_MTYPE`
+        message; the others one `spectrum.load.ssa-generic` message per
+        spectrum, with a FITS file.
+
+        Parameters
+        ----------
+        spectra: SpectrumCollection or [SpectrumData,]
+            The spectra; SpectrumData are stacked, so must be of the
+            same length and units.
+        name: str
+            Name of the batch; spectra are named `name`[i] unless the
+            collection has names.
+        recipient: str
+            Public id of the client to send to; all of them if None.
+        timeout: int
+            Seconds to wait for each client to load the spectra.
+
+        Returns
+        -------
+        dict
+            The response of each client, by public id. A client that
+            failed, or did not reply within `timeout`, gets an error
+            response; the others are still sent to, and clients of this
+            host fall back to standard messages.
+        """
+        if not isinstance(spectra, SpectrumCollection):
+            spectra = SpectrumCollection.from_spectra(spectra)
+        names = spectra.names or ['{}[{}]'.format(name, i)
+                                  for i in range(len(spectra))]
+
+        shared = [client_id for client_id in self._recipients(SPECTRA_MTYPE,
+                                                              recipient)
+                  if self.client.get_metadata(client_id).get(HOST_KEY) ==
+                  HOST]
+        responses = {}
+        if shared:
+            params, paths = self._share(spectra, names, name)
+            try:
+                for client_id in shared:
+                    responses[client_id] = self._call(client_id, SPECTRA_MTYPE,
+                                                      params, timeout)
+            finally:
+                _remove(paths)
+
+        # The others, and those that could not map the files.
+        standard = [client_id for client_id
+                    in self._recipients(SPECTRUM_MTYPE, recipient)
+                    if responses.get(client_id, {}).get('samp.status') !=
+                    'samp.ok']
+        if standard:
+            paths = [self._write_fits(spectra[i]) for i in range(len(spectra))]
+            try:
+                for client_id in standard:
+                    for path, spectrum_name in zip(paths, names):
+                        params = {'url': _file_url(path),
+                                  'name': spectrum_name}
+                        response = self._call(client_id, SPECTRUM_MTYPE,
+                                              params, timeout)
+                        responses[client_id] = response
+                        if response.get('samp.status') != 'samp.ok':
+                            break
+            finally:
+                _remove(paths)
+        return responses
+
+    # --- protected functions
+    def _call(self, client_id, mtype, params, timeout):
+        """The response of `client_id` to a call; an error response if
+        the call failed, or timed out."""
+        samp = _samp()
+        try:
+            return self.client.call_and_wait(
+                client_id, {'samp.mtype': mtype, 'samp.params': params},
+                str(timeout))
+        except (samp.SAMPProxyError, samp.SAMPHubError,
+                samp.SAMPClientError) as error:
+            return {'samp.status': 'samp.error',
+                    'samp.error': {'samp.errortxt': str(error)}}
+
+    def _recipients(self, mtype, recipient=None):
+        own_id = self.client.get_public_id()
+        return [client_id for client_id
+                in self.client.get_subscribed_clients(mtype)
+                if client_id != own_id and recipient in (None, client_id)]
+
+    def _receive_call(self, private_key, sender_id, msg_id, mtype, params,
+                      extra):
+        try:
+            self._receive(mtype, params)
+        except Exception as error:
+            self.client.reply(msg_id, {'samp.status': 'samp.error',
+                                       'samp.error': {'samp.errortxt':
+                                                      str(error)}})
+        else:
+            self.client.reply(msg_id, {'samp.status': 'samp.ok',
+                                       'samp.result': {}})
+
+    def _receive_notification(self, private_key, sender_id, mtype, params,
+                              extra):
+        try:
+            self._receive(mtype, params)
+        except Exception as error:
+            warnings.warn('Could not load {} message: {}'.format(mtype,
+                                                                 error))
+
+    def _receive(self, mtype, params):
+        if mtype == SPECTRA_MTYPE:
+            data = _map_spectra(params)
+            name = params.get('name', 'SAMP')
+        else:
+            url = params['url']
+            data = _load_url(url, mtype)
+            name = params.get('name') or params.get('spectrum-id') or \
+                params.get('table-id') or \
+                os.path.splitext(os.path.basename(urlparse(url).path))[0]
+        self.sig_received.emit(data, name)
+
+    def _share(self, spectra, names, name):
+        """Save the arrays of `spectra` in `SHARED_DIR`."""
+        prefix = os.path.join(SHARED_DIR, 'specview-{}-{}-'.format(
+            os.getpid(), next(self._files)))
+        arrays = {'x': spectra.x, 'y': spectra.y}
+        if spectra.uncertainty is not None:
+            arrays['variance'] = spectra.variance
+        if spectra.mask is not None:
+            arrays['mask'] = spectra.mask
+
+        params = {'x-unit': _unit_string(spectra.x_unit),
+                  'y-unit': _unit_string(spectra.y_unit),
+                  'names': list(names), 'name': name, HOST_KEY: HOST}
+        paths = []
+        try:
+            for key, values in arrays.items():
+                path = prefix + key + '.npy'
+                paths.append(path)
+                np.save(path, np.asarray(values))
+                params[key] = path
+        except Exception:
+            _remove(paths)
+            raise
+        return params, paths
+
+    def _write_fits(self, spectrum):
+        handle, path = tempfile.mkstemp(suffix='.fits')
+        os.close(handle)
+        columns = [fits.Column('WAVELENGTH', 'D',
+                               unit=_unit_string(spectrum.x.unit),
+                               array=spectrum.x.data),
+                   fits.Column('FLUX', 'D', unit=_unit_string(spectrum.y.unit),
+                               array=spectrum.y.data)]
+        fits.BinTableHDU.from_columns(columns).writeto(path, overwrite=True)
+        return path
+
+
+def _samp():
+    # astropy.vo.samp in old versions of astropy; pyvo.samp once it is
+    # removed from astropy.
+    try:
+        from astropy import samp
+    except ImportError:
+        try:
+            from astropy.vo import samp
+        except ImportError:
+            from pyvo import samp
+    return samp
+
+
+def _map_spectra(params):
+    """The spectra of a `SPECTRA_MTYPE` message, memory mapped."""
+    if params.get(HOST_KEY, HOST) != HOST:
+        raise ValueError('Spectra shared from another host.')
+
+    def load(key):
+        # Copy on write, so the sender's files are never modified.
+        return np.load(params[key], mmap_mode='c') if key in params else None
+
+    variance = load('variance')
+    uncertainty = None if variance is None else variance_uncertainty(variance)
+    spectra = SpectrumCollection(load('x'), load('y'),
+                                 x_unit=params.get('x-unit') or None,
+                                 y_unit=params.get('y-unit') or None,
+                                 uncertainty=uncertainty, mask=load('mask'),
+                                 names=params.get('names') or None)
+    if len(spectra) == 1:
+        return spectra[0]
+    return spectra
+
+
+def _load_url(url, mtype):
+    """The spectra of the file at `url`."""
+    from astropy.table import Table
+    from astropy.utils.data import download_file
+    from .preprocess import read_data, read_table
+
+    parsed = urlparse(url)
+    if parsed.scheme in ('', 'file'):
+        path, downloaded = url2pathname(parsed.path), False
+    else:
+        path, downloaded = download_file(url, cache=False), True
+
+    try:
+        if mtype == 'table.load.votable':
+            table = Table.read(path, format='votable')
+            return read_table(fits.table_to_hdu(table).data)
+        return read_data(path)
+    finally:
+        if downloaded:
+            _remove([path])
+
+
+def _file_url(path):
+    return 'file://' + pathname2url(os.path.abspath(path))
+
+
+def _unit_string(unit):
+    return '' if unit is None else str(unit)
+
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,9 +1,31 @@
-"""Plugin loading machinery"""
+"""Plugin loading machinery
+
+Plugin modules are found by listing the package directories; they are not
+imported to be found. The names of the functions each module exposes are
+kept in a manifest, keyed on the mtime of the module file, so that a
+module is only imported the first time one of its functions is called,
+or when its file changed since the manifest was written.
+
+Installed distributions can also provide plugins through the
+``specview.plugins`` entry point group. An entry point naming a function,
+``name = module:function``, is loaded when first called. An entry point
+naming a module, ``name = module``, is handled like a discovered module.
+"""
 import importlib
+import json
+import os
 import pkgutil
-from inspect import getmembers, isfunction
+import warnings
+from inspect import getdoc, getmembers, isfunction
 
 from ..core.log import Register
+from .cache import cache_path, replace
+
+ENTRY_POINT_GROUP = 'specview.plugins'
+
+# Version of the manifest layout; manifests of another version are ignored.
+_MANIFEST_VERSION = 1
+
 
 def plugins(namespace):
     """Return plugins as specifically designed for the specview package
@@ -22,11 +44,13 @@ def plugins(namespace):
 
     return Plugins(package=plugin_pkg,
                    namespace=namespace,
-                   submodule=submodule)
+                   submodule=submodule,
+                   entry_point_group=ENTRY_POINT_GROUP,
+                   manifest=cache_path('plugins.json'))
 
 
 class Plugins(object):
-    """Import a set of modules and set the defined functions as methods.
+    """Find a set of modules and set the defined functions as methods.
 
     Parameters
     ----------
@@ -39,25 +63,249 @@ class Plugins(object):
     submodule: str
         Submodule to place the namespace.
 
+    entry_point_group: str
+        Entry point group declaring further plugins. If None,
+        entry points are not searched.
+
+    manifest: str
+        Path of the manifest cache. If None, every module is imported
+        to find its functions.
+
     Attributes
     ----------
-    All the functions in the imported modules.
+    All the functions in the found modules, as `PluginFunction`.
     """
-    def __init__(self, package, namespace=None, submodule=None):
+    def __init__(self, package, namespace=None, submodule=None,
+                 entry_point_group=None, manifest=None):
+        self._namespace = namespace if namespace is not None else {}
+        self._submodule = submodule
+        self._manifest_path = manifest
+
+        modules = find_submodules(package)
+        functions = []
+        if entry_point_group is not None:
+            ep_modules, functions = _entry_points(entry_point_group)
+            modules.extend(ep_modules)
+
         # Gather functions
-        modules = import_submodules(package=package,
-                                    namespace=namespace,
-                                    submodule=submodule)
-        funcs = [(name, Register(namespace['controller'], func_name=name)(func))
-                 for module in modules.itervalues()
-                 for (name, func) in getmembers(module, isfunction)
-                 if not name.startswith('_')]
+        funcs = []
+        for module_name, names in self._module_functions(modules):
+            for name, doc in names:
+                funcs.append((name, PluginFunction(
+                    name, self._module_loader(module_name, name), doc)))
+        for name, entry_point in functions:
+            funcs.append((name, PluginFunction(
+                name, self._entry_point_loader(entry_point))))
 
         # Make functions available.
         for name, func in funcs:
             setattr(self, name, func)
         self.namespace = funcs
 
+    def _module_functions(self, modules):
+        """Return (module name, [(function name, doc),]) for each module.
+
+        Modules whose manifest entry is up to date are not imported.
+        """
+        manifest = self._read_manifest()
+        updated = {}
+        result = []
+        for module_name, path in modules:
+            try:
+                mtime = os.path.getmtime(path)
+            except (OSError, TypeError):
+                mtime = None
+
+            entry = manifest.get(module_name)
+            if (entry is None or mtime is None or
+                    entry['path'] != path or entry['mtime'] != mtime):
+                module = self._import(module_name)
+                entry = {'path': path,
+                         'mtime': mtime,
+                         'functions': [(name, getdoc(func))
+                                       for (name, func)
+                                       in getmembers(module, isfunction)
+                                       if not name.startswith('_')]}
+            updated[module_name] = entry
+            result.append((module_name,
+                           [tuple(f) for f in entry['functions']]))
+
+        if updated != manifest:
+            self._write_manifest(updated)
+
+        return result
+
+    def _import(self, module_name):
+        module = importlib.import_module(module_name)
+        _set_namespace(module, self._namespace, self._submodule)
+        return module
+
+    def _module_loader(self, module_name, name):
+        def load():
+            return self._register(name,
+                                  getattr(self._import(module_name), name))
+        return load
+
+    def _entry_point_loader(self, entry_point):
+        def load():
+            func = entry_point.load()
+            module = importlib.import_module(func.__module__)
+            _set_namespace(module, self._namespace, self._submodule)
+            return self._register(entry_point.name, func)
+        return load
+
+    def _register(self, name, func):
+        controller = self._namespace.get('controller')
+        return Register(controller, func_name=name)(func)
+
+    def _read_manifest(self):
+        if self._manifest_path is None:
+            return {}
+        try:
+            with open(self._manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        except (IOError, OSError, ValueError):
+            return {}
+        if manifest.get('version') != _MANIFEST_VERSION:
+            return {}
+        return manifest.get('modules', {})
+
+    def _write_manifest(self, modules):
+        if self._manifest_path is None:
+            return
+        tmp_path = self._manifest_path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as manifest_file:
+                json.dump({'version': _MANIFEST_VERSION, 'modules': modules},
+                          manifest_file)
+            replace(tmp_path, self._manifest_path)
+        except (IOError, OSError) as e:
+            warnings.warn('Cannot write plugin manifest {}: {}'.format(
+                self._manifest_path, e))
+
+
+class PluginFunction(object):
+    """Stand-in for a plugin function, loaded when first called.
+
+    Parameters
+    ----------
+    name: str
+        Name of the function.
+
+    loader: callable
+        Returns the actual function.
+
+    doc: str
+        Docstring to show until the function is loaded.
+    """
+    def __init__(self, name, loader, doc=None):
+        self.__name__ = name
+        self.__doc__ = doc
+        self._loader = loader
+        self._func = None
+
+    @property
+    def func(self):
+        """The actual function, importing its module if needed."""
+        if self._func is None:
+            self._func = self._loader()
+            self.__doc__ = self._func.__doc__
+        return self._func
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        state = 'loaded' if self._func is not None else 'not loaded'
+        return '<plugin function {} ({})>'.format(self.__name__, state)
+
+
+def find_submodules(package, recursive=True):
+    """List all submodules of a package without importing them.
+
+    Parameters
+    ----------
+    package: str | module
+        The package, by name or the actual module. The package itself
+        is imported to get its search path.
+
+    recursive: bool
+        Include subpackages and their modules.
+
+    Returns
+    -------
+    [(str, str),]
+        Full module name and source file, for each submodule.
+    """
+    if isinstance(package, str):
+        package = importlib.import_module(package)
+    return _find_submodules(package.__name__, package.__path__, recursive)
+
+
+def _find_submodules(package_name, search_path, recursive):
+    results = []
+    for directory in search_path:
+        for _, name, is_pkg in pkgutil.iter_modules([directory]):
+            full_name = package_name + '.' + name
+            if is_pkg:
+                sub_path = os.path.join(directory, name)
+                results.append((full_name, _package_file(sub_path)))
+                if recursive:
+                    results.extend(_find_submodules(full_name, [sub_path],
+                                                    recursive))
+            else:
+                results.append((full_name, _module_file(directory, name)))
+    return results
+
+
+def _package_file(directory):
+    return _module_file(directory, '__init__')
+
+
+def _module_file(directory, name):
+    for suffix in ('.py', '.pyc'):
+        path = os.path.join(directory, name + suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _entry_points(group):
+    """Return ([(module name, file)], [(function name, entry point)])."""
+    try:
+        import pkg_resources
+    except ImportError:
+        return [], []
+
+    modules = []
+    functions = []
+    for entry_point in pkg_resources.iter_entry_points(group):
+        if entry_point.attrs:
+            functions.append((entry_point.name, entry_point))
+        else:
+            modules.append((entry_point.module_name,
+                            _find_module_file(entry_point.module_name)))
+    return modules, functions
+
+
+def _find_module_file(module_name):
+    try:
+        from importlib.util import find_spec
+    except ImportError:
+        loader = pkgutil.find_loader(module_name)
+        return None if loader is None else loader.get_filename()
+    spec = find_spec(module_name)
+    return None if spec is None else spec.origin
+
+
+def _set_namespace(module, namespace, submodule):
+    """Update the namespace of `module`, or of its attribute `submodule`."""
+    try:
+        ns_module = getattr(module, submodule)
+    except (AttributeError, TypeError):
+        ns_module = module
+    ns_module.__dict__.update(namespace)
+
 
 def import_submodules(package, recursive=True, namespace=None, submodule=None):
     """ Import all submodules of a module, recursively, including subpackages
@@ -66,19 +314,9 @@ def import_submodules(package, recursive=True, namespace=None, submodule=None):
     :type package: str | module
     :rtype: dict[str, types.ModuleType]
     """
-    if isinstance(package, str):
-        package = importlib.import_module(package)
     results = {}
-    for loader, name, is_pkg in pkgutil.walk_packages(package.__path__):
-        full_name = package.__name__ + '.' + name
+    for full_name, _ in find_submodules(package, recursive=recursive):
         results[full_name] = importlib.import_module(full_name)
-        try:
-            ns_module = getattr(results[full_name], submodule)
-        except AttributeError:
-            ns_module = results[full_name]
-        ns_module.__dict__.update(namespace)
-        if recursive and is_pkg:
-            results.update(import_submodules(full_name,
-                                             namespace=namespace,
-                                             submodule=submodule))
+        if namespace is not None:
+            _set_namespace(results[full_name], namespace, submodule)
     return results
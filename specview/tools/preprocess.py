@@ -1,21 +1,91 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
 import warnings
+from collections import namedtuple, OrderedDict
+
+import numpy as np
+from astropy.nddata import StdDevUncertainty
 from astropy.wcs import WCS
-from astropy.io import fits
 from astropy.io.fits.hdu.image import _ImageBaseHDU as FITS_image
-from astropy.io.fits.hdu.table import _TableLikeHDU as FITS_table
-from specview.core import SpectrumData
+from specview.core import SpectrumData, SpectrumCollection
+from specview.core.grid import Grid
+from specview.core.masks import DQMask
+from specview.core.data_objects import (SpectrumArray, variance_uncertainty,
+                                        inverse_variance_uncertainty,
+                                        native_byteorder)
+from specview.tools.cache import cache_path, replace
+from specview.tools import ascii
+from specview.tools.headers import (open_fits, file_layout, dispersion_column,
+                                    DISPERSION_COLUMNS)
 
 DEFAULT_FLUX_UNIT = 'count'
 DEFAULT_DISPERSION_UNIT = 'pixel'
+SDSS_FLUX_UNIT = '1e-17 erg / (s cm2 Angstrom)'
+DEEP2_FLUX_UNIT = 'ct/h'
+
+# Halves of a DEEP2 spec1d file, in extension order.
+DEEP2_HALVES = ('blue', 'red')
+
+# Column and extension names recognized as uncertainties, by kind:
+# 'std' for standard deviations, 'var' for variances and 'ivar' for
+# inverse variances.
+UNCERTAINTY_NAMES = (('IVAR', 'ivar'), ('INVVAR', 'ivar'),
+                     ('IVARIANCE', 'ivar'),
+                     ('ERROR', 'std'), ('ERR', 'std'), ('SIGMA', 'std'),
+                     ('STDDEV', 'std'),
+                     ('VAR', 'var'), ('VARIANCE', 'var'))
+
+# Column and extension names recognized as data quality flags. Any
+# non-zero flag masks the value, unless other bits are selected; see
+# `specview.core.masks`.
+MASK_NAMES = ('DQ', 'MASK', 'FLAGS', 'QUALITY')
+
+# Name of the flag plane of zero inverse variance values.
+ZERO_WEIGHT = 'ZERO_WEIGHT'
+
+# Bits of the SDSS AND_MASK and OR_MASK pixel masks.
+SDSS_MASK_BITS = dict((name, 1 << bit) for bit, name in (
+    (0, 'NOPLUG'), (1, 'BADTRACE'), (2, 'BADFLAT'), (3, 'BADARC'),
+    (4, 'MANYBADCOLUMNS'), (5, 'MANYREJECTED'), (6, 'LARGESHIFT'),
+    (16, 'NEARBADPIXEL'), (17, 'LOWFLAT'), (18, 'FULLREJECT'),
+    (19, 'PARTIALREJECT'), (20, 'SCATTEREDLIGHT'), (21, 'CROSSTALK'),
+    (22, 'NOSKY'), (23, 'BRIGHTSKY'), (24, 'NODATA'), (25, 'COMBINEREJ'),
+    (26, 'BADFLUXFACTOR'), (27, 'BADSKYCHI'), (28, 'REDMONSTER')))
+
+# DEEP2 spec1d flag columns; only BITMASK rejects by default.
+DEEP2_MASK_COLUMNS = ('BITMASK', 'ORMASK', 'INFOMASK')
 
 
-def read_image(image, flux_unit=None, dispersion_unit=None, **kwargs):
+def read_image(image, flux_unit=None, dispersion_unit=None, hdulist=None,
+               uncertainty=None, uncertainty_type=None, mask=None,
+               **kwargs):
     """Read 1D image
 
     Parameters
     ----------
     image: FITS Image HDU
 
+    hdulist: FITS HDUList
+             File containing `image`. Searched for extensions with the
+             uncertainty and data quality of `image`.
+
+    uncertainty: str | int
+                 Name or index in `hdulist` of the extension of the
+                 uncertainty. If None, the first extension named as in
+                 `UNCERTAINTY_NAMES` is used.
+
+    uncertainty_type: str
+                      'std', 'var' or 'ivar'. If None, derived from the
+                      extension name.
+
+    mask: str | int
+          Name or index in `hdulist` of the extension of the data
+          quality flags. If None, the first extension named as in
+          `MASK_NAMES` is used.
+
     Returns
     -------
     SpectrumData
@@ -29,19 +99,37 @@ def read_image(image, flux_unit=None, dispersion_unit=None, **kwargs):
         raise RuntimeError('Attempting to read an image with more than one '
                            'dimension.')
     wcs = WCS(image.header)
+    shape = image.data.shape
+    error, error_type, flags = None, None, (None, None)
+    if hdulist is not None:
+        hdus = [hdu for hdu in hdulist
+                if hdu is not image and isinstance(hdu, FITS_image)]
+        error, error_type = _find_uncertainty(
+            hdus, uncertainty, uncertainty_type,
+            lambda hdu: hdu.name, lambda hdu: hdu.data, shape, hdulist)
+        flags = _find_mask(hdus, mask, lambda hdu: hdu.name,
+                           lambda hdu: hdu.data, shape, hdulist)
+
     spectrum = SpectrumData()
     unit = flux_unit if flux_unit else DEFAULT_FLUX_UNIT
-    spectrum.set_y(image.data, unit=unit)
+    spectrum.set_y(image.data, unit=unit,
+                   uncertainty=_uncertainty(error, error_type))
     unit = wcs.wcs.cunit[0] if not dispersion_unit else dispersion_unit
-    spectrum.set_x(wcs.all_pix2world(range(image.data.shape[0]), 1)[0],
-                   unit=unit)
+    # Linear dispersions are kept parametric.
+    dispersion = Grid.from_wcs(wcs, shape[0])
+    if dispersion is None:
+        dispersion = wcs.all_pix2world(range(shape[0]), 1)[0]
+    spectrum.set_x(dispersion, unit=unit)
+    # Dispersion and flux share the mask, to stay of the same length.
+    spectrum.dq = _dq([flags], error, error_type)
 
     return spectrum
 
 
 def read_table(table,
                flux='flux', dispersion='wavelength',
-               flux_unit=None, dispersion_unit=None):
+               flux_unit=None, dispersion_unit=None,
+               uncertainty=None, uncertainty_type=None, mask=None):
     """Read FITS table
 
     Parameters
@@ -60,9 +148,24 @@ def read_table(table,
     flux_unit: str
                Unit of flux
 
+    uncertainty: str | int
+                 Name or index of column containing the flux
+                 uncertainty. If None, the first column named as in
+                 `UNCERTAINTY_NAMES` is used.
+
+    uncertainty_type: str
+                      'std', 'var' or 'ivar'. If None, derived from the
+                      column name.
+
+    mask: str | int
+          Name or index of column containing data quality flags. If
+          None, the first column named as in `MASK_NAMES` is used.
+
     Returns
     -------
     SpectrumData
+        Or, for a table of one spectrum per row in array columns, a
+        SpectrumCollection.
     '"""
     if dispersion_unit is None:
         try:
@@ -79,45 +182,883 @@ def read_table(table,
         except ValueError:
             flux_unit = DEFAULT_FLUX_UNIT
 
+    columns = [name for name in table.names
+               if name.upper() not in (flux.upper(), dispersion.upper())]
+    error, error_type = _find_uncertainty(columns, uncertainty,
+                                          uncertainty_type,
+                                          lambda name: name,
+                                          lambda name: table[name],
+                                          items=table.names)
+    flags = _find_mask(columns, mask, lambda name: name,
+                       lambda name: table[name], items=table.names)
+
+    dq = _dq([flags], error, error_type)
+    if np.ndim(table[flux]) == 2:
+        return _table_collection(table[dispersion], table[flux],
+                                 dispersion_unit, flux_unit,
+                                 _uncertainty(error, error_type),
+                                 None if dq is None else dq.mask)
+
     spectrum = SpectrumData()
     spectrum.set_x(table[dispersion], unit=dispersion_unit)
-    spectrum.set_y(table[flux], unit=flux_unit)
+    spectrum.set_y(table[flux], unit=flux_unit,
+                   uncertainty=_uncertainty(error, error_type))
+    # Dispersion and flux share the mask, to stay of the same length.
+    spectrum.dq = dq
 
     return spectrum
 
 
-def read_data(file_name, ext=None, **kwargs):
-    """Simple function to read in a file and retrieve extensions that
-    contain data.
+def _table_collection(x, y, x_unit, y_unit, uncertainty, mask):
+    """Spectra of the rows of a table, as a collection.
+
+    A single row gives a SpectrumData. The dispersion is shared if it
+    is the same in all rows.
+    """
+    x = np.asanyarray(x)
+    if x.ndim == 2 and (x == x[:1]).all():
+        x = x[0]
+    collection = SpectrumCollection(x, y, x_unit=x_unit, y_unit=y_unit,
+                                    uncertainty=uncertainty, mask=mask)
+    if len(collection) == 1:
+        return collection[0]
+    return collection
+
+
+def read_data(file_name, ext=None, hdulist=None, format=None, cache=False,
+              **kwargs):
+    """Read a spectrum with the reader registered for its format.
 
     Parameters
     ----------
     file_name : str
-        File name of FITS data object.
+        File name of the data.
 
     ext: int
-        Extension to read. If none, the first one with data will be used.
+        Extension to read. If none, the one picked by the format is used.
+
+    hdulist: FITS HDUList
+        `file_name`, already open, so that it is not parsed again.
+
+    format: str
+        Name of the registered format to read with. If None, the format
+        is identified from the headers; see `identify`.
+
+    cache: bool
+        Keep the values in native byte order in a sidecar cache, keyed
+        by path, mtime, extension and reader arguments. When the cache
+        is current, it is memory mapped instead of reading the file.
+
+    kwargs: dict
+        Keyword arguments to pass to the reader. Those set to None are
+        dropped.
+    """
+    kwargs = dict((key, value) for key, value in kwargs.items()
+                  if value is not None)
+    source = DataSource(file_name, hdulist)
+
+    if format is None:
+        format, found_ext = identify(file_name, ext=ext, source=source)
+        if format is None:
+            raise RuntimeError('File {} does not contain any supported 1D '
+                               'format.'.format(file_name))
+        ext = found_ext if ext is None else ext
+
+    if not cache:
+        return _formats[format].reader(source, ext, **kwargs)
+
+    sidecar = _Sidecar(file_name, format, ext, kwargs)
+    spectrum = sidecar.load()
+    if spectrum is None:
+        spectrum = _formats[format].reader(source, ext, **kwargs)
+        if not isinstance(spectrum, SpectrumData):
+            return spectrum
+        try:
+            sidecar.save(spectrum)
+        except (IOError, OSError) as e:
+            warnings.warn('Cannot cache {}: {}'.format(file_name, e))
+            return spectrum
+        spectrum = sidecar.load()
+    return spectrum
+
+
+class _Sidecar(object):
+    """Native byte order copy of what a reader returned for a file.
+
+    A directory in the cache, named after the path, format, extension
+    and reader arguments, holds one .npy file per array, and their
+    units and the grid of a parametric dispersion. It is current if the
+    file's mtime did not change.
+    """
+    _arrays = ('x', 'y', 'mask', 'uncertainty')
+
+    def __init__(self, file_name, format, ext, kwargs):
+        self.path = os.path.abspath(str(file_name))
+        key = json.dumps([self.path, format, ext, sorted(kwargs.items())],
+                         default=str)
+        self.directory = cache_path(
+            'native', hashlib.sha1(key.encode('utf-8')).hexdigest(), '')
+
+    def load(self):
+        """The cached spectrum, memory mapped, or None if not current."""
+        try:
+            with open(os.path.join(self.directory, 'meta.json')) as f:
+                meta = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if meta['mtime'] != os.path.getmtime(self.path):
+            return None
+
+        arrays = dict((name, np.load(os.path.join(self.directory,
+                                                  name + '.npy'),
+                                     mmap_mode='r'))
+                      for name in meta['arrays'])
+        mask = arrays.get('mask')
+        x = arrays['x'] if meta.get('x_grid') is None else \
+            Grid(**meta['x_grid'])
+        spectrum = SpectrumData()
+        spectrum.set_x(x, unit=meta['x_unit'], mask=mask)
+        spectrum.set_y(arrays['y'], unit=meta['y_unit'], mask=mask,
+                       uncertainty=_uncertainty(arrays.get('uncertainty'),
+                                                meta['uncertainty_type']))
+        if meta.get('dq') is not None:
+            planes = OrderedDict(
+                (name, arrays['dq_{}'.format(i)])
+                for i, name in enumerate(meta['dq']['planes']))
+            spectrum.dq = DQMask(planes, meta['dq']['reject'],
+                                 meta['dq']['bit_names'])
+        return spectrum
+
+    def save(self, spectrum):
+        x, y = spectrum.x, spectrum.y
+        # Parametric dispersions are kept as such.
+        arrays = {'x': None if x.grid is not None else
+                  super(SpectrumArray, x).data,
+                  'y': super(SpectrumArray, y).data,
+                  'mask': y.mask}
+        uncertainty_type = None
+        if y.uncertainty is not None:
+            arrays['uncertainty'] = y.uncertainty.array
+            uncertainty_type = y.uncertainty.uncertainty_type
+
+        # Flags are kept as such, rather than as the mask they give.
+        dq = None
+        if spectrum.dq is not None:
+            del arrays['mask']
+            planes = spectrum.dq.planes
+            for i, flags in enumerate(planes.values()):
+                arrays['dq_{}'.format(i)] = flags
+            dq = {'planes': list(planes), 'reject': spectrum.dq.reject,
+                  'bit_names': spectrum.dq.bit_names}
+
+        mtime = os.path.getmtime(self.path)
+        names = [name for name in self._arrays if arrays.get(name) is not None]
+        names += sorted(name for name in arrays if name.startswith('dq_'))
+        for name in names:
+            file_name = os.path.join(self.directory, name + '.npy')
+            with open(file_name + '.tmp', 'wb') as f:
+                np.save(f, native_byteorder(arrays[name]))
+            replace(file_name + '.tmp', file_name)
+
+        meta = {'mtime': mtime,
+                'arrays': names,
+                'x_grid': None if x.grid is None else x.grid.to_dict(),
+                'x_unit': _unit_string(x.unit),
+                'y_unit': _unit_string(y.unit),
+                'uncertainty_type': uncertainty_type,
+                'dq': dq}
+        meta_name = os.path.join(self.directory, 'meta.json')
+        with open(meta_name + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        replace(meta_name + '.tmp', meta_name)
+
+
+def _unit_string(unit):
+    return None if unit is None else unit.to_string()
+
+
+# --- Format registry
+#
+# Each format has a sniffer that tells, from headers only, whether it
+# can read a file, and which extension to read. The reader is then
+# called with that extension.
+
+Format = namedtuple('Format', ['name', 'sniffer', 'reader', 'priority'])
+
+# name -> Format
+_formats = OrderedDict()
+
+# Number of files whose format is kept by `identify`.
+IDENTIFY_CACHE_SIZE = 256
+
+# (path, ext) -> (mtime, (format name, ext)), most recently used last.
+# Files are identified from several threads at once.
+_identified = OrderedDict()
+_identified_lock = threading.Lock()
+
+
+def register_format(name, sniffer, reader, priority=0):
+    """Register a file format for `read_data`.
+
+    Parameters
+    ----------
+    name: str
+        Name of the format. Registering a name again replaces the
+        format.
+
+    sniffer: callable
+        `sniffer(source, ext)` returns the index of the extension to
+        read, 0 for files without extensions, or None if it cannot
+        read `source`, a `DataSource`. `ext` is the extension asked
+        for, or None. Sniffers must not read data arrays.
+
+    reader: callable
+        `reader(source, ext, **kwargs)` returns the SpectrumData.
+        Should accept, and ignore, keyword arguments it does not use.
+
+    priority: int
+        Sniffers are tried by decreasing priority; generic formats use
+        0, more specific ones higher values.
+    """
+    _formats[name] = Format(name, sniffer, reader, priority)
+    with _identified_lock:
+        _identified.clear()
+
+
+def formats():
+    """Registered formats, in the order their sniffers are tried."""
+    # sorted() is stable: equal priorities stay in registration order.
+    return sorted(_formats.values(), key=lambda f: -f.priority)
+
+
+def identify(file_name, ext=None, source=None):
+    """Find the format of a file, from its headers only.
+
+    Results are cached per path and modification time.
+
+    Returns
+    -------
+    (str, int)
+        Format name and extension to read, or (None, None).
+    """
+    path = os.path.abspath(str(file_name))
+    mtime = os.path.getmtime(path)
+    with _identified_lock:
+        cached = _identified.get((path, ext))
+    if cached is not None and cached[0] == mtime:
+        result = cached[1]
+    else:
+        source = source if source is not None else DataSource(file_name)
+        result = (None, None)
+        for file_format in formats():
+            try:
+                found = file_format.sniffer(source, ext)
+            except Exception as e:
+                warnings.warn('File {}: sniffing {} failed: {}'.format(
+                    file_name, file_format.name, e))
+                continue
+            if found is not None:
+                result = (file_format.name, found)
+                break
+
+    with _identified_lock:
+        _identified.pop((path, ext), None)
+        _identified[(path, ext)] = (mtime, result)
+        while len(_identified) > IDENTIFY_CACHE_SIZE:
+            _identified.popitem(last=False)
+    return result
+
+
+class DataSource(object):
+    """A file to sniff and read, opened on demand.
+
+    Parameters
+    ----------
+    file_name: str
+        The file.
+
+    hdulist: FITS HDUList
+        The file, already open.
+    """
+    def __init__(self, file_name, hdulist=None):
+        self.path = str(file_name)
+        self._hdulist = hdulist
+        self._is_fits = True if hdulist is not None else None
+
+    @property
+    def is_fits(self):
+        """Whether the file is a FITS file, from its first bytes."""
+        if self._is_fits is None:
+            if self.path.endswith('.gz'):
+                opener = gzip.open
+            else:
+                opener = open
+            try:
+                with opener(self.path, 'rb') as f:
+                    self._is_fits = f.read(9) == b'SIMPLE  ='
+            except (IOError, OSError):
+                self._is_fits = False
+        return self._is_fits
+
+    @property
+    def hdulist(self):
+        """The FITS file, memory mapped."""
+        if self._hdulist is None:
+            self._hdulist = open_fits(self.path)
+        return self._hdulist
+
+    @property
+    def layout(self):
+        """[Extension,] of the FITS file, from the headers."""
+        return file_layout(self.path, self._hdulist)
+
+    def header(self, ext):
+        return self.hdulist[ext].header
+
+
+# --- Sniffers and readers of the built-in formats
+
+def _sniff_image(source, ext):
+    if not source.is_fits:
+        return None
+    for candidate in _candidates(source, ext):
+        if candidate.kind == 'image' and len(candidate.shape) == 1:
+            return candidate.index
+    return None
+
+
+def _read_image(source, ext, **kwargs):
+    return read_image(source.hdulist[ext], hdulist=source.hdulist, **kwargs)
+
+
+def _sniff_table(source, ext):
+    if not source.is_fits:
+        return None
+    for candidate in _candidates(source, ext):
+        if candidate.kind == 'table' and (
+                ext is not None or
+                (_column(candidate, 'FLUX') is not None and
+                 dispersion_column(candidate) is not None)):
+            return candidate.index
+    return None
+
+
+def _read_table(source, ext, **kwargs):
+    layout = source.layout[ext]
+    kwargs.setdefault('dispersion',
+                      dispersion_column(layout) or 'wavelength')
+    kwargs.setdefault('flux', _column(layout, 'FLUX') or 'flux')
+    return read_table(source.hdulist[ext].data, **kwargs)
+
+
+def _sniff_hst_x1d(source, ext):
+    """STIS and COS extracted spectra: x1d and sx1 files."""
+    if not source.is_fits:
+        return None
+    primary = source.header(0)
+    if primary.get('TELESCOP') != 'HST' or \
+            primary.get('INSTRUME') not in ('STIS', 'COS'):
+        return None
+    for candidate in _candidates(source, ext if ext is not None else 1):
+        if candidate.kind == 'table' and \
+                all(_column(candidate, name) is not None
+                    for name in ('WAVELENGTH', 'FLUX')):
+            return candidate.index
+    return None
+
+
+def _read_hst_x1d(source, ext, flux_unit=None, dispersion_unit=None,
+                  merge=True, **kwargs):
+    """Orders and segments, one per row, are merged by wavelength.
+
+    Parameters
+    ----------
+    merge: bool
+        If False, a file of several rows is read as a SpectrumCollection
+        of one spectrum per order or segment.
+    """
+    hdu = source.hdulist[ext]
+    layout = source.layout[ext]
+    table = hdu.data
+
+    wavelength = np.ravel(table.field('WAVELENGTH'))
+    order = None
+    if len(table) > 1 and not merge:
+        wavelength = table.field('WAVELENGTH')
+    elif len(table) > 1:
+        order = np.argsort(wavelength, kind='mergesort')
+        wavelength = wavelength[order]
+
+    def column(name):
+        if not merge:
+            return table.field(name)
+        values = np.ravel(table.field(name))
+        return values if order is None else values[order]
+
+    error = column('ERROR') if _column(layout, 'ERROR') else None
+    dq = None
+    if _column(layout, 'DQ'):
+        # Only the flags the pipeline deems serious, when it says so.
+        serious = hdu.header.get('SDQFLAGS')
+        dq = _dq([('DQ', column('DQ'))], None, None,
+                 reject=None if serious is None else {'DQ': int(serious)})
+
+    dispersion_unit = dispersion_unit or _column_unit(layout, 'WAVELENGTH',
+                                                      'Angstrom')
+    flux_unit = flux_unit or _column_unit(layout, 'FLUX', DEFAULT_FLUX_UNIT)
+    if wavelength.ndim == 2:
+        return _table_collection(wavelength, column('FLUX'), dispersion_unit,
+                                 flux_unit, _uncertainty(error, 'std'),
+                                 None if dq is None else dq.mask)
+
+    spectrum = SpectrumData()
+    spectrum.set_x(wavelength, unit=dispersion_unit)
+    spectrum.set_y(column('FLUX'), unit=flux_unit,
+                   uncertainty=_uncertainty(error, 'std'))
+    spectrum.dq = dq
+    return spectrum
+
+
+def _sniff_deep2(source, ext):
+    """DEEP2 spec1d files: blue and red tables of SPEC, LAMBDA and IVAR."""
+    if not source.is_fits:
+        return None
+    for candidate in _candidates(source, ext if ext is not None else 1):
+        if candidate.kind == 'table' and \
+                all(_column(candidate, name) is not None
+                    for name in ('SPEC', 'LAMBDA', 'IVAR')):
+            return candidate.index
+    return None
+
+
+def _read_deep2(source, ext, halves='stitched', **kwargs):
+    """Read the half in `ext`, stitched to the next one if any."""
+    exts = [index for index in (ext, ext + 1)
+            if index < len(source.layout) and
+            _sniff_deep2(source, index) is not None]
+    spectra = [_deep2_half(source.hdulist[index], **kwargs)
+               for index in exts]
+    if halves == 'separate':
+        return spectra
+    if halves == 'stitched':
+        return stitch(spectra)
+    return spectra[DEEP2_HALVES.index(halves)]
+
+
+def read_deep2(file_name, halves='stitched', hdulist=None, **kwargs):
+    """Read a DEEP2 spec1d file.
+
+    The SPEC, LAMBDA and IVAR cells of each half are used as they are
+    in the memory mapped file, without a copy. Only stitching the
+    halves together copies them.
+
+    Parameters
+    ----------
+    file_name: str
+        The spec1d file.
+
+    halves: str
+        'blue' or 'red' for one half, 'separate' for both, or
+        'stitched' for both as one spectrum.
+
+    hdulist: FITS HDUList
+        `file_name`, already open.
 
     kwargs: dict
-        Keyword arguments to pass to helper routines.
-    """
-    if ".fits" in file_name:
-        name = file_name.split("/")[-1].split(".")[-1]
-        hdulist = fits.open(str(file_name))
-
-        exts = [ext] if ext is not None else range(len(hdulist))
-        for idx in exts:
-            if isinstance(hdulist[idx], FITS_table):
-                try:
-                    data = read_table(hdulist[idx].data, **kwargs)
-                    return data
-                except Exception as e:
-                    warnings.warn('File {}[{}]: {}'.format(file_name, idx, e.args[0]))
-            elif isinstance(hdulist[idx], FITS_image):
-                try:
-                    data = read_image(hdulist[idx], **kwargs)
-                    return data
-                except Exception as e:
-                    warnings.warn('File {}[{}]: {}'.format(file_name, idx, e.args[0]))
-
-        raise RuntimeError('File {} does not contain any supported 1D format.'.format(file_name))
+        `flux_unit` and `dispersion_unit` override those of DEEP2.
+
+    Returns
+    -------
+    SpectrumData, or [blue, red] SpectrumData when separate.
+    """
+    if halves not in DEEP2_HALVES + ('separate', 'stitched'):
+        raise ValueError('Unknown DEEP2 halves "{}"'.format(halves))
+    source = DataSource(file_name, hdulist)
+    ext = _sniff_deep2(source, None)
+    if ext is None:
+        raise RuntimeError('File {} is not a DEEP2 spec1d file.'.format(
+            file_name))
+    return _read_deep2(source, ext, halves=halves, **kwargs)
+
+
+def _deep2_half(hdu, flux_unit=None, dispersion_unit=None, **kwargs):
+    """One half, as views of the vector cells of the table's only row.
+
+    Values are masked on their BITMASK flags and zero weight; ORMASK
+    and INFOMASK are kept, unselected, to be rejected on.
+    """
+    table = hdu.data
+    ivar = table.field('IVAR')[0]
+    columns = [name.upper() for name in table.columns.names]
+    flags = [(name, table.field(name)[0]) for name in DEEP2_MASK_COLUMNS
+             if name in columns]
+
+    spectrum = SpectrumData()
+    spectrum.set_x(table.field('LAMBDA')[0],
+                   unit=dispersion_unit or 'Angstrom')
+    spectrum.set_y(table.field('SPEC')[0],
+                   unit=flux_unit or DEEP2_FLUX_UNIT,
+                   uncertainty=_uncertainty(ivar, 'ivar'))
+    spectrum.dq = _dq(flags, ivar, 'ivar',
+                      reject={'ORMASK': 0, 'INFOMASK': 0})
+    return spectrum
+
+
+def stitch(spectra):
+    """Concatenate spectra, masks and uncertainties included.
+
+    Flags are concatenated when all spectra have them.
+
+    The first spectrum gives the units; all must have the same kind of
+    uncertainty, or none.
+    """
+    if len(spectra) == 1:
+        return spectra[0]
+
+    def raw(spectrum_array):
+        return super(SpectrumArray, spectrum_array).data
+
+    xs = [spectrum.x for spectrum in spectra]
+    ys = [spectrum.y for spectrum in spectra]
+    mask = None
+    if any(y.mask is not None for y in ys):
+        mask = np.concatenate([y.mask if y.mask is not None
+                               else np.zeros(raw(y).shape, dtype=bool)
+                               for y in ys])
+    uncertainty = None
+    if all(y.uncertainty is not None for y in ys):
+        uncertainty = ys[0].uncertainty.__class__(
+            np.concatenate([y.uncertainty.array for y in ys]))
+
+    spectrum = SpectrumData()
+    spectrum.set_x(np.concatenate([raw(x) for x in xs]), unit=xs[0].unit,
+                   mask=mask)
+    spectrum.set_y(np.concatenate([raw(y) for y in ys]), unit=ys[0].unit,
+                   uncertainty=uncertainty, mask=mask)
+    if all(part.dq is not None for part in spectra):
+        spectrum.dq = DQMask.concatenate([part.dq for part in spectra])
+    return spectrum
+
+
+def _sniff_sdss(source, ext):
+    """SDSS spec files: a COADD table of flux, loglam and ivar."""
+    if not source.is_fits:
+        return None
+    for candidate in _candidates(source, ext if ext is not None else 1):
+        if candidate.kind == 'table' and \
+                all(_column(candidate, name) is not None
+                    for name in ('FLUX', 'LOGLAM', 'IVAR')):
+            return candidate.index
+    return None
+
+
+def _read_sdss(source, ext, flux_unit=None, dispersion_unit=None, **kwargs):
+    layout = source.layout[ext]
+    table = source.hdulist[ext].data
+
+    wavelength = 10. ** table.field(_column(layout, 'LOGLAM'))
+    ivar = table.field(_column(layout, 'IVAR'))
+    # Values are masked on AND_MASK, flagged in all exposures; OR_MASK
+    # is kept, unselected.
+    flags = [(name, table.field(_column(layout, name)))
+             for name in ('AND_MASK', 'OR_MASK')
+             if _column(layout, name) is not None]
+
+    spectrum = SpectrumData()
+    spectrum.set_x(wavelength, unit=dispersion_unit or 'Angstrom')
+    spectrum.set_y(table.field(_column(layout, 'FLUX')),
+                   unit=flux_unit or SDSS_FLUX_UNIT,
+                   uncertainty=_uncertainty(ivar, 'ivar'))
+    spectrum.dq = _dq(flags, ivar, 'ivar', reject={'OR_MASK': 0},
+                      bit_names={'AND_MASK': SDSS_MASK_BITS,
+                                 'OR_MASK': SDSS_MASK_BITS})
+    return spectrum
+
+
+def _sniff_califa(source, ext):
+    """CALIFA cubes: a 3D flux image with ERROR and BADPIX extensions."""
+    if not source.is_fits:
+        return None
+    names = [candidate.name.upper() for candidate in source.layout]
+    if 'BADPIX' not in names:
+        return None
+    for candidate in _candidates(source, ext if ext is not None else 0):
+        if candidate.kind == 'image' and len(candidate.shape) == 3:
+            return candidate.index
+    return None
+
+
+def _read_califa(source, ext, flux_unit=None, dispersion_unit=None,
+                 spaxel=None, **kwargs):
+    """Read the spectrum of one spaxel, or the sum of all spaxels.
+
+    Parameters
+    ----------
+    spaxel: (int, int)
+        x and y of the spaxel to read. If None, the good pixels of all
+        spaxels are summed. If 'all', every spaxel is read into a
+        SpectrumCollection, row by row of the cube.
+    """
+    hdulist = source.hdulist
+    names = [candidate.name.upper() for candidate in source.layout]
+    header = hdulist[ext].header
+    cube = hdulist[ext].data
+    error = hdulist[names.index('ERROR')].data if 'ERROR' in names else None
+    flags = hdulist[names.index('BADPIX')].data
+    badpix = flags != 0
+
+    n = cube.shape[0]
+    step = header.get('CDELT3', header.get('CD3_3', 1.))
+    wavelength = Grid(header.get('CRVAL3', 1.) -
+                      (header.get('CRPIX3', 1.) - 1.) * step, step, n)
+    dispersion_unit = dispersion_unit or header.get('CUNIT3', 'Angstrom')
+    flux_unit = flux_unit or header.get('BUNIT', DEFAULT_FLUX_UNIT)
+
+    if spaxel == 'all':
+        def spectra(values):
+            return np.reshape(values, (n, -1)).T
+
+        variance = None if error is None else spectra(error) ** 2
+        mask = spectra(badpix)
+        return SpectrumCollection(wavelength, spectra(cube),
+                                  x_unit=dispersion_unit, y_unit=flux_unit,
+                                  uncertainty=_uncertainty(variance, 'var'),
+                                  mask=mask if mask.any() else None)
+
+    dq = None
+    if spaxel is not None:
+        x, y = spaxel
+        flux = cube[:, y, x]
+        variance = error[:, y, x] ** 2 if error is not None else None
+        dq = _dq([('BADPIX', flags[:, y, x])], None, None)
+        mask = dq.mask
+    else:
+        good = np.logical_not(badpix)
+        flux = np.where(good, cube, 0.).sum(axis=(1, 2))
+        variance = None
+        if error is not None:
+            variance = np.where(good, error, 0.) ** 2
+            variance = variance.sum(axis=(1, 2))
+        mask = np.logical_not(good.any(axis=(1, 2)))
+        mask = mask if mask.any() else None
+
+    spectrum = SpectrumData()
+    spectrum.set_x(wavelength, unit=dispersion_unit, mask=mask)
+    spectrum.set_y(flux, unit=flux_unit,
+                   uncertainty=_uncertainty(variance, 'var'), mask=mask)
+    if dq is not None:
+        spectrum.dq = dq
+    return spectrum
+
+
+def _sniff_ascii(source, ext):
+    """Text files of columns: the first line of numbers parses."""
+    if source.is_fits or not ascii.sniff(source.path):
+        return None
+    return 0
+
+
+def _read_ascii(source, ext, flux='flux', dispersion=None,
+                flux_unit=None, dispersion_unit=None,
+                uncertainty=None, uncertainty_type=None, mask=None):
+    """Columns of a text file; see `specview.tools.ascii`.
+
+    The dispersion is the column named as in `DISPERSION_COLUMNS`, else
+    the first one; the flux the column `flux`, else the one after the
+    dispersion. Uncertainty and mask columns are found as for tables.
+    Units given in the header are used unless `flux_unit` or
+    `dispersion_unit` are.
+    """
+    table = ascii.read_ascii(source.path)
+    names = [name.upper() for name in table.names]
+
+    def index(name):
+        if name is None:
+            return None
+        name = str(name).upper()
+        return names.index(name) if name in names else None
+
+    x = index(dispersion)
+    if x is None:
+        if dispersion is not None:
+            raise ValueError('No column "{}" found.'.format(dispersion))
+        x = next((names.index(name) for name in DISPERSION_COLUMNS
+                  if name in names), 0)
+    y = index(flux)
+    if y is None:
+        y = next(i for i in range(len(names)) if i != x)
+
+    candidates = [i for i in range(len(names)) if i not in (x, y)]
+    error, error_type = _find_uncertainty(candidates, uncertainty,
+                                          uncertainty_type,
+                                          lambda i: names[i],
+                                          lambda i: table.columns[i],
+                                          items=range(len(names)))
+    if error is None and uncertainty is None and len(names) > 2 and \
+            table.names[2] == 'col3':
+        # Unnamed columns: dispersion, flux, error.
+        error, error_type = table.columns[2], uncertainty_type or 'std'
+    flags = _find_mask(candidates, mask, lambda i: names[i],
+                       lambda i: table.columns[i], items=range(len(names)))
+
+    spectrum = SpectrumData()
+    spectrum.set_x(table.columns[x],
+                   unit=(dispersion_unit or table.units[x] or
+                         DEFAULT_DISPERSION_UNIT))
+    spectrum.set_y(table.columns[y],
+                   unit=flux_unit or table.units[y] or DEFAULT_FLUX_UNIT,
+                   uncertainty=_uncertainty(error, error_type))
+    spectrum.dq = _dq([flags], error, error_type)
+    return spectrum
+
+
+def _candidates(source, ext):
+    """Extensions to sniff: `ext` only, or all of them."""
+    layout = source.layout
+    if ext is not None:
+        return [layout[ext]] if ext < len(layout) else []
+    return layout
+
+
+def _column(ext, name):
+    """Actual name of the column `name` of `ext`, ignoring case, or None."""
+    for column in ext.columns:
+        if column.upper() == name:
+            return column
+    return None
+
+
+def _column_unit(ext, name, default):
+    for column, unit in zip(ext.columns, ext.units):
+        if column.upper() == name and unit:
+            return unit
+    return default
+
+
+def _find_uncertainty(candidates, name, kind, name_of, data_of, shape=None,
+                      items=None):
+    """Find the uncertainty among `candidates`.
+
+    `name` may be an index into `items`, all the extensions or columns
+    of the file, of which `candidates` are those that can hold it.
+
+    Returns
+    -------
+    (array, kind)
+        The uncertainty values and their kind, or (None, None).
+    """
+    kinds = dict(UNCERTAINTY_NAMES)
+    if name is not None:
+        if isinstance(name, int):
+            candidate = _indexed(candidates, items, name, 'uncertainty')
+        else:
+            found = [c for c in candidates
+                     if name_of(c).upper() == str(name).upper()]
+            if not found:
+                raise ValueError('No uncertainty "{}" found.'.format(name))
+            candidate = found[0]
+        data = _checked(data_of(candidate), shape, 'uncertainty', name)
+        return data, kind or kinds.get(name_of(candidate).upper(), 'std')
+
+    for known, known_kind in UNCERTAINTY_NAMES:
+        for candidate in candidates:
+            if name_of(candidate).upper() != known:
+                continue
+            data = data_of(candidate)
+            if data is not None and (shape is None or data.shape == shape):
+                return data, kind or known_kind
+    return None, None
+
+
+def _find_mask(candidates, name, name_of, data_of, shape=None, items=None):
+    """Find the data quality flags among `candidates`.
+
+    `name` may be an index into `items`, as for `_find_uncertainty`.
+
+    Returns
+    -------
+    (str, numpy.ndarray)
+        Name and flags, or (None, None) if there are none.
+    """
+    if name is not None:
+        if isinstance(name, int):
+            candidate = _indexed(candidates, items, name, 'mask')
+        else:
+            found = [c for c in candidates
+                     if name_of(c).upper() == str(name).upper()]
+            if not found:
+                raise ValueError('No mask "{}" found.'.format(name))
+            candidate = found[0]
+        data = _checked(data_of(candidate), shape, 'mask', name)
+        return name_of(candidate).upper(), data
+
+    for known in MASK_NAMES:
+        for candidate in candidates:
+            if name_of(candidate).upper() != known:
+                continue
+            data = data_of(candidate)
+            if data is not None and (shape is None or data.shape == shape):
+                return known, data
+    return None, None
+
+
+def _indexed(candidates, items, index, what):
+    """The candidate at `index` of `items`."""
+    if items is None or not -len(items) <= index < len(items):
+        raise ValueError('No {} at index {}.'.format(what, index))
+    item = items[index]
+    if item not in candidates:
+        raise ValueError('Index {} cannot hold the {}: it is the data, or '
+                         'not of the right kind.'.format(index, what))
+    return item
+
+
+def _checked(data, shape, what, name):
+    """`data`, if of `shape`."""
+    if data is None or (shape is not None and data.shape != shape):
+        raise ValueError('The {} "{}" is of shape {}, not {}.'.format(
+            what, name, None if data is None else data.shape, shape))
+    return data
+
+
+def _uncertainty(values, kind):
+    """Uncertainty object of the given kind, or None without values."""
+    if values is None:
+        return None
+    if kind == 'ivar':
+        return inverse_variance_uncertainty(values)
+    if kind == 'var':
+        return variance_uncertainty(values)
+    if kind == 'std':
+        return StdDevUncertainty(values, copy=False)
+    raise ValueError('Unknown uncertainty type "{}"'.format(kind))
+
+
+def _dq(flags, error, error_type, reject=None, bit_names=None):
+    """Flags, and zero weight values, as a DQMask, or None if none.
+
+    Parameters
+    ----------
+    flags: [(str, numpy.ndarray),]
+        Flag planes, by name; planes without flags are left out.
+    reject, bit_names: dict
+        As for `DQMask`; planes not found are ignored.
+    """
+    planes = OrderedDict((name, values) for name, values in flags
+                         if values is not None)
+    if error is not None and error_type == 'ivar':
+        planes[ZERO_WEIGHT] = np.asarray(error) == 0
+    if not planes:
+        return None
+    reject = dict((name, bits) for name, bits in (reject or {}).items()
+                  if name in planes)
+    return DQMask(planes, reject, bit_names)
+
+
+register_format('hst_x1d', _sniff_hst_x1d, _read_hst_x1d, priority=10)
+register_format('sdss', _sniff_sdss, _read_sdss, priority=10)
+register_format('deep2', _sniff_deep2, _read_deep2, priority=10)
+register_format('califa', _sniff_califa, _read_califa, priority=10)
+register_format('table', _sniff_table, _read_table)
+register_format('image', _sniff_image, _read_image)
+register_format('ascii', _sniff_ascii, _read_ascii)
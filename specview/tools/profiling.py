@@ -0,0 +1,76 @@
+"""Startup timing
+
+Record the wall time and the number of newly imported modules of each
+phase of the application start up. ``sview --profile-startup`` prints
+the breakdown once the main window is up.
+
+Parameters
+----------
+startup_profile: StartupProfile
+    The profile shared by all the start up phases.
+"""
+from __future__ import print_function
+
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile(object):
+    """Collect per-phase timings.
+
+    Phases can be nested; the report indents them accordingly.
+
+    Attributes
+    ----------
+    phases: [[str, int, float, int],]
+        Name, nesting depth, elapsed seconds and number of modules
+        imported, per phase, in the order the phases were entered.
+    """
+    def __init__(self):
+        self.phases = []
+        self._start = time.time()
+        self._depth = 0
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as the phase `name`."""
+        entry = [name, self._depth, 0., 0]
+        self.phases.append(entry)
+        n_modules = len(sys.modules)
+        start = time.time()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            entry[2] = time.time() - start
+            entry[3] = len(sys.modules) - n_modules
+
+    @property
+    def elapsed(self):
+        """Seconds since the profile was created."""
+        return time.time() - self._start
+
+    def report(self, stream=None):
+        """Write the timing breakdown
+
+        Parameters
+        ----------
+        stream: file
+            Where to write the report. Defaults to `sys.stderr`.
+        """
+        stream = sys.stderr if stream is None else stream
+        print('{:<44s} {:>9s} {:>8s}'.format('Startup phase', 'time [s]',
+                                             'modules'),
+              file=stream)
+        for name, depth, elapsed, n_modules in self.phases:
+            print('{:<44s} {:9.3f} {:8d}'.format('  ' * depth + name,
+                                                 elapsed, n_modules),
+                  file=stream)
+        print('{:<44s} {:9.3f} {:8d}'.format('Total', self.elapsed,
+                                             len(sys.modules)),
+              file=stream)
+
+
+startup_profile = StartupProfile()
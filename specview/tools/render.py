@@ -0,0 +1,145 @@
+"""Plot data of layers, shared by all plot windows
+
+Plotting a layer converts its dispersion and flux to the units of the
+plot and, for histograms, makes the step edges. `RenderCache` keeps the
+result per layer, units and style, so that a layer shown in several
+plot windows, or plotted again by `SpectraGraph.update_all`, is
+prepared once.
+
+An entry is dropped when the data of its layer are replaced, when the
+layer is invalidated, and, least recently used first, when the cache
+holds more than its `max_bytes`.
+
+Parameters
+----------
+render_cache: RenderCache
+    The cache shared by all the plot windows.
+"""
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+# Default memory cap of the render cache.
+RENDER_CACHE_BYTES = 256 * 1024 ** 2
+
+RenderData = namedtuple('RenderData', ['x', 'y', 'x_unit', 'y_unit'])
+RenderData.__doc__ = """Values of a layer as plotted
+
+x: numpy.ndarray
+    Dispersion values; one more than the flux values, the step edges,
+    for histograms.
+y: numpy.ndarray
+    Flux values.
+x_unit, y_unit: astropy.units.Unit
+    Units of the values.
+"""
+
+
+def render_data(spectrum_data, x_unit, y_unit, style='histogram'):
+    """Values of `spectrum_data` to plot in `style`, as `RenderData`."""
+    x = spectrum_data.x.convert_unit_to(x_unit)
+    y = spectrum_data.y.convert_unit_to(y_unit)
+
+    if style != 'histogram':
+        x_data = x.data
+    elif x.grid is not None and x.mask is None:
+        # The grid, one step longer, without an extra copy.
+        x_data = x.grid.resize(len(x.grid) + 1).values
+    else:
+        x_data = x.data
+        x_data = np.append(x_data, 2 * x_data[-1] - x_data[-2])
+
+    return RenderData(x_data, y.data, x.unit, y.unit)
+
+
+class RenderCache(object):
+    """`render_data` of layers, least recently used first out.
+
+    Parameters
+    ----------
+    max_bytes: int
+        Memory cap of the cached values. Larger render data are not
+        cached.
+
+    Attributes
+    ----------
+    hits, misses: int
+        Number of lookups found in, and missing from, the cache.
+    """
+    def __init__(self, max_bytes=RENDER_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # key: (sources, RenderData, nbytes); the sources are the
+        # SpectrumArrays the data were made from.
+        self._entries = OrderedDict()
+        self._nbytes = 0
+
+    @property
+    def nbytes(self):
+        """Bytes of the cached values."""
+        return self._nbytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, layer_data_item, x_unit, y_unit, style='histogram'):
+        """Render data of a layer, made if not cached.
+
+        Parameters
+        ----------
+        layer_data_item: LayerDataTreeItem
+            The layer; its `item` is the SpectrumData plotted.
+        x_unit, y_unit: astropy.units.Unit or str
+            Units of the plot.
+        style: str
+            'histogram', 'line' or 'scatter'. Line and scatter plots
+            share their data.
+        """
+        spectrum_data = layer_data_item.item
+        sources = (spectrum_data.x, spectrum_data.y)
+        key = (layer_data_item, _unit_key(x_unit), _unit_key(y_unit),
+               style == 'histogram')
+
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            if entry[0][0] is sources[0] and entry[0][1] is sources[1]:
+                self._entries[key] = entry
+                self.hits += 1
+                return entry[1]
+            # The layer has new data.
+            self._nbytes -= entry[2]
+
+        self.misses += 1
+        data = render_data(spectrum_data, x_unit, y_unit, style)
+        nbytes = data.x.nbytes + data.y.nbytes
+        if nbytes <= self.max_bytes:
+            self._entries[key] = (sources, data, nbytes)
+            self._nbytes += nbytes
+            self._evict()
+        return data
+
+    def invalidate(self, item=None):
+        """Drop the render data of a layer, or of a data item's layers.
+
+        All of them if `item` is None.
+        """
+        if item is None:
+            self._entries.clear()
+            self._nbytes = 0
+            return
+
+        layers = set(getattr(item, 'layers', None) or [item])
+        for key in [key for key in self._entries if key[0] in layers]:
+            self._nbytes -= self._entries.pop(key)[2]
+
+    def _evict(self):
+        while self._nbytes > self.max_bytes and self._entries:
+            self._nbytes -= self._entries.popitem(last=False)[1][2]
+
+
+def _unit_key(unit):
+    return None if unit is None else str(unit)
+
+
+render_cache = RenderCache()
@@ -0,0 +1,373 @@
+"""Session save and restore
+
+A session is a directory holding ``session.json``, which describes the
+data tree, and an ``arrays`` directory with one ``.npy`` file per
+distinct array::
+
+    my.session/
+        session.json
+        arrays/
+            3f2a....npy
+
+Arrays are named by a hash of their content, so an array shared by
+several items is written once. They are written in native byte order,
+so that they can be mapped as they are. Layer masks are stored bit-packed; data
+quality flags as their planes, with the bits rejected. On
+restore, arrays are memory mapped: reopening a session costs the time to
+read the description, whatever the size of the data.
+
+A `SessionWriter` remembers the arrays it has written, so that saving
+the same session again, as autosave does, only writes the arrays that
+changed since. Arrays are assumed not to be modified in place.
+"""
+import hashlib
+import json
+import os
+import warnings
+import weakref
+from collections import OrderedDict
+from os.path import exists, join
+
+import numpy as np
+from astropy.nddata import StdDevUncertainty
+
+from specview.core.data_objects import (SpectrumArray, SpectrumData,
+                                        native_byteorder,
+                                        variance_uncertainty,
+                                        inverse_variance_uncertainty)
+from specview.core.grid import Grid
+from specview.core.masks import DQMask
+from specview.core.storage import storage_precision, set_storage_precision
+from .cache import replace
+
+SESSION_VERSION = 1
+SESSION_FILE = 'session.json'
+ARRAY_DIR = 'arrays'
+
+_UNCERTAINTY_TYPES = {'std': StdDevUncertainty,
+                      'var': variance_uncertainty,
+                      'ivar': inverse_variance_uncertainty}
+
+
+class SessionWriter(object):
+    """Save the data tree of a model to a session directory.
+
+    Parameters
+    ----------
+    path: str
+        The session directory. Created if needed.
+
+    Attributes
+    ----------
+    written: int
+        Number of arrays written by the last `save`.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.written = 0
+        # id(array) -> (weak reference to array, key)
+        self._keys = {}
+
+    def save(self, model):
+        """Save all the items of `model`.
+
+        Parameters
+        ----------
+        model: SpectrumDataTreeModel
+            The model to save.
+        """
+        array_dir = join(self.path, ARRAY_DIR)
+        if not exists(array_dir):
+            os.makedirs(array_dir)
+
+        self.written = 0
+        self._used = set()
+        items = [self._item(data_item) for data_item in model.items]
+        _write_json(join(self.path, SESSION_FILE),
+                    {'version': SESSION_VERSION,
+                     'storage_precision': storage_precision(),
+                     'items': items})
+        self._remove_unused(array_dir)
+        return self.written
+
+    def remember(self, array, key):
+        """Record that `array` is stored as `key`, as when loaded."""
+        self._keys[id(array)] = (weakref.ref(array), key)
+
+    # --- protected functions
+    def _item(self, data_item):
+        return {'name': data_item.text(),
+                'x': self._spectrum_array(data_item.item.x),
+                'y': self._spectrum_array(data_item.item.y),
+                'dq': self._dq(data_item.item.dq),
+                'layers': [self._layer(layer) for layer in data_item.layers]}
+
+    def _dq(self, dq):
+        if dq is None:
+            return None
+        return {'planes': [{'name': name,
+                            'array': self._store(flags, native_byteorder)}
+                           for name, flags in dq.planes.items()],
+                'reject': dq.reject,
+                'bit_names': dq.bit_names}
+
+    def _layer(self, layer_item):
+        mask = np.asanyarray(layer_item._mask, dtype=bool)
+        models = []
+        for row in range(layer_item.rowCount()):
+            model_item = layer_item.child(row)
+            models.append(_describe_model(model_item.text(),
+                                          model_item._model))
+
+        return {'name': layer_item.text(),
+                'mask': {'array': self._store(mask, np.packbits),
+                         'length': len(mask)},
+                'models': models}
+
+    def _spectrum_array(self, spectrum_array):
+        grid = spectrum_array.grid
+        entry = {'data': None,
+                 'grid': None,
+                 'unit': _unit_string(spectrum_array.unit),
+                 'mask': None,
+                 'uncertainty': None,
+                 'wcs': None}
+
+        if grid is not None:
+            entry['grid'] = grid.to_dict()
+        else:
+            entry['data'] = self._store(_raw_data(spectrum_array),
+                                        native_byteorder)
+
+        if spectrum_array.mask is not None:
+            entry['mask'] = self._store(np.asanyarray(spectrum_array.mask))
+
+        uncertainty = spectrum_array.uncertainty
+        if uncertainty is not None:
+            kind = uncertainty.uncertainty_type
+            if kind in _UNCERTAINTY_TYPES:
+                entry['uncertainty'] = {
+                    'array': self._store(np.asanyarray(uncertainty.array),
+                                         native_byteorder),
+                    'type': kind}
+            else:
+                warnings.warn('Uncertainty type {} is not saved.'.format(kind))
+
+        if spectrum_array.wcs is not None:
+            entry['wcs'] = spectrum_array.wcs.to_header_string()
+
+        return entry
+
+    def _store(self, array, transform=None):
+        """Write `array`, or `transform(array)`, unless already written.
+
+        Returns
+        -------
+        str
+            The key of the stored array.
+        """
+        cached = self._keys.get(id(array))
+        if cached is not None and cached[0]() is array:
+            key = cached[1]
+            stored = None
+        else:
+            stored = array if transform is None else transform(array)
+            key = _hash(stored)
+            self.remember(array, key)
+
+        self._used.add(key)
+        file_name = join(self.path, ARRAY_DIR, key + '.npy')
+        if not exists(file_name):
+            if stored is None:
+                stored = array if transform is None else transform(array)
+            tmp_name = file_name + '.tmp'
+            with open(tmp_name, 'wb') as array_file:
+                np.save(array_file, stored)
+            replace(tmp_name, file_name)
+            self.written += 1
+
+        return key
+
+    def _remove_unused(self, array_dir):
+        for file_name in os.listdir(array_dir):
+            key, extension = os.path.splitext(file_name)
+            if extension == '.npy' and key not in self._used:
+                try:
+                    os.remove(join(array_dir, file_name))
+                except OSError:
+                    # Still mapped, on Windows. Removed on a later save.
+                    pass
+
+
+def save_session(model, path):
+    """Save the data tree of `model` to the session directory `path`."""
+    return SessionWriter(path).save(model)
+
+
+def load_session(model, path, mmap=True, writer=None):
+    """Restore a session into `model`.
+
+    Parameters
+    ----------
+    model: SpectrumDataTreeModel
+        Model to add the items to. Existing items are kept.
+
+    path: str
+        The session directory.
+
+    mmap: bool
+        Memory map the arrays instead of reading them.
+
+    writer: SessionWriter
+        If given, told about the loaded arrays so that saving them
+        again does not rewrite them.
+
+    The storage precision saved with the session is set.
+
+    Returns
+    -------
+    [SpectrumDataTreeItem,]
+        The restored items.
+    """
+    with open(join(path, SESSION_FILE)) as session_file:
+        session = json.load(session_file)
+    if session.get('version') != SESSION_VERSION:
+        raise ValueError('Unsupported session version {}'.format(
+            session.get('version')))
+
+    # The storage precision of the session applies to what is read next.
+    if 'storage_precision' in session:
+        set_storage_precision(session['storage_precision'])
+
+    arrays = _ArrayLoader(path, mmap, writer)
+    items = []
+    # All the items are inserted in the tree, and announced, at once.
+    with model.suspend_notifications():
+        for entry in session['items']:
+            spectrum_data = SpectrumData(
+                _load_spectrum_array(entry['x'], arrays),
+                _load_spectrum_array(entry['y'], arrays))
+            if entry.get('dq') is not None:
+                spectrum_data.dq = _load_dq(entry['dq'], arrays)
+            data_item = model.create_data_item(spectrum_data, entry['name'])
+            items.append(data_item)
+
+            for layer_entry in entry['layers']:
+                mask = arrays.unpack(layer_entry['mask']['array'],
+                                     layer_entry['mask']['length'])
+                layer_item = model.create_layer(data_item, mask)
+                if layer_item is None:
+                    continue
+                layer_item.setText(layer_entry['name'])
+                if writer is not None:
+                    writer.remember(layer_item._mask,
+                                    layer_entry['mask']['array'])
+
+                for model_entry in layer_entry['models']:
+                    fit_model = _load_model(model_entry)
+                    if fit_model is not None:
+                        model.create_fit_model(layer_item,
+                                               model_entry['name'], fit_model)
+
+    return items
+
+
+class _ArrayLoader(object):
+    def __init__(self, path, mmap, writer):
+        self._array_dir = join(path, ARRAY_DIR)
+        self._mmap_mode = 'r' if mmap else None
+        self._writer = writer
+
+    def __call__(self, key):
+        array = np.load(join(self._array_dir, key + '.npy'),
+                        mmap_mode=self._mmap_mode)
+        if self._writer is not None:
+            self._writer.remember(array, key)
+        return array
+
+    def unpack(self, key, length):
+        packed = np.load(join(self._array_dir, key + '.npy'))
+        return np.unpackbits(packed)[:length].astype(bool)
+
+
+def _load_spectrum_array(entry, arrays):
+    uncertainty = None
+    if entry['uncertainty'] is not None:
+        uncertainty = _UNCERTAINTY_TYPES[entry['uncertainty']['type']](
+            arrays(entry['uncertainty']['array']))
+
+    wcs = None
+    if entry['wcs'] is not None:
+        from astropy.io.fits import Header
+        from astropy.wcs import WCS
+        wcs = WCS(Header.fromstring(entry['wcs']))
+
+    mask = arrays(entry['mask']) if entry['mask'] is not None else None
+    if entry.get('grid') is not None:
+        data = Grid(**entry['grid'])
+    else:
+        data = arrays(entry['data'])
+
+    return SpectrumArray(data, uncertainty=uncertainty,
+                         mask=mask, wcs=wcs, unit=entry['unit'])
+
+
+def _load_dq(entry, arrays):
+    planes = OrderedDict((plane['name'], arrays(plane['array']))
+                         for plane in entry['planes'])
+    return DQMask(planes, entry['reject'], entry['bit_names'])
+
+
+def _describe_model(name, model):
+    return {'name': name,
+            'class': type(model).__name__,
+            'parameters': dict((param, float(getattr(model, param).value))
+                               for param in model.param_names),
+            'fixed': dict((param, bool(model.fixed[param]))
+                          for param in model.param_names),
+            'bounds': dict((param, list(model.bounds[param]))
+                           for param in model.param_names)}
+
+
+def _load_model(entry):
+    from specview.analysis.model_fitting import all_models
+
+    if entry['class'] not in all_models:
+        warnings.warn('Model {} is not available.'.format(entry['class']))
+        return None
+
+    model = all_models[entry['class']]()
+    for param in model.param_names:
+        parameter = getattr(model, param)
+        if param in entry['parameters']:
+            parameter.value = entry['parameters'][param]
+        if param in entry['fixed']:
+            parameter.fixed = entry['fixed'][param]
+        if param in entry['bounds']:
+            parameter.bounds = tuple(entry['bounds'][param])
+    return model
+
+
+def _raw_data(spectrum_array):
+    # All values, including the masked ones. Memory mapped arrays are
+    # kept as such, so that they are recognized when saved again.
+    return np.asanyarray(super(SpectrumArray, spectrum_array).data)
+
+
+def _unit_string(unit):
+    return None if unit is None else unit.to_string()
+
+
+def _hash(array):
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha1()
+    digest.update('{}{}'.format(array.dtype.str, array.shape).encode('ascii'))
+    digest.update(array.view(np.uint8).reshape(-1).data)
+    return digest.hexdigest()
+
+
+def _write_json(file_name, content):
+    tmp_name = file_name + '.tmp'
+    with open(tmp_name, 'w') as json_file:
+        json.dump(content, json_file)
+    replace(tmp_name, file_name)
@@ -0,0 +1,271 @@
+"""Streaming spectra into a ring buffer
+
+A stream source receives spectra, or readouts of parts of them, on a
+background thread and writes them into a `SpectrumRing`. The viewer
+shows the ring live; see `Controller.stream`.
+
+`SocketSource` listens on a local TCP port. Each message is a frame
+header, `FRAME`, followed by the flux values as little endian float64::
+
+    magic   4s   b'SVSP'
+    kind    B    NEW_SPECTRUM or READOUT
+    start   I    first pixel of the values; 0 for a new spectrum
+    count   I    number of values
+
+`send_spectrum` writes a frame, for producers written in Python.
+
+`FileWatchSource` polls a directory and reads every new file with
+`read_data`, as a new spectrum.
+"""
+import fnmatch
+import os
+import socket
+import struct
+import threading
+import warnings
+
+import numpy as np
+
+FRAME = struct.Struct('<4sBII')
+MAGIC = b'SVSP'
+NEW_SPECTRUM = 0
+READOUT = 1
+
+# Seconds between checks for a stop request, or for new files.
+POLL_INTERVAL = 0.2
+
+
+class StreamSource(object):
+    """Feeds a SpectrumRing from a background thread.
+
+    Subclasses implement `_run`, which returns when `stopping` is set.
+
+    Attributes
+    ----------
+    ring: SpectrumRing
+        The ring written to.
+    error: Exception
+        The error the source stopped on, if any.
+    """
+    def __init__(self, ring):
+        self.ring = ring
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def stopping(self):
+        return self._stop.is_set()
+
+    def start(self):
+        """Start receiving; returns the source."""
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._main,
+                                            name=type(self).__name__)
+            self._thread.daemon = True
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop receiving, and wait for the thread to end."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _main(self):
+        try:
+            self._run()
+        except Exception as error:
+            if not self.stopping:
+                self.error = error
+
+    def _run(self):
+        raise NotImplementedError('_run must be implemented in a subclass.')
+
+
+class SocketSource(StreamSource):
+    """Spectra sent as frames to a local TCP port.
+
+    One producer is served at a time; another can connect when it
+    disconnects. A producer sending a bad frame is disconnected, with a
+    warning, as is one resetting the connection, and the source waits
+    for the next one. The port is closed
+    on `stop`, and opened again, at the same address, on `start`.
+
+    Parameters
+    ----------
+    ring: SpectrumRing
+        The ring written to.
+    host: str
+        Address to listen on.
+    port: int
+        Port to listen on; a free one if 0.
+    """
+    def __init__(self, ring, host='127.0.0.1', port=0):
+        super(SocketSource, self).__init__(ring)
+        self._server = None
+        self._listen((host, port))
+        # Values of a frame are received in place, into the largest
+        # frame the ring can take.
+        self._buffer = np.empty(len(ring.x), dtype='<f8')
+
+    @property
+    def address(self):
+        """(host, port) the source listens on."""
+        return self._address
+
+    def start(self):
+        if self._server is None:
+            self._listen(self._address)
+        return super(SocketSource, self).start()
+
+    def stop(self, timeout=None):
+        super(SocketSource, self).stop(timeout)
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def _listen(self, address):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(address)
+        self._server.listen(1)
+        self._server.settimeout(POLL_INTERVAL)
+        self._address = self._server.getsockname()
+
+    def _run(self):
+        while not self.stopping:
+            try:
+                connection, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            try:
+                connection.settimeout(POLL_INTERVAL)
+                self._serve(connection)
+            except (ValueError, socket.error) as error:
+                # Bad frames, or a producer resetting the connection.
+                warnings.warn('Dropped a stream producer: {}'.format(error))
+            finally:
+                connection.close()
+
+    def _serve(self, connection):
+        header = bytearray(FRAME.size)
+        while not self.stopping:
+            if not _receive(connection, memoryview(header), self._stop):
+                return
+            magic, kind, start, count = FRAME.unpack(bytes(header))
+            if magic != MAGIC or kind not in (NEW_SPECTRUM, READOUT):
+                raise ValueError('Not a spectrum frame.')
+            if count > len(self._buffer):
+                raise ValueError('{} values do not fit spectra of {} '
+                                 'pixels'.format(count, len(self._buffer)))
+            values = self._buffer[:count]
+            if not _receive(connection, memoryview(values.view(np.uint8)),
+                            self._stop):
+                return
+            # Readouts out of the spectrum raise a ValueError too.
+            if kind == NEW_SPECTRUM:
+                self.ring.append(values)
+            else:
+                self.ring.update(values, start)
+
+
+class FileWatchSource(StreamSource):
+    """Spectra written as files into a directory.
+
+    Files there when the source starts are skipped, as are files that
+    cannot be read, with a warning. A file is read once
+    its size has not changed between two polls, so that files still
+    being written are not read.
+
+    Parameters
+    ----------
+    ring: SpectrumRing
+        The ring written to.
+    directory: str
+        Directory to watch.
+    pattern: str
+        Shell pattern of the file names to read.
+    interval: float
+        Seconds between polls.
+    read: callable
+        Function of a path returning its flux values; by default, the
+        flux of `read_data`.
+    """
+    def __init__(self, ring, directory, pattern='*', interval=POLL_INTERVAL,
+                 read=None):
+        super(FileWatchSource, self).__init__(ring)
+        self.directory = directory
+        self.pattern = pattern
+        self.interval = interval
+        self.read = _read_flux if read is None else read
+        self._seen = set(self._files())
+
+    def _files(self):
+        return dict((name, os.path.getsize(os.path.join(self.directory,
+                                                        name)))
+                    for name in fnmatch.filter(os.listdir(self.directory),
+                                               self.pattern))
+
+    def _run(self):
+        sizes = {}
+        while not self._stop.wait(self.interval):
+            files = self._files()
+            for name in sorted(files):
+                if name in self._seen:
+                    continue
+                if sizes.get(name) != files[name]:
+                    # New or still growing; read on the next poll.
+                    sizes[name] = files[name]
+                    continue
+                del sizes[name]
+                self._seen.add(name)
+                path = os.path.join(self.directory, name)
+                try:
+                    self.ring.append(self.read(path))
+                except Exception as error:
+                    warnings.warn('Skipped {}: {}'.format(path, error))
+
+
+def send_spectrum(connection, values, start=None):
+    """Send flux values to a `SocketSource`.
+
+    Parameters
+    ----------
+    connection: socket.socket
+        A socket connected to the source.
+    values: array
+        The flux values.
+    start: int
+        First pixel of a readout of the current spectrum; None for a new
+        spectrum.
+    """
+    values = np.ascontiguousarray(values, dtype='<f8')
+    kind = NEW_SPECTRUM if start is None else READOUT
+    connection.sendall(FRAME.pack(MAGIC, kind, start or 0, len(values)))
+    connection.sendall(values.tobytes())
+
+
+def _receive(connection, view, stop):
+    """Fill `view` from `connection`; False if it closed or on `stop`."""
+    while len(view):
+        try:
+            received = connection.recv_into(view)
+        except socket.timeout:
+            if stop.is_set():
+                return False
+            continue
+        if not received:
+            return False
+        view = view[received:]
+    return True
+
+
+def _read_flux(path):
+    from .preprocess import read_data
+    return read_data(path).y.data
@@ -0,0 +1,182 @@
+"""Background execution of plugin functions
+
+Functions are run in a thread or process pool; their result is handed
+back on the GUI thread through a Qt signal, so the callbacks are free to
+touch the data model and the widgets.
+
+Process pools pickle the function by module and name, so only module
+level functions can be run there. Running tasks cannot be interrupted;
+cancelling one that has already started only discards its result.
+"""
+import importlib
+import itertools
+import multiprocessing
+import warnings
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from ..external.qt import QtCore
+
+EXECUTORS = ('thread', 'process')
+
+
+class Task(object):
+    """A function submitted to a `TaskManager`.
+
+    Attributes
+    ----------
+    id: int
+        Unique, increasing, identifier.
+
+    name: str
+        Display name.
+
+    future: concurrent.futures.Future
+        The running computation.
+
+    status: str
+        One of 'pending', 'running', 'done', 'failed' or 'cancelled'.
+    """
+    def __init__(self, task_id, name, future, callback=None):
+        self.id = task_id
+        self.name = name
+        self.future = future
+        self.callback = callback
+        self.cancelled = False
+        self.error = None
+        self._finished = False
+
+    @property
+    def status(self):
+        if self.cancelled:
+            return 'cancelled'
+        if self.error is not None:
+            return 'failed'
+        if self._finished:
+            return 'done'
+        if self.future.running():
+            return 'running'
+        return 'pending'
+
+    def cancel(self):
+        """Cancel the task; a running task has its result discarded."""
+        self.cancelled = True
+        self.future.cancel()
+
+
+class TaskManager(QtCore.QObject):
+    """Run functions in worker pools, delivering results on the GUI thread.
+
+    Parameters
+    ----------
+    max_workers: int
+        Size of each pool. Defaults to the number of CPUs.
+    """
+    # TODO: get rid of nasty try/excepts
+    try:
+        sig_task_changed = QtCore.pyqtSignal(object)
+        _sig_finished = QtCore.pyqtSignal(object)
+    except AttributeError:
+        sig_task_changed = QtCore.Signal(object)
+        _sig_finished = QtCore.Signal(object)
+
+    def __init__(self, max_workers=None):
+        super(TaskManager, self).__init__()
+        self._max_workers = max_workers or multiprocessing.cpu_count()
+        self._executors = {}
+        self._ids = itertools.count(1)
+        self._tasks = []
+        # Emitted from the worker threads; Qt queues the call to the
+        # thread this object lives in.
+        self._sig_finished.connect(self._deliver)
+
+    @property
+    def tasks(self):
+        return list(self._tasks)
+
+    def submit(self, func, args=(), kwargs=None, executor='thread',
+               name=None, callback=None):
+        """Run `func(*args, **kwargs)` in a worker pool
+
+        Parameters
+        ----------
+        func: callable
+            The function to run. For the 'process' executor, a module
+            level function.
+
+        args, kwargs: tuple, dict
+            Arguments to pass.
+
+        executor: str
+            Either 'thread' or 'process'.
+
+        name: str
+            Display name of the task.
+
+        callback: callable
+            Called on the GUI thread with the result, unless the task
+            was cancelled or failed.
+
+        Returns
+        -------
+        Task
+        """
+        kwargs = kwargs if kwargs is not None else {}
+        pool = self._executor(executor)
+        if executor == 'process':
+            future = pool.submit(_call_by_name, func.__module__,
+                                 func.__name__, args, kwargs)
+        else:
+            future = pool.submit(func, *args, **kwargs)
+
+        task = Task(next(self._ids), name or func.__name__, future, callback)
+        self._tasks.append(task)
+        future.add_done_callback(lambda _: self._sig_finished.emit(task))
+        self.sig_task_changed.emit(task)
+        return task
+
+    def cancel(self, task):
+        task.cancel()
+        self.sig_task_changed.emit(task)
+
+    def remove_finished(self):
+        """Forget tasks that are no longer pending or running."""
+        self._tasks = [task for task in self._tasks
+                       if task.status in ('pending', 'running')]
+
+    def shutdown(self, wait=False):
+        for pool in self._executors.values():
+            pool.shutdown(wait=wait)
+        self._executors = {}
+
+    def _executor(self, kind):
+        if kind not in EXECUTORS:
+            raise ValueError('Unknown executor "{}", must be one of {}'.format(
+                kind, EXECUTORS))
+        if kind not in self._executors:
+            pool_class = (ProcessPoolExecutor if kind == 'process'
+                          else ThreadPoolExecutor)
+            self._executors[kind] = pool_class(max_workers=self._max_workers)
+        return self._executors[kind]
+
+    def _deliver(self, task):
+        task._finished = True
+        if not task.cancelled:
+            task.error = task.future.exception()
+            if task.error is not None:
+                warnings.warn('Task {} failed: {}'.format(task.name,
+                                                          task.error))
+            elif task.callback is not None:
+                task.callback(task.future.result())
+        self.sig_task_changed.emit(task)
+
+
+def _call_by_name(module_name, func_name, args, kwargs):
+    """Call the undecorated function `module_name.func_name`.
+
+    Runs in the worker process; decorated plugin functions cannot be
+    pickled directly since the module attribute is the decorator's wrapper.
+    """
+    func = getattr(importlib.import_module(module_name), func_name)
+    while hasattr(func, '__wrapped__'):
+        func = func.__wrapped__
+    return func(*args, **kwargs)
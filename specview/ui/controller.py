@@ -1,39 +1,64 @@
-import numpy as np
+import warnings
 
-from astropy.modeling import core
+import numpy as np
 
+from specview.external.qt import QtCore
 from specview.core.log import log
 from specview.ui.viewer import MainWindow
 from specview.ui.model import SpectrumDataTreeModel
+from specview.ui.linking import ViewLinker
+from specview.ui.live import LiveStream, STREAM_RATE
 from specview.ui.qt.tree_items import LayerDataTreeItem, ParameterDataTreeItem, ModelDataTreeItem
-from specview.ui.qt.subwindows import SpectraMdiSubWindow
 from specview.analysis.model_fitting import get_fitter
-from specview.core.data_objects import SpectrumData
-from specview.tools.preprocess import read_data
-from specview.ui.qt.dialogs import FileEditDialog
+from specview.core.data_objects import SpectrumData, SpectrumCollection
+from specview.core.storage import (storage_precision, set_storage_precision,
+                                   memory_summary, format_memory_summary)
+from specview.tools.cache import cache_path
 from specview.tools.plugins import plugins
-from specview.analysis.statistics import stats, extract
+from specview.tools.profiling import startup_profile
+from specview.tools.render import render_cache
+from specview.tools.tasks import TaskManager
+from specview.analysis.statistics import stats, stats_regions, extract
 from specview.analysis.model_fitting import all_models
+from specview.ui.ipython.kernel import console_available
 
 
 class Controller(object):
+    # The IPython kernel is started the first time the console is used.
+    _kernel = None
+
+    # Maximum number of files listed by a catalog query.
+    catalog_limit = 1000
+
+    # Milliseconds between autosaves of a modified session.
+    autosave_interval = 5 * 60 * 1000
+
     def __init__(self):
         super(Controller, self).__init__()
-        self._model = SpectrumDataTreeModel()
-        self._viewer = MainWindow(show_console=self._kernel['client'] is not None)
+        with startup_profile.phase('data model'):
+            self._model = SpectrumDataTreeModel()
+        self._tasks = TaskManager()
+        self._view_linker = ViewLinker()
+        self._streams = []
+        self._samp = None
+        self._catalog = None
+        with startup_profile.phase('main window'):
+            self._viewer = MainWindow(show_console=console_available())
         self._viewer.data_dock.wgt_data_tree.setModel(self._model)
-        self._viewer.model_editor_dock.wgt_model_tree.setModel(self._model)
 
         self.__connect_trees()
         self.__connect_menu_bar()
         self.__connect_data_dock()
         self.__connect_mdiarea()
-        self.__connect_model_editor_dock()
+        self.__connect_docks()
         self.__connect_active_data()
         self.__connect_console()
+        self.__connect_tasks()
+        self.__connect_session()
 
         # Load in plugins
-        self.ops = plugins({'controller': self})
+        with startup_profile.phase('plugins'):
+            self.ops = plugins({'controller': self})
 
         # Expose the data, results from internal calculations.
         self.dc = self._model.dc
@@ -44,6 +69,14 @@ class Controller(object):
         # demo, it's good enough
         self._main_name_space = {'np': np,
                                  'add_data_set': self.add_data_set,
+                                 'add_data_sets': self.add_data_sets,
+                                 'suspend_notifications':
+                                     self.suspend_notifications,
+                                 'link_views': self.link_views,
+                                 'unlink_views': self.unlink_views,
+                                 'stream': self.stream,
+                                 'connect_samp': self.connect_samp,
+                                 'memory_summary': self.memory_summary,
                                  'dc': self.dc,
                                  'fc': self.fc,
                                  'log': self.log}
@@ -59,12 +92,73 @@ class Controller(object):
     def model(self):
         return self._model
 
+    @property
+    def render_cache(self):
+        """The `RenderCache` of the plot data shared by all plots."""
+        return render_cache
+
+    @property
+    def view_linker(self):
+        """The `ViewLinker` of the linked plot windows."""
+        return self._view_linker
+
+    @property
+    def streams(self):
+        """The running `LiveStream`s."""
+        return list(self._streams)
+
+    @property
+    def samp(self):
+        """The `SampClient` of the viewer, None until connected."""
+        return self._samp
+
+    @property
+    def tasks(self):
+        """The `TaskManager` running background plugin functions."""
+        return self._tasks
+
+    @property
+    def storage_precision(self):
+        """Storage precision of new flux values: 'native' or 'float32'.
+
+        See `specview.core.storage`. Saved with the session.
+        """
+        return storage_precision()
+
+    @storage_precision.setter
+    def storage_precision(self, precision):
+        set_storage_precision(precision)
+        self._set_session_modified()
+
+    @property
+    def catalog(self):
+        """The local `Catalog` of FITS files, opened on first use."""
+        if self._catalog is None:
+            from specview.tools.catalog import Catalog
+            self._catalog = Catalog()
+        return self._catalog
+
+    @property
+    def kernel(self):
+        """The IPython kernel information, started on first use."""
+        if self._kernel is None:
+            with startup_profile.phase('ipython kernel'):
+                self._kernel = self._start_kernel()
+        return self._kernel
+
     # -- private functions
     def __connect_active_data(self):
         self.viewer.data_dock.wgt_data_tree.clicked.connect(
             self.update_active_plots)
 
+    def __connect_docks(self):
+        self.viewer.sig_dock_created.connect(self._dock_created)
+
     def __connect_model_editor_dock(self):
+        self.viewer.model_editor_dock.wgt_model_tree.setModel(self._model)
+        self.viewer.model_editor_dock.wgt_model_tree.set_root_index(
+            self.viewer.data_dock.wgt_data_tree.currentIndex())
+
         model_selector = self.viewer.model_editor_dock.wgt_model_selector
         model_selector.activated.connect(self._create_model)
 
@@ -79,13 +173,20 @@ class Controller(object):
 
     def __connect_trees(self):
         self.viewer.data_dock.wgt_data_tree.sig_current_changed.connect(
-            self.viewer.model_editor_dock.wgt_model_tree.set_root_index)
+            self._set_model_tree_root)
+        # Plot data of removed layers are not needed anymore.
+        self.model.sig_removed_item.connect(self.render_cache.invalidate)
+        self.model.sig_removed_item.connect(self._stop_stream)
 
     def __connect_mdiarea(self):
         self.viewer.mdiarea.subWindowActivated.connect(self._set_toolbar)
 
     def __connect_menu_bar(self):
         self.viewer.menu_bar.atn_open.triggered.connect(self._open_file_dialog)
+        self.viewer.menu_bar.atn_open_session.triggered.connect(
+            self._open_session_dialog)
+        self.viewer.menu_bar.atn_save_session.triggered.connect(
+            self._save_session_dialog)
         self.viewer.menu_bar.atn_exit.triggered.connect(self.viewer.close)
 
     def __connect_data_dock(self):
@@ -98,12 +199,103 @@ class Controller(object):
     def __connect_console(self):
         self.model.itemChanged.connect(self._update_namespace)
         self.model.sig_added_item.connect(self._update_namespace)
+        self.model.sig_added_items.connect(self._update_namespace)
         self.model.sig_removed_item.connect(self._update_namespace)
 
-        self.viewer.console_dock.wgt_console.kernel_client = self._kernel['client']
-        self.viewer.console_dock.wgt_console.shell = self._kernel['shell']
+    def __connect_tasks(self):
+        self.tasks.sig_task_changed.connect(self._update_task)
+        QtCore.QCoreApplication.instance().aboutToQuit.connect(
+            self.tasks.shutdown)
+
+    def __connect_session(self):
+        # Sessions are saved where last saved or opened, else autosaved
+        # in the cache.
+        self._session_writer = None
+        self._autosave_writer = None
+        self._session_modified = False
+        for signal in (self.model.sig_added_item, self.model.sig_added_items,
+                       self.model.sig_removed_item, self.model.itemChanged,
+                       self.model.dataChanged):
+            signal.connect(self._set_session_modified)
+
+        self._autosave_timer = QtCore.QTimer()
+        self._autosave_timer.timeout.connect(self.autosave)
+        self._autosave_timer.start(self.autosave_interval)
+
+    def __connect_task_dock(self):
+        self.viewer.task_dock.btn_cancel.clicked.connect(
+            self._cancel_selected_tasks)
+        self.viewer.task_dock.btn_clear.clicked.connect(
+            self._clear_finished_tasks)
+        self.viewer.task_dock.set_tasks(self.tasks.tasks)
+
+    def __connect_catalog_dock(self):
+        dock = self.viewer.catalog_dock
+        dock.btn_scan.clicked.connect(self._scan_catalog_dialog)
+        dock.btn_search.clicked.connect(self._query_catalog)
+        for line_edit in dock.line_edits:
+            line_edit.returnPressed.connect(self._query_catalog)
+        dock.btn_open.clicked.connect(
+            lambda: self.open_catalog_entries(dock.selected_entries))
+        dock.wgt_results.itemDoubleClicked.connect(
+            lambda item, column: self.open_catalog_entries(
+                [item.data(0, QtCore.Qt.UserRole)]))
+        self._query_catalog()
+
+    def __connect_console_dock(self):
+        self.viewer.console_dock.wgt_console.kernel_client = self.kernel['client']
+        self.viewer.console_dock.wgt_console.shell = self.kernel['shell']
+        self._update_namespace()
 
     # -- protected functions
+    def _start_kernel(self):
+        from specview.ui.ipython.kernel import ipython_kernel_start
+
+        return ipython_kernel_start()
+
+    def _dock_created(self, name, dock):
+        if name == 'model_editor_dock':
+            self.__connect_model_editor_dock()
+        elif name == 'console_dock':
+            self.__connect_console_dock()
+        elif name == 'task_dock':
+            self.__connect_task_dock()
+        elif name == 'catalog_dock':
+            self.__connect_catalog_dock()
+
+    def _spectra_graphs(self):
+        from specview.ui.qt.subwindows import SpectraMdiSubWindow
+
+        return [sub_window.graph for sub_window
+                in self.viewer.mdiarea.subWindowList()
+                if isinstance(sub_window, SpectraMdiSubWindow)]
+
+    def _stop_stream(self, item):
+        for live_stream in list(self._streams):
+            if live_stream.data_item is item:
+                live_stream.stop()
+                self._streams.remove(live_stream)
+
+    def _set_model_tree_root(self, index):
+        if self.viewer.has_dock('model_editor_dock'):
+            self.viewer.model_editor_dock.wgt_model_tree.set_root_index(index)
+
+    def _update_task(self, task):
+        if task.status in ('pending', 'running') and \
+                not self.viewer.has_dock('task_dock'):
+            # First task ever; the dock picks up all tasks when created.
+            self.viewer.task_dock.show()
+        elif self.viewer.has_dock('task_dock'):
+            self.viewer.task_dock.update_task(task)
+
+    def _cancel_selected_tasks(self):
+        for task in self.viewer.task_dock.selected_tasks:
+            self.tasks.cancel(task)
+
+    def _clear_finished_tasks(self):
+        self.tasks.remove_finished()
+        self.viewer.task_dock.set_tasks(self.tasks.tasks)
+
     def _create_display(self):
         item = self.viewer.data_dock.wgt_data_tree.current_item
 
@@ -139,6 +331,8 @@ class Controller(object):
         self.viewer.model_editor_dock.wgt_model_tree.signal_updated.sig_updated.connect(self._replot_model)
 
     def _perform_fit(self):
+        from astropy.modeling import core
+
         layer_data_item = self.viewer.data_dock.wgt_data_tree.current_item
 
         # we have to guard against all kinds of stuff that can
@@ -157,7 +351,9 @@ class Controller(object):
         fitter = get_fitter(str(fitter_name))
         init_model = layer_data_item.model
 
-        x, y = layer_data_item.item.x.data, layer_data_item.item.y.data
+        # Fit in float64, whatever the storage precision.
+        x = np.asarray(layer_data_item.item.x.data, dtype=np.float64)
+        y = np.asarray(layer_data_item.item.y.data, dtype=np.float64)
 
         fit_model = fitter(init_model, x, y)
         new_y = fit_model(x)
@@ -209,7 +405,187 @@ class Controller(object):
                                                         'Open file')
         self.open_file(fname)
 
+    def _open_session_dialog(self):
+        path = self.viewer.file_dialog.getExistingDirectory(self.viewer,
+                                                            'Open session')
+        if path:
+            self.open_session(str(path))
+
+    def _save_session_dialog(self):
+        path = self.viewer.file_dialog.getSaveFileName(self.viewer,
+                                                       'Save session')
+        if path:
+            self.save_session(str(path))
+
+    def _scan_catalog_dialog(self):
+        path = self.viewer.file_dialog.getExistingDirectory(
+            self.viewer, 'Add directory to catalog')
+        if path:
+            self.tasks.submit(self.catalog.scan, (str(path),),
+                              name='Scan {}'.format(path),
+                              callback=lambda result: self._query_catalog())
+
+    def _query_catalog(self):
+        self.viewer.catalog_dock.set_entries(
+            self.catalog.query(limit=self.catalog_limit,
+                               **self.viewer.catalog_dock.criteria),
+            limit=self.catalog_limit)
+
+    def _set_session_modified(self, *args):
+        self._session_modified = True
+
     # -- public functions
+    def open_session(self, path):
+        """Add the items of a saved session to the data tree.
+
+        Further saves go to `path`, and only write what changed.
+        """
+        from specview.tools.session import SessionWriter, load_session
+
+        self._session_writer = SessionWriter(path)
+        items = load_session(self.model, path, writer=self._session_writer)
+        self._session_modified = False
+        return items
+
+    def save_session(self, path=None):
+        """Save the data tree as a session.
+
+        Parameters
+        ----------
+        path: str
+            Session directory. Defaults to where the session was last
+            saved or opened.
+        """
+        from specview.tools.session import SessionWriter
+
+        if path is not None and (self._session_writer is None or
+                                 self._session_writer.path != path):
+            self._session_writer = SessionWriter(path)
+        if self._session_writer is None:
+            raise ValueError('No session path given.')
+
+        self._session_writer.save(self.model)
+        self._session_modified = False
+
+    def autosave(self):
+        """Save the session, if modified, where it was last saved.
+
+        A session that was never saved goes to the cache.
+        """
+        if not self._session_modified:
+            return
+
+        from specview.tools.session import SessionWriter
+
+        writer = self._session_writer
+        if writer is None:
+            if self._autosave_writer is None:
+                self._autosave_writer = SessionWriter(
+                    cache_path('autosave.session', ''))
+            writer = self._autosave_writer
+
+        try:
+            writer.save(self.model)
+        except (IOError, OSError) as e:
+            warnings.warn('Autosave failed: {}'.format(e))
+            return
+        self._session_modified = False
+
+    def memory_summary(self):
+        """Memory held by the data sets, per array, as a table."""
+        named_spectra = [(item.text(), item.item) for item in self.model.items]
+        return format_memory_summary(memory_summary(named_spectra))
+
+    def link_views(self, sub_windows=None, group=None, y=False):
+        """Make plot windows follow each other's view range.
+
+        Updates are throttled, and deferred for hidden windows; see
+        `specview.ui.linking`.
+
+        Parameters
+        ----------
+        sub_windows: [SpectraMdiSubWindow,]
+            The windows; all the plot windows if None.
+        group: str
+            Link group to add the windows to; a new one if None.
+        y: bool
+            Link the y ranges as well as the x ranges.
+
+        Returns
+        -------
+        str
+            Name of the link group.
+        """
+        from specview.ui.qt.subwindows import SpectraMdiSubWindow
+
+        if sub_windows is None:
+            sub_windows = [sub_window for sub_window
+                           in self.viewer.mdiarea.subWindowList()
+                           if isinstance(sub_window, SpectraMdiSubWindow)]
+        return self.view_linker.link(sub_windows, group=group, y=y)
+
+    def unlink_views(self, sub_windows=None):
+        """Unlink plot windows; all of them if None."""
+        self.view_linker.unlink(sub_windows)
+
+    def stream(self, source, name="Stream", rate=STREAM_RATE):
+        """Show the spectra of a stream source live, in a new plot window.
+
+        The data item of the stream holds its current spectrum; its plots
+        are updated in place at most `rate` times per second. Removing
+        the item stops the stream.
+
+        Parameters
+        ----------
+        source: StreamSource
+            The source, e.g. a `specview.tools.streaming.SocketSource`;
+            started if needed.
+        name: str
+            Name of the data item.
+        rate: float
+            Maximum number of plot updates per second.
+
+        Returns
+        -------
+        LiveStream
+            The stream; `stop` it to stop the source and the updates.
+        """
+        data_item = self.add_data_set(source.ring.latest(), name)
+        self.create_display(data_item)
+        live_stream = LiveStream(source, data_item, self._spectra_graphs,
+                                 rate)
+        self._streams.append(live_stream)
+        live_stream.start()
+        return live_stream
+
+    def connect_samp(self, hub=None, **kwargs):
+        """Connect to a SAMP hub, and load the spectra sent there.
+
+        Applications on this host can send many spectra per message,
+        memory mapped; see `specview.tools.interop`.
+
+        Parameters
+        ----------
+        hub: SAMPHubServer
+            The hub; the running one if None.
+        kwargs: dict
+            Passed to `SAMPIntegratedClient.connect`.
+
+        Returns
+        -------
+        SampClient
+        """
+        from specview.tools.interop import SampClient
+
+        if self._samp is None:
+            self._samp = SampClient()
+            self._samp.sig_received.connect(self.add_data_set)
+            QtCore.QCoreApplication.instance().aboutToQuit.connect(
+                self._samp.disconnect)
+        if not self._samp.connected:
+            self._samp.connect(hub, **kwargs)
+        return self._samp
+
     def update_active_plots(self, *args):
         item = self.viewer.data_dock.wgt_data_tree.current_item
 
@@ -222,10 +598,55 @@ class Controller(object):
 
         Parameters
         ----------
-        nddata: SpectrumData
-            The data to add.
+        nddata: SpectrumData or SpectrumCollection
+            The data to add. Each spectrum of a collection gets an item,
+            holding views on the arrays of the collection.
+        """
+        items = self.model.create_data_items(_named_spectra(nddata, name))
+        if isinstance(nddata, SpectrumCollection):
+            return items
+        return items[0]
+
+    def add_data_sets(self, data_sets, name="Data"):
+        """Add many datasets to the list at once.
+
+        The data tree inserts them in one transaction, and announces
+        them with one signal, so that the console namespace and the
+        views are updated once.
+
+        Parameters
+        ----------
+        data_sets: iterable
+            SpectrumData or SpectrumCollection, or (data, name) pairs.
+            Data without a name are named `name`[i].
+
+        Returns
+        -------
+        [SpectrumDataTreeItem,]
+            One item per spectrum, those of collections included.
+        """
+        named_spectra = []
+        for i, data_set in enumerate(data_sets):
+            if isinstance(data_set, tuple):
+                data_set, data_name = data_set
+            else:
+                data_name = '{}[{}]'.format(name, i)
+            named_spectra.extend(_named_spectra(data_set, data_name))
+        return self.model.create_data_items(named_spectra)
+
+    def suspend_notifications(self):
+        """Context manager adding data sets, layers and models at once.
+
+        What is added within it is inserted in the data tree, and
+        announced, when it ends.
+
+        Examples
+        --------
+        >>> with controller.suspend_notifications():
+        ...     for path in paths:
+        ...         controller.add_data_set(read_data(path), path)
         """
-        return self.model.create_data_item(nddata, name)
+        return self.model.suspend_notifications()
 
     def create_display(self, spectrum_data):
         """Create a plot display with the given data.
@@ -233,11 +654,15 @@ class Controller(object):
         Parameters
         ----------
         spectrum_data: SpectrumData
-            The data to display
+            The data to display, or a list of data all displayed in
+            the one plot.
         """
-        if spectrum_data is None:
+        if spectrum_data is None or (isinstance(spectrum_data, list) and
+                                     not spectrum_data):
             return
 
+        from specview.ui.qt.subwindows import SpectraMdiSubWindow
+
         sub_window = self._viewer.mdiarea.addSubWindow(SpectraMdiSubWindow())
         sub_window.show()
 
@@ -246,8 +671,8 @@ class Controller(object):
             self._create_layer)
 
         # Connect open model editor
-        sub_window.toolbar.atn_model_editor.triggered.connect(
-            self.viewer.model_editor_dock.show)
+        sub_window.toolbar.atn_model_editor.triggered.connect(lambda:
+            self.viewer.model_editor_dock.show())
 
         # Connect measurement action
         sub_window.toolbar.atn_measure.triggered.connect(lambda:
@@ -260,7 +685,15 @@ class Controller(object):
         # Connect remove item
         self.model.sig_removed_item.connect(sub_window.graph.remove_item)
 
-        self.display_graph(spectrum_data, sub_window)
+        if not isinstance(spectrum_data, list):
+            self.display_graph(spectrum_data, sub_window)
+            return
+
+        # The layers of all the data are added at once.
+        with self.suspend_notifications():
+            for i, data_item in enumerate(spectrum_data):
+                self.display_graph(data_item, sub_window,
+                                   set_active=i == len(spectrum_data) - 1)
 
     def display_graph(self, layer_data_item, sub_window=None, set_active=True,
                       style='histogram'):
@@ -304,28 +737,30 @@ class Controller(object):
         active_data = active_item.item
 
         # Get ROI stats
-        stat_list = []
         x_rois = []
         for roi in sub_window.graph.rois[-2:]:
             if roi is None:
                 continue
 
             x_range, y_range = sub_window.graph._get_roi_coords(roi)
-
-            region = extract(active_data, x_range)
-            stat_list.append(stats(region))
             x_rois.append(x_range)
 
+        regions = stats_regions(active_data, x_rois)
+        stat_list = [dict((key, value[i]) for key, value in regions.items())
+                     for i in range(len(x_rois))]
+
         # Determine feature bounds
         if x_rois[0][1] < x_rois[1][0]:
             feature_roi = (x_rois[0][1], x_rois[1][0])
+            blue_roi, red_roi = x_rois
         else:
             feature_roi = (x_rois[1][1], x_rois[0][0])
+            red_roi, blue_roi = x_rois
 
-        # Get the equivalent width
-        result = self.ops.eq_width(stat_list[0],
-                                   stat_list[1],
-                                   extract(active_data, feature_roi))
+        # Get the flux and equivalent width
+        lines = self.ops.measure_lines(active_data,
+                                       [(feature_roi, blue_roi, red_roi)])
+        result = (lines['flux'][0], lines['ew'][0])
 
         # Report
         self.viewer.equiv_width_dock.set_labels(result,
@@ -335,6 +770,29 @@ class Controller(object):
                                                 layer_name=active_item.text())
         self.viewer.equiv_width_dock.show()
 
+    def open_catalog_entries(self, entries):
+        """Open catalog entries in the background.
+
+        The extension and dispersion column are taken from the catalog,
+        so that no other extension is read.
+        """
+        from specview.tools.headers import Extension, dispersion_column
+        from specview.tools.preprocess import read_data
+
+        for entry in entries:
+            kwargs = {}
+            if entry.spectrum_ext is not None:
+                kwargs['ext'] = entry.spectrum_ext
+                ext = Extension(**entry.layout[entry.spectrum_ext])
+                if ext.kind == 'table':
+                    kwargs['dispersion'] = dispersion_column(ext)
+
+            name = entry.path.split('/')[-1].split('.')[0]
+            self.tasks.submit(read_data, (entry.path,), kwargs,
+                              name='Open {}'.format(name),
+                              callback=lambda data, name=name:
+                                  self.add_data_set(data, name))
+
     def open_file(self, path):
         if not path:
             return
@@ -352,6 +810,9 @@ class Controller(object):
         self.add_data_set(spec_data, name)
 
     def _open_with_dialog(self, path):
+        from specview.ui.qt.dialogs import FileEditDialog
+        from specview.tools.preprocess import read_data
+
         dialog = FileEditDialog(path)
         dialog.exec_()
 
@@ -361,7 +822,8 @@ class Controller(object):
         spec_data = read_data(path, ext=dialog.ext, flux=dialog.flux,
                               dispersion=dialog.dispersion,
                               flux_unit=dialog.flux_unit,
-                              dispersion_unit=dialog.disp_unit)
+                              dispersion_unit=dialog.disp_unit,
+                              hdulist=dialog.hdulist)
         return spec_data
 
     # Opens a multi-extension FITS table file with a fully specified spectrum,
@@ -374,6 +836,8 @@ class Controller(object):
     #
     # This is useful when repetitively entering the same spectrum via command line.
     def _open_from_fully_specified(self, path):
+        from specview.tools.preprocess import read_data
+
         tokens = path.split('[')
         clean_path = tokens[0]
         elements = tokens[1].split(',')
@@ -398,7 +862,19 @@ class Controller(object):
             self.viewer.set_toolbar(hide_all=True)
 
     def _update_namespace(self, item=None):
+        if not self.viewer.has_dock('console_dock'):
+            return
+
         if self.viewer.console_dock.wgt_console.shell is not None:
             local_namespace = self._main_name_space
             local_namespace.update(dict(self.model.dc))
             self.viewer.console_dock.wgt_console.shell.push(local_namespace)
+
+
+def _named_spectra(nddata, name):
+    """(spectrum, name) of a data set; one per row of a collection."""
+    if isinstance(nddata, SpectrumCollection):
+        names = nddata.names or ['{}[{}]'.format(name, row)
+                                 for row in range(len(nddata))]
+        return list(zip(nddata, names))
+    return [(nddata, name)]
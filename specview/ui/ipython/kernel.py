@@ -1,12 +1,42 @@
-"""Start an IPython kernel"""
-from IPython import get_ipython
-from IPython.qt.client import QtKernelClient
-from IPython.qt.inprocess import QtInProcessKernelManager
-from IPython.kernel.connect import get_connection_file
-from IPython.kernel.inprocess.ipkernel import InProcessInteractiveShell
+"""Start an IPython kernel
+
+The IPython Qt machinery is imported only when a kernel is actually
+started, so that importing this module stays cheap.
+"""
+import sys
+
+
+def console_available():
+    """Whether a GUI console can be provided, without starting a kernel.
+
+    Returns
+    -------
+    bool
+        False if running inside an IPython shell that cannot be
+        connected to.
+    """
+    if 'IPython' not in sys.modules:
+        return True
+
+    from IPython import get_ipython
+    from IPython.kernel.connect import get_connection_file
+    from IPython.kernel.inprocess.ipkernel import InProcessInteractiveShell
+
+    shell = get_ipython()
+    if shell is None or isinstance(shell, InProcessInteractiveShell):
+        return True
+
+    try:
+        get_connection_file()
+    except Exception:
+        return False
+    return True
 
 
 def ipython_kernel_start(**kwargs):
+    from IPython import get_ipython
+    from IPython.kernel.inprocess.ipkernel import InProcessInteractiveShell
+
     shell = get_ipython()
     if shell is None or isinstance(shell, InProcessInteractiveShell):
         kernel_info = in_process_kernel(**kwargs)
@@ -25,6 +55,7 @@ def in_process_kernel(**kwargs):
     ----------
     kwargs : Extra variables to put into the namespace
     """
+    from IPython.qt.inprocess import QtInProcessKernelManager
 
     kernel_info = {}
     kernel_info['manager'] = QtInProcessKernelManager()
@@ -50,6 +81,10 @@ def connected_kernel(**kwargs):
     ----------
     kwargs : Extra variables to put into the namespace
     """
+    from IPython import get_ipython
+    from IPython.qt.client import QtKernelClient
+    from IPython.kernel.connect import get_connection_file
+
     kernel_info = {}
 
     shell = get_ipython()
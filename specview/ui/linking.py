@@ -0,0 +1,200 @@
+"""Linked view ranges of plot windows
+
+Plot windows of a link group follow the x range, and optionally the y
+range, of whichever of them is panned or zoomed. Range changes are
+applied to the other windows at most `LINK_RATE` times per second, the
+last range of each burst winning, so that dragging in one window does
+not redraw dozens of full resolution plots on every mouse event.
+Windows that are hidden or minimized keep the last range for when they
+are shown again.
+"""
+import itertools
+
+from ..external.qt import QtCore
+
+# Maximum number of range updates per second of a link group.
+LINK_RATE = 30
+
+
+class LinkGroup(object):
+    """Plot windows sharing their view range.
+
+    Attributes
+    ----------
+    name: str
+        Name of the group.
+    y: bool
+        Whether the y range is linked too.
+    sub_windows: [SpectraMdiSubWindow,]
+        The windows of the group.
+    """
+    def __init__(self, name, y=False):
+        self.name = name
+        self.y = y
+        self.sub_windows = []
+        # The window whose range changed last, and that range, until
+        # applied; ranges of hidden windows, until shown.
+        self.pending = None
+        self.deferred = {}
+        self.timer = QtCore.QTimer()
+        self.timer.setSingleShot(True)
+
+
+class ViewLinker(QtCore.QObject):
+    """Link groups of plot windows.
+
+    Parameters
+    ----------
+    rate: float
+        Maximum number of range updates per second of a group.
+    """
+    def __init__(self, rate=LINK_RATE):
+        super(ViewLinker, self).__init__()
+        self.rate = rate
+        self._groups = {}
+        self._group_of = {}
+        self._slots = {}
+        self._applying = None
+        self._names = itertools.count(1)
+
+    @property
+    def groups(self):
+        """The windows of each group, by group name."""
+        return dict((name, list(group.sub_windows))
+                    for name, group in self._groups.items())
+
+    def group_of(self, sub_window):
+        """Name of the group of `sub_window`, or None."""
+        group = self._group_of.get(sub_window)
+        return None if group is None else group.name
+
+    def link(self, sub_windows, group=None, y=False):
+        """Link the view ranges of plot windows.
+
+        Windows already linked leave their group. The windows take the
+        range of the first one.
+
+        Parameters
+        ----------
+        sub_windows: [SpectraMdiSubWindow,]
+            The windows.
+        group: str
+            Group to add the windows to; a new group if None.
+        y: bool
+            Link the y ranges as well.
+
+        Returns
+        -------
+        str
+            Name of the group.
+        """
+        sub_windows = list(sub_windows)
+        if group is None:
+            group = 'Link {}'.format(next(self._names))
+        if group not in self._groups:
+            link_group = LinkGroup(group, y)
+            link_group.timer.timeout.connect(
+                lambda: self._apply_pending(link_group))
+            self._groups[group] = link_group
+        link_group = self._groups[group]
+        link_group.y = y
+
+        for sub_window in sub_windows:
+            if self._group_of.get(sub_window) is link_group:
+                continue
+            self.unlink([sub_window])
+            link_group.sub_windows.append(sub_window)
+            self._group_of[sub_window] = link_group
+
+            def slot(view_box, ranges, sub_window=sub_window):
+                self._range_changed(sub_window, ranges)
+
+            self._slots[sub_window] = slot
+            sub_window.graph.view_box.sigRangeChanged.connect(slot)
+            sub_window.installEventFilter(self)
+
+        if sub_windows:
+            first = sub_windows[0]
+            self._range_changed(first, first.graph.view_box.viewRange())
+        return group
+
+    def unlink(self, sub_windows=None):
+        """Take windows, all if None, out of their group."""
+        if sub_windows is None:
+            sub_windows = list(self._group_of)
+        for sub_window in sub_windows:
+            link_group = self._group_of.pop(sub_window, None)
+            if link_group is None:
+                continue
+            sub_window.graph.view_box.sigRangeChanged.disconnect(
+                self._slots.pop(sub_window))
+            sub_window.removeEventFilter(self)
+            link_group.sub_windows.remove(sub_window)
+            link_group.deferred.pop(sub_window, None)
+            if link_group.pending is not None and \
+                    link_group.pending[0] is sub_window:
+                link_group.pending = None
+            if not link_group.sub_windows:
+                link_group.timer.stop()
+                del self._groups[link_group.name]
+
+    # --- protected functions
+    def _range_changed(self, sub_window, ranges):
+        if sub_window is self._applying:
+            # The echo of a range set by the group.
+            return
+        link_group = self._group_of.get(sub_window)
+        if link_group is None:
+            return
+        link_group.pending = (sub_window,
+                              [list(ranges[0]), list(ranges[1])])
+        if not link_group.timer.isActive():
+            link_group.timer.start(int(1000. / self.rate))
+
+    def _apply_pending(self, link_group):
+        if link_group.pending is None:
+            return
+        source, ranges = link_group.pending
+        link_group.pending = None
+        for sub_window in link_group.sub_windows:
+            if sub_window is source:
+                continue
+            if _hidden(sub_window):
+                link_group.deferred[sub_window] = ranges
+            else:
+                link_group.deferred.pop(sub_window, None)
+                self._apply(sub_window, ranges, link_group.y)
+
+    def _apply(self, sub_window, ranges, y):
+        view_box = sub_window.graph.view_box
+        self._applying = sub_window
+        try:
+            if y:
+                view_box.setRange(xRange=ranges[0], yRange=ranges[1],
+                                  padding=0)
+            else:
+                view_box.setXRange(ranges[0][0], ranges[0][1], padding=0)
+        finally:
+            self._applying = None
+
+    def _expose(self, sub_window):
+        link_group = self._group_of.get(sub_window)
+        if link_group is None or _hidden(sub_window):
+            return
+        ranges = link_group.deferred.pop(sub_window, None)
+        if ranges is not None:
+            self._apply(sub_window, ranges, link_group.y)
+
+    # --- overridden functions
+    def eventFilter(self, watched, event):
+        if event.type() in (QtCore.QEvent.Show,
+                            QtCore.QEvent.WindowStateChange):
+            # Once shown, on the next event loop iteration.
+            QtCore.QTimer.singleShot(0, lambda: self._expose(watched))
+        elif event.type() == QtCore.QEvent.Close:
+            self.unlink([watched])
+        return False
+
+
+def _hidden(sub_window):
+    return sub_window.isMinimized() or not sub_window.isVisible()
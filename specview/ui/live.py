@@ -0,0 +1,63 @@
+"""Live display of streamed spectra
+
+A `LiveStream` shows the current spectrum of a stream source's ring in
+the plots of a data item. The plots are updated in place, at most
+`STREAM_RATE` times per second whatever the rate of the stream, and only
+when something was received since the last update.
+"""
+from ..external.qt import QtCore
+
+# Maximum number of plot updates per second of a live stream.
+STREAM_RATE = 10
+
+
+class LiveStream(QtCore.QObject):
+    """Plots of a data item following a stream.
+
+    Parameters
+    ----------
+    source: StreamSource
+        The source; its ring holds the spectra.
+    data_item: SpectrumDataTreeItem
+        The item showing the current spectrum.
+    graphs: callable
+        Returns the graphs to update.
+    rate: float
+        Maximum number of updates per second.
+    """
+    def __init__(self, source, data_item, graphs, rate=STREAM_RATE):
+        super(LiveStream, self).__init__()
+        self.source = source
+        self.data_item = data_item
+        self.rate = rate
+        self._graphs = graphs
+        self._version = source.ring.version
+        self._timer = QtCore.QTimer()
+        self._timer.timeout.connect(self.update)
+
+    @property
+    def running(self):
+        return self._timer.isActive()
+
+    def start(self):
+        """Start the source, if needed, and the updates."""
+        self.source.start()
+        self._timer.start(int(1000. / self.rate))
+
+    def stop(self):
+        """Stop the updates and the source."""
+        self._timer.stop()
+        self.source.stop()
+
+    def update(self):
+        """Show the current spectrum, if it changed."""
+        ring = self.source.ring
+        version = ring.version
+        if version == self._version:
+            return
+        self._version = version
+        self.data_item.set_item(ring.latest())
+        graphs = self._graphs()
+        for layer in self.data_item.layers:
+            for graph in graphs:
+                graph.update_data(layer)
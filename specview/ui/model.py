@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from os import path, sys
 
 import numpy as np
@@ -5,28 +6,59 @@ import numpy as np
 from ..external.qt import QtGui, QtCore
 
 from specview.analysis import model_fitting
-from specview.ui.qt.tree_items import (SpectrumDataTreeItem, ModelDataTreeItem,
-                                       LayerDataTreeItem, ParameterDataTreeItem,
-                                       float_check)
+from specview.ui.qt.tree_items import (TreeItem, SpectrumDataTreeItem,
+                                       ModelDataTreeItem, LayerDataTreeItem,
+                                       ParameterDataTreeItem, float_check,
+                                       DATA_ROLE)
 
 PATH = path.join(path.dirname(sys.modules[__name__].__file__), "qt", "img")
 
+# Icons by file name, loaded once and shared by all items.
+_icons = {}
 
-class SpectrumDataTreeModel(QtGui.QStandardItemModel):
-    """Custom TreeView model for displaying DataSetItems."""
+
+def icon(name):
+    """The icon of the image `name` in qt/img."""
+    if name not in _icons:
+        _icons[name] = QtGui.QIcon(path.join(PATH, name))
+    return _icons[name]
+
+
+class SpectrumDataTreeModel(QtCore.QAbstractItemModel):
+    """Custom TreeView model for displaying DataSetItems.
+
+    Items are the Python objects of `specview.ui.qt.tree_items`; the
+    model shows them without a Qt object per item. Children of models
+    and parameters are made when first expanded, and rows added
+    together are inserted at once.
+
+    Data sets added together are announced by one `sig_added_items`;
+    within `suspend_notifications`, everything added is inserted and
+    announced at the end.
+    """
     # TODO: get rid of nasty try/excepts
     try:
         sig_added_item = QtCore.pyqtSignal(QtCore.QModelIndex)
-        sig_added_fit_model = QtCore.pyqtSignal(ModelDataTreeItem)
+        sig_added_items = QtCore.pyqtSignal(list)
+        sig_added_fit_model = QtCore.pyqtSignal(object)
         sig_removed_item = QtCore.pyqtSignal(object)
+        itemChanged = QtCore.pyqtSignal(object)
     except AttributeError:
         sig_added_item = QtCore.Signal(QtCore.QModelIndex)
-        sig_added_fit_model = QtCore.Signal(ModelDataTreeItem)
+        sig_added_items = QtCore.Signal(list)
+        sig_added_fit_model = QtCore.Signal(object)
         sig_removed_item = QtCore.Signal(object)
+        itemChanged = QtCore.Signal(object)
 
     def __init__(self):
         super(SpectrumDataTreeModel, self).__init__()
         self._items = []
+        # Data items and added items held back by suspend_notifications.
+        self._suspended = 0
+        self._pending_rows = []
+        self._pending_items = []
+        self.root = TreeItem()
+        self.root._tree = self
         self.itemChanged.connect(self._item_changed)
         self.dc = self.DataCollection(self)
         self.fc = self.FitCollection(self)
@@ -48,7 +80,65 @@ class SpectrumDataTreeModel(QtGui.QStandardItemModel):
         if hasattr(item, 'update_value'):
             item.update_value(item._name, item.data())
 
+    def _added(self, item):
+        if self._suspended:
+            self._pending_items.append(item)
+        else:
+            self.sig_added_item.emit(item.index())
+
+    def _item(self, index):
+        """The item of `index`; the root for the invalid index."""
+        if index is None or not index.isValid():
+            return self.root
+        return index.internalPointer()
+
     # --- public functions
+    def itemFromIndex(self, index):
+        if not index.isValid():
+            return None
+        return index.internalPointer()
+
+    def indexFromItem(self, item):
+        if item is None or item is self.root or item._tree is not self:
+            return QtCore.QModelIndex()
+        return self.createIndex(item._row, item._column, item)
+
+    @contextmanager
+    def suspend_notifications(self):
+        """Hold back insertions and added item signals until the end.
+
+        The data items created meanwhile are inserted in one transaction,
+        and all the items added are announced by one `sig_added_items`.
+        Nested uses end with the outermost one.
+        """
+        self._suspended += 1
+        try:
+            yield self
+        finally:
+            self._suspended -= 1
+            if not self._suspended:
+                rows, self._pending_rows = self._pending_rows, []
+                items, self._pending_items = self._pending_items, []
+                self.insert_rows(self.root, rows)
+                if items:
+                    self.sig_added_items.emit(items)
+
+    def item_changed(self, item):
+        """Tell views, and the itemChanged slots, that `item` changed."""
+        index = self.indexFromItem(item)
+        self.dataChanged.emit(index, index)
+        self.itemChanged.emit(item)
+
+    def insert_rows(self, parent, rows):
+        """Append rows of items to `parent`, in one insertion."""
+        if not rows:
+            return
+        start = len(parent._rows)
+        self.beginInsertRows(self.indexFromItem(parent), start,
+                             start + len(rows) - 1)
+        parent._attach(rows)
+        self.endInsertRows()
+
     def remove_data_item(self, index, parent_index):
         item = index.model().itemFromIndex(index)
         self.removeRow(index.row(), parent_index)
@@ -64,20 +154,28 @@ class SpectrumDataTreeModel(QtGui.QStandardItemModel):
         self.sig_removed_item.emit(item)
 
     def create_data_item(self, nddata, name="New"):
-        spec_data_item = SpectrumDataTreeItem(nddata, name)
-        spec_data_item.setIcon(QtGui.QIcon(path.join(PATH, 'data_set.png')))
+        return self.create_data_items([(nddata, name)])[0]
+
+    def create_data_items(self, named_data):
+        """Add data items for (nddata, name) pairs, as one insertion.
 
-        self._items.append(spec_data_item)
-        self.appendRow(spec_data_item)
-        self.sig_added_item.emit(spec_data_item.index())
+        They are announced by one `sig_added_items`.
+        """
+        spec_data_items = [SpectrumDataTreeItem(nddata, name)
+                           for nddata, name in named_data]
 
-        return spec_data_item
+        self._items.extend(spec_data_items)
+        with self.suspend_notifications():
+            self._pending_rows.extend([item] for item in spec_data_items)
+            self._pending_items.extend(spec_data_items)
+
+        return spec_data_items
 
     def create_layer(self, parent, mask=None, rois=None):
         if not isinstance(parent, SpectrumDataTreeItem):
             return
 
-        if mask is not None and np.all([x for x in mask]):
+        if mask is not None and np.all(mask):
             return
 
         if mask is None:
@@ -87,36 +185,116 @@ class SpectrumDataTreeModel(QtGui.QStandardItemModel):
         layer_data_item = LayerDataTreeItem(parent, mask, rois,
                                             "Layer {}".format(
                                                 parent.rowCount()+1))
-        layer_data_item.setIcon(QtGui.QIcon(path.join(PATH, 'layer.png')))
 
         parent.add_layer(layer_data_item)
         parent.appendRow(layer_data_item)
 
-        self.sig_added_item.emit(layer_data_item.index())
+        self._added(layer_data_item)
 
         return layer_data_item
 
-    def create_fit_model(self, parent, model_name):
+    def create_fit_model(self, parent, model_name, model=None):
         if not isinstance(parent, LayerDataTreeItem):
             return
 
-        try:
-            model = model_fitting.get_model(model_name)
-        except TypeError:
-            print("Current model is not implemented.")
-            return
+        if model is None:
+            try:
+                model = model_fitting.get_model(model_name)
+            except TypeError:
+                print("Current model is not implemented.")
+                return
 
         parent.add_model(model)
         model_data_item = ModelDataTreeItem(parent, model, model_name)
-        model_data_item.setIcon(QtGui.QIcon(path.join(PATH, 'model.png')))
 
         parent.appendRow(model_data_item)
-        self.sig_added_item.emit(model_data_item.index())
+        self._added(model_data_item)
         self.sig_added_fit_model.emit(model_data_item)
 
     # --- overridden functions
+    def index(self, row, column, parent_index=QtCore.QModelIndex()):
+        rows = self._item(parent_index)._rows
+        if rows is None or not 0 <= row < len(rows) or \
+                not 0 <= column < len(rows[row]):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, rows[row][column])
+
+    def parent(self, index=None):
+        if index is None:
+            # QObject.parent
+            return super(SpectrumDataTreeModel, self).parent()
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        return self.indexFromItem(index.internalPointer()._parent)
+
+    def rowCount(self, parent_index=QtCore.QModelIndex()):
+        # Children not made yet are fetched by the view when it needs them.
+        rows = self._item(parent_index)._rows
+        return 0 if rows is None else len(rows)
+
+    def columnCount(self, parent_index=QtCore.QModelIndex()):
+        return self._item(parent_index).columns
+
+    def hasChildren(self, parent_index=QtCore.QModelIndex()):
+        return self._item(parent_index).hasChildren()
+
+    def canFetchMore(self, parent_index):
+        return self._item(parent_index)._rows is None
+
+    def fetchMore(self, parent_index):
+        item = self._item(parent_index)
+        if item._rows is not None:
+            return
+
+        rows = item._create_rows()
+        if rows:
+            self.beginInsertRows(parent_index, 0, len(rows) - 1)
+        item._rows = []
+        item._attach(rows)
+        if rows:
+            self.endInsertRows()
+
+    def removeRows(self, row, count, parent_index=QtCore.QModelIndex()):
+        parent = self._item(parent_index)
+        rows = parent._rows
+        if rows is None or row < 0 or count < 1 or row + count > len(rows):
+            return False
+
+        self.beginRemoveRows(parent_index, row, row + count - 1)
+        removed = rows[row:row + count]
+        del rows[row:row + count]
+        parent._renumber(row)
+        for removed_row in removed:
+            for item in removed_row:
+                item._set_tree(None)
+        self.endRemoveRows()
+        return True
+
+    def removeRow(self, row, parent_index=QtCore.QModelIndex()):
+        return self.removeRows(row, 1, parent_index)
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.NoItemFlags
+        return index.internalPointer().flags()
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        item = index.internalPointer()
+        if role == QtCore.Qt.DecorationRole:
+            return icon(item.icon_name) if item.icon_name else None
+        if role == QtCore.Qt.CheckStateRole:
+            return item.checkState()
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole, DATA_ROLE):
+            return item.data(role)
+        return None
+
     def setData(self, index, value, role=QtCore.Qt.EditRole):
         item = self.itemFromIndex(index)
+        if item is None:
+            return False
+
         if role == QtCore.Qt.EditRole:
             if isinstance(item, ParameterDataTreeItem):
                 value = float_check(value)
@@ -124,40 +302,15 @@ class SpectrumDataTreeModel(QtGui.QStandardItemModel):
                     item.setData(value)
                     item.setText(str(value))
             else:
-                item.setData(value)
                 item.setText(str(value))
-
-            self.dataChanged.emit(index, index)
             return True
 
         elif role == QtCore.Qt.CheckStateRole:
             item.setData(value, role=QtCore.Qt.CheckStateRole)
-
-            self.dataChanged.emit(index, index)
             return True
 
         return False
 
-    def hasChildren(self, parent_index=None, *args, **kwargs):
-        # if parent_index is not None and self.itemFromIndex(parent_index):
-        #     item = self.itemFromIndex(parent_index)
-        #
-        #     if isinstance(item, LayerDataTreeItem):
-        #         return False
-
-        return super(SpectrumDataTreeModel, self).hasChildren(parent_index,
-                                                              *args, **kwargs)
-
-    def rowCount(self, parent_index=None, *args, **kwargs):
-        # if parent_index is not None and self.itemFromIndex(parent_index):
-        #     item = self.itemFromIndex(parent_index)
-        #
-        #     if isinstance(item, LayerDataTreeItem):
-        #         return 0
-
-        return super(SpectrumDataTreeModel, self).rowCount(parent_index,
-                                                           *args, **kwargs)
-
     # Subclasses to expose Data, Fits, and any other deeply
     # embedded information
     class Collections(object):
@@ -9,12 +9,17 @@ class StatisticsGroupBox(QtGui.QGroupBox):
         self.lbl_median = QtGui.QLabel()
         self.lbl_stddev = QtGui.QLabel()
         self.lbl_total = QtGui.QLabel()
+        self.lbl_mad = QtGui.QLabel()
+        self.lbl_clipped_mean = QtGui.QLabel()
 
         stat_form_layout = QtGui.QFormLayout()
         stat_form_layout.addRow(self.tr("Mean:"), self.lbl_mean)
         stat_form_layout.addRow(self.tr("Median:"), self.lbl_median)
         stat_form_layout.addRow(self.tr("Std. Dev.:"), self.lbl_stddev)
         stat_form_layout.addRow(self.tr("Total:"), self.lbl_total)
+        stat_form_layout.addRow(self.tr("MAD:"), self.lbl_mad)
+        stat_form_layout.addRow(self.tr("Clipped Mean:"),
+                                self.lbl_clipped_mean)
 
         self.setLayout(stat_form_layout)
 
@@ -23,3 +28,5 @@ class StatisticsGroupBox(QtGui.QGroupBox):
         self.lbl_median.setText(str(stats['median']))
         self.lbl_stddev.setText(str(stats['stddev']))
         self.lbl_total.setText(str(stats['total']))
+        self.lbl_mad.setText(str(stats.get('mad', '')))
+        self.lbl_clipped_mean.setText(str(stats.get('clipped_mean', '')))
@@ -1,9 +1,15 @@
 from ...external.qt import QtGui, QtCore
-from astropy.io import fits
-from astropy.io.fits.hdu.table import _TableLikeHDU as FITS_table
+
+from specview.tools.headers import open_fits, file_layout
 
 
 class FileEditDialog(QtGui.QDialog):
+    """Choose the extension and columns to read a spectrum from.
+
+    The file is opened memory mapped and described from its headers
+    only; `hdulist` is left open to be passed on to `read_data` when the
+    dialog is accepted, and closed when it is cancelled.
+    """
     def __init__(self, file_path, parent=None):
         super(FileEditDialog, self).__init__(parent)
         self.ext = None
@@ -14,9 +20,11 @@ class FileEditDialog(QtGui.QDialog):
 
         # TODO: get rid of nasty try/excepts
         try:
-            self.hdulist = fits.open(str(file_path))
+            self.hdulist = open_fits(str(file_path))
         except IOError:
-            self.hdulist = fits.open(str(file_path[0]))
+            file_path = file_path[0]
+            self.hdulist = open_fits(str(file_path))
+        self.layout = file_layout(file_path, self.hdulist)
 
         self.vb_layout_main = QtGui.QVBoxLayout()
         self.setLayout(self.vb_layout_main)
@@ -29,8 +37,8 @@ class FileEditDialog(QtGui.QDialog):
 
         # Extension selector
         self.ext_selector = QtGui.QComboBox()
-        self.ext_selector.addItems(["[{}] {}".format(i, self.hdulist[i].name)
-                                    for i in range(len(self.hdulist))])
+        self.ext_selector.addItems(["[{}] {}".format(ext.index, ext.name)
+                                    for ext in self.layout])
         self.ext_selector.currentIndexChanged.connect(self._set_selectors)
 
         # Manual input lines
@@ -43,7 +51,7 @@ class FileEditDialog(QtGui.QDialog):
 
         # Label detailing how many extensions were found
         hdu_count = QtGui.QLabel("Detected {} extensions in this FITS "
-                                 "file.".format(len(self.hdulist)))
+                                 "file.".format(len(self.layout)))
 
         # Form layout
         self.form_layout = QtGui.QFormLayout()
@@ -76,12 +84,7 @@ class FileEditDialog(QtGui.QDialog):
         self.flux_col_selector.clear()
         self.disp_col_selector.clear()
 
-        data = self.hdulist[index].data
-
-        if data is not None:
-            col_names = data.names
-        else:
-            col_names = ""
+        col_names = self.layout[index].columns
 
         self.flux_col_selector.addItems(col_names)
         self.disp_col_selector.addItems(col_names)
@@ -89,11 +92,12 @@ class FileEditDialog(QtGui.QDialog):
     def _on_accept(self):
         self.ext = int(self.ext_selector.currentIndex())
 
-        if isinstance(self.hdulist[self.ext], FITS_table):
+        ext = self.layout[self.ext]
+        if ext.kind == 'table':
             flux_ind = self.flux_col_selector.currentIndex()
             disp_ind = self.disp_col_selector.currentIndex()
-            self.flux = self.hdulist[self.ext].data.names[flux_ind]
-            self.dispersion = self.hdulist[self.ext].data.names[disp_ind]
+            self.flux = ext.columns[flux_ind]
+            self.dispersion = ext.columns[disp_ind]
 
         self.flux_unit = str(self.man_flux_unit.text())
         self.disp_unit = str(self.man_disp_unit.text())
@@ -101,6 +105,14 @@ class FileEditDialog(QtGui.QDialog):
         super(FileEditDialog, self).accept()
 
     def _on_reject(self):
+        self.reject()
+
+    # --- overridden functions
+    def reject(self):
+        # Also on Escape and on closing the window.
+        if self.hdulist is not None:
+            self.hdulist.close()
+            self.hdulist = None
         super(FileEditDialog, self).reject()
 
 
@@ -1,8 +1,6 @@
 from os import sys, path
 
 from ...external.qt import QtGui, QtCore
-from pyqtgraph.console import ConsoleWidget
-from IPython.qt.console.rich_ipython_widget import RichIPythonWidget
 
 from specview.ui.qt.boxes import StatisticsGroupBox
 from specview.ui.qt.tree_views import SpectrumDataTree, ModelTree
@@ -173,6 +171,9 @@ class ConsoleDockWidget(BaseDockWidget):
 
         self.setAllowedAreas(QtCore.Qt.BottomDockWidgetArea)
 
+        # Importing the IPython Qt console is expensive; the dock itself
+        # is only created when the console is first asked for.
+        from IPython.qt.console.rich_ipython_widget import RichIPythonWidget
         self.wgt_console = RichIPythonWidget()
 
         self.add_widget(self.wgt_console)
@@ -238,3 +239,162 @@ class ModelDockWidget(BaseDockWidget):
         # self.add_widget(self.btn_replot_model)
 
         self.setMinimumSize(self.sizeHint())
+
+
+class TaskDockWidget(BaseDockWidget):
+    """List of background tasks, with the means to cancel them."""
+    def __init__(self, parent=None):
+        super(TaskDockWidget, self).__init__(parent)
+        self.setWindowTitle("Tasks")
+
+        self.setAllowedAreas(QtCore.Qt.LeftDockWidgetArea |
+                             QtCore.Qt.RightDockWidgetArea |
+                             QtCore.Qt.BottomDockWidgetArea)
+
+        self.wgt_task_list = QtGui.QTreeWidget()
+        self.wgt_task_list.setHeaderLabels(["Task", "Status"])
+        self.wgt_task_list.setRootIsDecorated(False)
+        self.wgt_task_list.setSelectionMode(
+            QtGui.QAbstractItemView.ExtendedSelection)
+
+        self.btn_cancel = QtGui.QPushButton("&Cancel")
+        self.btn_cancel.setToolTip("Cancel the selected tasks")
+        self.btn_clear = QtGui.QPushButton("C&lear Finished")
+        self.btn_clear.setToolTip("Remove finished tasks from the list")
+
+        hb_layout = QtGui.QHBoxLayout()
+        hb_layout.addWidget(self.btn_cancel)
+        hb_layout.addStretch()
+        hb_layout.addWidget(self.btn_clear)
+
+        self.add_widget(self.wgt_task_list)
+        self.add_layout(hb_layout)
+
+        self._task_items = {}
+
+    @property
+    def selected_tasks(self):
+        return [item.data(0, QtCore.Qt.UserRole)
+                for item in self.wgt_task_list.selectedItems()]
+
+    def update_task(self, task):
+        """Add `task` to the list, or refresh its status."""
+        item = self._task_items.get(task.id)
+
+        if item is None:
+            item = QtGui.QTreeWidgetItem([task.name, task.status])
+            item.setData(0, QtCore.Qt.UserRole, task)
+            self.wgt_task_list.addTopLevelItem(item)
+            self._task_items[task.id] = item
+        else:
+            item.setText(1, task.status)
+
+    def set_tasks(self, tasks):
+        """Show only `tasks`."""
+        self.wgt_task_list.clear()
+        self._task_items = {}
+
+        for task in tasks:
+            self.update_task(task)
+
+
+class CatalogDockWidget(BaseDockWidget):
+    """Query the local catalog of FITS files and open the matches."""
+    def __init__(self, parent=None):
+        super(CatalogDockWidget, self).__init__(parent)
+        self.setWindowTitle("Catalog")
+
+        self.setAllowedAreas(QtCore.Qt.LeftDockWidgetArea |
+                             QtCore.Qt.RightDockWidgetArea |
+                             QtCore.Qt.BottomDockWidgetArea)
+
+        # Query fields
+        self.le_object = QtGui.QLineEdit()
+        self.le_instrument = QtGui.QLineEdit()
+        self.le_column = QtGui.QLineEdit()
+        self.le_wavelength = QtGui.QLineEdit()
+        self.le_wavelength.setValidator(QtGui.QDoubleValidator(self))
+        for line_edit in (self.le_object, self.le_instrument,
+                          self.le_column):
+            line_edit.setToolTip("Wildcards * and ? are allowed")
+
+        form_layout = QtGui.QFormLayout()
+        form_layout.addRow(self.tr("Object"), self.le_object)
+        form_layout.addRow(self.tr("Instrument"), self.le_instrument)
+        form_layout.addRow(self.tr("Column"), self.le_column)
+        form_layout.addRow(self.tr("Covers"), self.le_wavelength)
+
+        # Results
+        self.wgt_results = QtGui.QTreeWidget()
+        self.wgt_results.setHeaderLabels(["File", "Object", "Instrument",
+                                          "Dispersion"])
+        self.wgt_results.setRootIsDecorated(False)
+        self.wgt_results.setSelectionMode(
+            QtGui.QAbstractItemView.ExtendedSelection)
+
+        self.lbl_count = QtGui.QLabel()
+
+        self.btn_scan = QtGui.QPushButton("S&can Directory...")
+        self.btn_scan.setToolTip("Add the FITS files of a directory")
+        self.btn_search = QtGui.QPushButton("&Search")
+        self.btn_open = QtGui.QPushButton("&Open Selected")
+
+        hb_layout = QtGui.QHBoxLayout()
+        hb_layout.addWidget(self.btn_scan)
+        hb_layout.addStretch()
+        hb_layout.addWidget(self.btn_search)
+        hb_layout.addWidget(self.btn_open)
+
+        self.add_layout(form_layout)
+        self.add_widget(self.wgt_results)
+        self.add_widget(self.lbl_count)
+        self.add_layout(hb_layout)
+
+    @property
+    def line_edits(self):
+        return [self.le_object, self.le_instrument, self.le_column,
+                self.le_wavelength]
+
+    @property
+    def criteria(self):
+        """Keyword arguments of `Catalog.query` for the filled fields."""
+        criteria = {}
+        for name, line_edit in (('object', self.le_object),
+                                ('instrument', self.le_instrument),
+                                ('column', self.le_column)):
+            text = str(line_edit.text()).strip()
+            if text:
+                criteria[name] = text
+        wavelength = str(self.le_wavelength.text()).strip()
+        if wavelength:
+            criteria['wavelength'] = float(wavelength)
+        return criteria
+
+    @property
+    def selected_entries(self):
+        return [item.data(0, QtCore.Qt.UserRole)
+                for item in self.wgt_results.selectedItems()]
+
+    def set_entries(self, entries, limit=None):
+        """Show the catalog `entries`, which were capped at `limit`."""
+        self.wgt_results.clear()
+        items = []
+        for entry in entries:
+            if entry.disp_min is not None:
+                dispersion = "{:g} - {:g} {}".format(
+                    entry.disp_min, entry.disp_max, entry.disp_unit or "")
+            else:
+                dispersion = ""
+            item = QtGui.QTreeWidgetItem([path.basename(entry.path),
+                                          entry.object or "",
+                                          entry.instrument or "",
+                                          dispersion])
+            item.setToolTip(0, entry.path)
+            item.setData(0, QtCore.Qt.UserRole, entry)
+            items.append(item)
+        self.wgt_results.addTopLevelItems(items)
+
+        text = "{} files".format(len(items))
+        if limit is not None and len(items) >= limit:
+            text = "First " + text
+        self.lbl_count.setText(text)
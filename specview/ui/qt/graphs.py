@@ -5,6 +5,7 @@ import pyqtgraph as pg
 import numpy as np
 
 from specview.ui.qt.tree_items import SpectrumDataTreeItem, LayerDataTreeItem
+from specview.tools.render import render_cache
 
 
 class BaseGraph(QtGui.QWidget):
@@ -98,6 +99,9 @@ class BaseGraph(QtGui.QWidget):
 
 
 class SpectraGraph(BaseGraph):
+    # Plot data of the layers, shared by all graphs.
+    render_cache = render_cache
+
     def __init__(self):
         super(SpectraGraph, self).__init__()
         self._plot_dict = {}
@@ -160,6 +164,22 @@ class SpectraGraph(BaseGraph):
         self.remove_item(layer_data_item)
         self.add_item(layer_data_item, style=style, color=color)
 
+    def update_data(self, layer_data_item):
+        """Show the current values of a layer in its existing plots.
+
+        The plots are updated in place, keeping their pen and style.
+        """
+        for plot in self._plot_dict.get(layer_data_item, []):
+            if isinstance(plot, pg.ScatterPlotItem):
+                data = self.render_cache.get(layer_data_item, self._units[0],
+                                             self._units[1], 'scatter')
+                plot.setData(x=data.x, y=data.y, pen=plot.opts['pen'])
+            elif isinstance(plot, pg.PlotDataItem):
+                style = 'histogram' if plot.opts['stepMode'] else 'line'
+                data = self.render_cache.get(layer_data_item, self._units[0],
+                                             self._units[1], style)
+                plot.setData(data.x, data.y)
+
     def add_item(self, layer_data_item, set_active=True, style='histogram',
                  color=None):
         color = next(self._icolors) if not color else color
@@ -197,33 +217,25 @@ class SpectraGraph(BaseGraph):
     def _graph_data(self, layer_data_item, set_active=True,
                     style='histogram', color=None):
         color = next(self._icolors) if not color else color
-        spec_data = layer_data_item.item
-        spec_x_array = spec_data.x.convert_unit_to(self._units[0])
-        spec_y_array = spec_data.y.convert_unit_to(self._units[1])
-
-        if style is not 'scatter':
-            if style is 'histogram':
-                fin_pnt = spec_x_array.data[-1] - spec_x_array.data[-2] +\
-                          spec_x_array.data[-1]
-                x_data = np.append(spec_x_array.data, fin_pnt)
-            else:
-                x_data = spec_x_array.data
-
-            plot = pg.PlotDataItem(x_data,
-                                   spec_y_array.data,
+        data = self.render_cache.get(layer_data_item, self._units[0],
+                                     self._units[1], style)
+
+        if style != 'scatter':
+            plot = pg.PlotDataItem(data.x,
+                                   data.y,
                                    pen=pg.mkPen(color),
                                    stepMode=style == 'histogram')
         else:
-            plot = pg.ScatterPlotItem(spec_x_array.data,
-                                      spec_y_array.data,
+            plot = pg.ScatterPlotItem(data.x,
+                                      data.y,
                                       pen=pg.mkPen(color))
 
         self.plot_window.setLabel('bottom',
                                   text='Dispersion [{}]'.format(
-                                      spec_x_array.unit))
+                                      data.x_unit))
         self.plot_window.setLabel('left',
                                   text='Flux [{}]'.format(
-                                      spec_y_array.unit))
+                                      data.y_unit))
 
         self._plot_dict[layer_data_item].append(plot)
         self.plot_window.addItem(plot)
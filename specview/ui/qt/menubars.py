@@ -13,9 +13,20 @@ class MainMainBar(QtGui.QMenuBar):
         self.atn_open.setShortcut('Ctrl+O')
         self.atn_open.setStatusTip('Open file')
 
+        self.atn_open_session = QtGui.QAction('Open &Session...', self)
+        self.atn_open_session.setStatusTip('Restore a saved session')
+
+        self.atn_save_session = QtGui.QAction('Sa&ve Session...', self)
+        self.atn_save_session.setShortcut('Ctrl+S')
+        self.atn_save_session.setStatusTip('Save the data tree as a session')
+
         # File
         file_menu = self.addMenu('&File')
         file_menu.addAction(self.atn_open)
+        file_menu.addSeparator()
+        file_menu.addAction(self.atn_open_session)
+        file_menu.addAction(self.atn_save_session)
+        file_menu.addSeparator()
         file_menu.addAction(self.atn_exit)
 
         self.window_menu = self.addMenu('&Windows')
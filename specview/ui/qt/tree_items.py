@@ -1,8 +1,7 @@
-import inspect
 import re
 import math
 
-from ...external.qt import QtGui, QtCore
+from ...external.qt import QtCore
 import numpy as np
 
 from specview.core.data_objects import SpectrumData
@@ -10,6 +9,9 @@ from specview.core.data_objects import SpectrumData
 # RE pattern to decode scientific and floating point notation.
 _pattern = re.compile(r"[+-]?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
 
+# Role of the value of an item, as for QStandardItem.
+DATA_ROLE = QtCore.Qt.UserRole + 1
+
 def float_check(value):
     """ Checks for a valid float in either scientific or floating point notation"""
     substring = _pattern.findall(str(value))
@@ -22,25 +24,203 @@ def float_check(value):
         return False
 
 
-class SpectrumDataTreeItem(QtGui.QStandardItem):
-    """Subclasses QStandarditem; provides the base class for all items listed
-    in the data set tree view. This currently acts as a wrapper around the
-    SpectrumData object. This class will probably be discarded in the future in
-    favor of a full subclass of AbstractModel.
+class TreeItem(object):
+    """Base class of the items of the data set tree.
+
+    Items are plain Python objects, shown by `SpectrumDataTreeModel`.
+    They keep the QStandardItem calls the rest of specview uses (text,
+    setText, data, setData, rowCount, child, index, ...).
+
+    Children are rows of one item per column. Subclasses that can make
+    their children on demand return them from `_create_rows` and
+    `_can_create_rows`; the model creates them when the view first
+    expands the item, or when `rowCount` or `child` are called.
+    """
+    # Icon file in qt/img, shared by all the items of a class.
+    icon_name = None
+
+    # Columns of the rows of children.
+    columns = 1
+
+    def __init__(self, parent=None, text=''):
+        self._parent = parent
+        self._text = text
+        self._value = None
+        self._check_state = None
+        self._editable = False
+        # The model showing the item, and the row and column of the item
+        # under its parent.
+        self._tree = None
+        self._row = 0
+        self._column = 0
+        # Rows of children; None until they are created.
+        self._rows = []
+
+    @property
+    def parent(self):
+        return self._parent
+
+    # --- QStandardItem compatible functions
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        self._text = text
+        self._changed()
+
+    def data(self, role=DATA_ROLE):
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return self._text
+        if role == QtCore.Qt.CheckStateRole:
+            return self._check_state
+        return self._value
+
+    def setData(self, value, role=DATA_ROLE):
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            self._text = value
+        elif role == QtCore.Qt.CheckStateRole:
+            if isinstance(value, bool):
+                value = QtCore.Qt.Checked if value else QtCore.Qt.Unchecked
+            self._check_state = value
+        else:
+            self._value = value
+        self._changed()
+
+    def checkState(self):
+        return self._check_state
+
+    def setCheckable(self, checkable):
+        if checkable and self._check_state is None:
+            self._check_state = QtCore.Qt.Unchecked
+        elif not checkable:
+            self._check_state = None
+
+    def isCheckable(self):
+        return self._check_state is not None
+
+    def setEditable(self, editable):
+        self._editable = editable
+
+    def isEditable(self):
+        return self._editable
+
+    def flags(self):
+        flags = (QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable |
+                 QtCore.Qt.ItemIsDragEnabled)
+        if self._editable:
+            flags |= QtCore.Qt.ItemIsEditable
+        if self.isCheckable():
+            flags |= QtCore.Qt.ItemIsUserCheckable
+        return flags
+
+    def index(self):
+        if self._tree is None:
+            return QtCore.QModelIndex()
+        return self._tree.indexFromItem(self)
+
+    def rowCount(self):
+        self._fetch()
+        return len(self._rows)
+
+    def columnCount(self):
+        return self.columns
+
+    def hasChildren(self):
+        if self._rows is None:
+            return self._can_create_rows()
+        return len(self._rows) > 0
+
+    def child(self, row, column=0):
+        self._fetch()
+        if not 0 <= row < len(self._rows) or \
+                column >= len(self._rows[row]):
+            return None
+        return self._rows[row][column]
+
+    def appendRow(self, items):
+        """Append a row of children; `items` is an item or one per column."""
+        self.appendRows([items])
+
+    def appendRows(self, rows):
+        """Append rows of children at once."""
+        self._fetch()
+        rows = [row if isinstance(row, (list, tuple)) else [row]
+                for row in rows]
+        if self._tree is not None:
+            self._tree.insert_rows(self, rows)
+        else:
+            self._attach(rows)
+
+    def removeRow(self, row):
+        if self._tree is not None:
+            self._tree.removeRow(row, self.index())
+        elif self._rows:
+            del self._rows[row]
+            self._renumber(row)
+
+    # --- protected functions
+    def _create_rows(self):
+        """Rows of children made on demand."""
+        return []
+
+    def _can_create_rows(self):
+        """Whether `_create_rows` would make any."""
+        return False
+
+    def _fetch(self):
+        if self._rows is not None:
+            return
+        if self._tree is not None:
+            self._tree.fetchMore(self.index())
+        else:
+            self._rows = []
+            self._attach(self._create_rows())
+
+    def _attach(self, rows):
+        """Make `rows` children of the item, after those it has."""
+        start = len(self._rows)
+        for i, row in enumerate(rows):
+            for column, item in enumerate(row):
+                item._parent = self
+                item._row = start + i
+                item._column = column
+                item._set_tree(self._tree)
+            self._rows.append(list(row))
+
+    def _set_tree(self, tree):
+        self._tree = tree
+        for row in self._rows or []:
+            for item in row:
+                item._set_tree(tree)
+
+    def _renumber(self, start=0):
+        for row in range(start, len(self._rows)):
+            for item in self._rows[row]:
+                item._row = row
+
+    def _changed(self):
+        if self._tree is not None:
+            self._tree.item_changed(self)
+
+
+class SpectrumDataTreeItem(TreeItem):
+    """Provides the base class for all items listed in the data set tree
+    view. This currently acts as a wrapper around the SpectrumData object.
 
     Note
     ----
     This currently treats `Models` as Qt-level discrete objects. This will
     change in the future.
     """
+    icon_name = 'data_set.png'
+
     def __init__(self, item, name="Data"):
-        super(SpectrumDataTreeItem, self).__init__()
+        super(SpectrumDataTreeItem, self).__init__(None, name)
         self.setEditable(True)
 
         self._item = item
         self._layers = []
-        self.setText(name)
-        self.setData(item)
+        self._value = item
 
     @property
     def parent(self):
@@ -63,6 +243,13 @@ class SpectrumDataTreeItem(QtGui.QStandardItem):
     def remove_layer(self, layer):
         self._layers.remove(layer)
 
+    def set_item(self, item):
+        """Replace the data, of the same length, and those of the layers."""
+        self._item = item
+        self._value = item
+        for layer in self._layers:
+            layer.refresh()
+
 
 class SignalUpdated(QtCore.QObject):
     # You can only have pyqtSignal() or Signal() in classes that are derived from QObject.
@@ -78,24 +265,20 @@ class SignalUpdated(QtCore.QObject):
         self.sig_updated.emit()
 
 
-class LayerDataTreeItem(QtGui.QStandardItem):
+class LayerDataTreeItem(TreeItem):
+    icon_name = 'layer.png'
+    columns = 2
+
     def __init__(self, parent, mask, rois, name="Layer"):
-        super(LayerDataTreeItem, self).__init__()
+        super(LayerDataTreeItem, self).__init__(parent, name)
 
         self.signal_updated = SignalUpdated()
 
-        self.setColumnCount(2)
-        self._parent = parent
         self._mask = mask
         self._rois = rois
         self._models = []
 
-        x = parent.item.x
-        y = parent.item.y
-        self._data = SpectrumData(x[~mask], y[~mask])
-
-        self.setText(name)
-        self.setData(self._data)
+        self.refresh()
 
     @property
     def model(self):
@@ -117,71 +300,68 @@ class LayerDataTreeItem(QtGui.QStandardItem):
     def add_model(self, model):
         self._models.append(model)
 
+    def refresh(self):
+        """Take the data of the parent again, through the mask."""
+        x = self._parent.item.x
+        y = self._parent.item.y
+        self._data = SpectrumData(x[~self._mask], y[~self._mask])
+        self._value = self._data
+
     # --- signals
     def sig_update(self):
         self.signal_updated.emit()
 
 
-class ModelDataTreeItem(QtGui.QStandardItem):
+class ModelDataTreeItem(TreeItem):
+    """A model of a layer; its parameters are made when first shown."""
+    icon_name = 'model.png'
+    columns = 2
+
     def __init__(self, parent, model, name="Model"):
-        super(ModelDataTreeItem, self).__init__()
-        self.setColumnCount(2)
-        self._parent = parent
+        super(ModelDataTreeItem, self).__init__(parent, name)
         self._model = model
         self._parameters = []
-        self.setText(name)
-
-        self._setup_children()
+        self._rows = None
 
     @property
     def parent(self):
         return self._parent
 
-    def _setup_children(self):
-        args = inspect.getargspec(self._model.__init__)
-        keywords = args[0]
-        values = self._model.parameters
+    def _can_create_rows(self):
+        return len(self._model.param_names) > 0
 
-        for i, key in enumerate(keywords[1:]):
-            para_name = ParameterDataTreeItem(self, key, values[i])
+    def _create_rows(self):
+        values = self._model.parameters
+        rows = []
+
+        for i, key in enumerate(self._model.param_names):
+            # Parameter attributes are attached to the parameter name/value
+            # tree node, and made when it is expanded. One could argue that
+            # in fact we need a sort of parent node to hold the parameter,
+            # and sub-nodes to hold its attributes AND value. But since
+            # that parent node would be rendered with the name and value
+            # anyway, the end result is the same, as far as the GUI goes.
+            para_name = ParameterNameDataTreeItem(self, key, values[i])
             para_value = ParameterValueDataTreeItem(self, key, values[i])
-            self._parameters.append((para_name, para_value))
-            self.appendRow([para_name, para_value])
+            rows.append([para_name, para_value])
 
-            # Parameter attributes are attached to the parameter name/value tree node.
-            # One could argue that in fact we need a sort of parent node to hold the
-            # parameter, and sub-nodes to hold its attributes AND value. But since
-            # that parent node would be rendered with the name and value anyway, the
-            # end result is the same, as far as the GUI goes. It remains to be seen
-            # if this will affect the three structure in any undesirable way.
-
-            parameter = getattr(self._model, key)
-            attr_fixed = self._model.fixed[key]
-
-            attr_name = ParameterDataTreeItem(para_name, 'fixed', attr_fixed)
-            attr_value = BooleanAttributeValueDataTreeItem(para_name, 'fixed', attr_fixed)
-            para_name.appendRow([attr_name, attr_value])
-
-            attr_name = ParameterDataTreeItem(para_name, 'min', parameter.min)
-            attr_value = AttributeValueDataTreeItem(para_name, 'min', parameter.min)
-            para_name.appendRow([attr_name, attr_value])
-
-            attr_name = ParameterDataTreeItem(para_name, 'max', parameter.max)
-            attr_value = AttributeValueDataTreeItem(para_name, 'max', parameter.max)
-            para_name.appendRow([attr_name, attr_value])
+        self._parameters = rows
+        return rows
 
     def update_value(self, name, value):
         setattr(self._model, name, value)
         self._parent.sig_update()
 
     def refresh_parameters(self):
-        print("Model refreshed")
-        for i in range(len(self.rowCount())):
-            self.removeRow(i)
-        self._setup_children()
+        if self._rows is None:
+            return
+        for row in reversed(range(len(self._rows))):
+            self.removeRow(row)
+        self._rows = None
+        self._parameters = []
 
 
-class ParameterDataTreeItem(QtGui.QStandardItem):
+class ParameterDataTreeItem(TreeItem):
     ''' Class that holds parameter and attribute names on the tree.
 
         A name is a non-editable string. It is used to build the
@@ -189,22 +369,47 @@ class ParameterDataTreeItem(QtGui.QStandardItem):
         name/value pair, or a parameter attribute name/value pair.
      '''
     def __init__(self, parent, name, value):
-        super(ParameterDataTreeItem, self).__init__()
+        super(ParameterDataTreeItem, self).__init__(parent)
         self.setEditable(False)
-        self._parent = parent
         self._name = name
         self._value = value
 
         self.setDataValue(name, value)
 
     def setDataValue(self, name, value):
-        self.setData(str(name), role=QtCore.Qt.DisplayRole)
+        self._text = str(name)
 
     @property
     def parent(self):
         return self._parent
 
 
+class ParameterNameDataTreeItem(ParameterDataTreeItem):
+    ''' The name of a parameter, with its fixed, min and max attributes
+        as children, made when first shown.
+    '''
+    columns = 2
+
+    def __init__(self, parent, name, value):
+        super(ParameterNameDataTreeItem, self).__init__(parent, name, value)
+        self._rows = None
+
+    def _can_create_rows(self):
+        return True
+
+    def _create_rows(self):
+        model = self._parent._model
+        parameter = getattr(model, self._name)
+        attr_fixed = model.fixed[self._name]
+
+        return [[ParameterDataTreeItem(self, 'fixed', attr_fixed),
+                 BooleanAttributeValueDataTreeItem(self, 'fixed', attr_fixed)],
+                [ParameterDataTreeItem(self, 'min', parameter.min),
+                 AttributeValueDataTreeItem(self, 'min', parameter.min)],
+                [ParameterDataTreeItem(self, 'max', parameter.max),
+                 AttributeValueDataTreeItem(self, 'max', parameter.max)]]
+
+
 class ParameterValueDataTreeItem(ParameterDataTreeItem):
     ''' Subclasses the base class to add the ability to edit
         the field and have it's value propagated to the
@@ -219,8 +424,8 @@ class ParameterValueDataTreeItem(ParameterDataTreeItem):
         self.setEditable(True)
 
     def setDataValue(self, name, value):
-        self.setData(value)
-        self.setText(str(value))
+        self._value = value
+        self._text = str(value)
 
     def update_value(self, name, value):
         value = float_check(value)
@@ -241,10 +446,6 @@ class AttributeValueDataTreeItem(ParameterValueDataTreeItem):
         # the layer that has to be signaled is 3 levels above the attribute.
         self._parent._parent._parent.sig_update()
 
-    def setDataValue(self, name, value):
-        self.setData(value)
-        self.setText(str(value))
-
 
 class BooleanAttributeValueDataTreeItem(ParameterValueDataTreeItem):
     ''' Subclasses the parameter value class to handle parameter
@@ -261,7 +462,9 @@ class BooleanAttributeValueDataTreeItem(ParameterValueDataTreeItem):
         # assigned to the tree node. Otherwise we may see a 'True' or 'False'
         # string displayed beside the checkbox (the default way Qt displays
         # checkable nodes with other role types).
-        self.setData(value, role=QtCore.Qt.CheckStateRole)
+        self._text = ''
+        self._check_state = QtCore.Qt.Checked if value else \
+            QtCore.Qt.Unchecked
 
     def update_value(self, name, value):
         # Both the passed name and value are ignored. We use the internally
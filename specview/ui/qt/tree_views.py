@@ -2,7 +2,7 @@ from ...external.qt import QtGui, QtCore
 
 from specview.ui.model import LayerDataTreeItem
 from specview.ui.qt.menus import SpectrumDataContextMenu
-from specview.ui.qt.tree_items import ParameterDataTreeItem
+from specview.ui.qt.tree_items import TreeItem, ParameterDataTreeItem
 
 
 class BaseDataTree(QtGui.QTreeView):
@@ -31,9 +31,9 @@ class BaseDataTree(QtGui.QTreeView):
             return
 
         item = model.itemFromIndex(index)
-        parent_index = model.indexFromItem(item.parent)
 
-        if isinstance(item, QtGui.QStandardItem):
+        if isinstance(item, TreeItem):
+            parent_index = model.indexFromItem(item.parent)
             context_menu = SpectrumDataContextMenu(self)
             context_menu.atn_remove.triggered.connect(
                 lambda: model.remove_data_item(index, parent_index))
@@ -73,6 +73,7 @@ class SpectrumDataTree(BaseDataTree):
     def setModel(self, model):
         super(SpectrumDataTree, self).setModel(model)
         model.sig_added_item.connect(self.set_selected_item)
+        model.sig_added_items.connect(self.set_selected_items)
 
     @property
     def current_item(self):
@@ -90,6 +91,13 @@ class SpectrumDataTree(BaseDataTree):
             self.setCurrentIndex(index)
             self._current_item = item
 
+    def set_selected_items(self, items):
+        # The last layer added, as for items added one by one.
+        layers = [item for item in items
+                  if isinstance(item, LayerDataTreeItem)]
+        if layers:
+            self.set_selected_item(layers[-1].index())
+
 
 class ModelTree(BaseDataTree):
     def __init__(self):
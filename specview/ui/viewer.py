@@ -3,12 +3,38 @@ from ..external.qt import QtGui, QtCore
 from specview.ui.qt.menubars import MainMainBar
 from specview.ui.qt.docks import (DataDockWidget, MeasurementDockWidget,
                                   ConsoleDockWidget, ModelDockWidget,
-                                  EquivalentWidthDockWidget)
+                                  EquivalentWidthDockWidget, TaskDockWidget,
+                                  CatalogDockWidget)
+from specview.tools.profiling import startup_profile
 
 
 class MainWindow(QtGui.QMainWindow):
+    # TODO: get rid of nasty try/excepts
+    try:
+        sig_dock_created = QtCore.pyqtSignal(str, object)
+    except AttributeError:
+        sig_dock_created = QtCore.Signal(str, object)
+
+    # Docks that are only created the first time they are asked for.
+    _lazy_docks = {
+        'measurement_dock': (MeasurementDockWidget,
+                             QtCore.Qt.RightDockWidgetArea),
+        'model_editor_dock': (ModelDockWidget,
+                              QtCore.Qt.RightDockWidgetArea),
+        'equiv_width_dock': (EquivalentWidthDockWidget,
+                             QtCore.Qt.LeftDockWidgetArea),
+        'console_dock': (ConsoleDockWidget,
+                         QtCore.Qt.BottomDockWidgetArea),
+        'task_dock': (TaskDockWidget,
+                      QtCore.Qt.RightDockWidgetArea),
+        'catalog_dock': (CatalogDockWidget,
+                         QtCore.Qt.LeftDockWidgetArea),
+    }
+
     def __init__(self, show_console=True):
         super(MainWindow, self).__init__()
+        self._docks = {}
+        self._dock_actions = {}
         # Basic app info
         self.show_console = show_console
         self.menu_bar = MainMainBar()
@@ -41,41 +67,77 @@ class MainWindow(QtGui.QMainWindow):
         self.data_dock = DataDockWidget(self)
         self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.data_dock)
 
-        # Setup measurement dock
-        self.measurement_dock = MeasurementDockWidget(self)
-        self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.measurement_dock)
-        self.measurement_dock.hide()
-
-        # Setup model dock
-        self.model_editor_dock = ModelDockWidget(self)
-        self.addDockWidget(QtCore.Qt.RightDockWidgetArea,
-                           self.model_editor_dock)
-        #self.model_editor_dock.setFloating(True)
-        self.model_editor_dock.hide()
-
-        # Setup equivalent width dock
-        self.equiv_width_dock = EquivalentWidthDockWidget(self)
-        self.addDockWidget(QtCore.Qt.LeftDockWidgetArea,
-                           self.equiv_width_dock)
-        #self.equiv_width_dock.setFloating(True)
-        self.equiv_width_dock.hide()
-
-        # Setup console dock
-        self.console_dock = ConsoleDockWidget(self)
-        self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self.console_dock)
-
         self._setup_menu_bar()
 
+    # -- lazily created docks
+    @property
+    def measurement_dock(self):
+        return self.get_dock('measurement_dock')
+
+    @property
+    def model_editor_dock(self):
+        return self.get_dock('model_editor_dock')
+
+    @property
+    def equiv_width_dock(self):
+        return self.get_dock('equiv_width_dock')
+
+    @property
+    def console_dock(self):
+        return self.get_dock('console_dock')
+
+    @property
+    def task_dock(self):
+        return self.get_dock('task_dock')
+
+    @property
+    def catalog_dock(self):
+        return self.get_dock('catalog_dock')
+
+    def has_dock(self, name):
+        """Whether the dock `name` has been created yet."""
+        return name in self._docks
+
+    def get_dock(self, name):
+        """Return the dock `name`, creating it hidden on first use.
+
+        `sig_dock_created` is emitted when a dock is created, so that
+        its widgets can be connected.
+        """
+        if name not in self._docks:
+            with startup_profile.phase('create {}'.format(name)):
+                dock_class, area = self._lazy_docks[name]
+                dock = dock_class(self)
+                self.addDockWidget(area, dock)
+                dock.hide()
+                self._docks[name] = dock
+
+            if name in self._dock_actions:
+                dock.visibilityChanged.connect(
+                    self._dock_actions[name].setChecked)
+
+            self.sig_dock_created.emit(name, dock)
+
+        return self._docks[name]
+
     def _setup_menu_bar(self):
         self.menu_bar.window_menu.addAction(
             self.data_dock.toggleViewAction())
-        self.menu_bar.window_menu.addAction(
-            self.measurement_dock.toggleViewAction())
-        # self.menu_bar.docks_menu.addAction(
-        #     self.equiv_width_dock.toggleViewAction())
+        self._add_dock_action('measurement_dock', 'Measurement Info')
+        # self._add_dock_action('equiv_width_dock', 'Equivalent Width')
+        self._add_dock_action('task_dock', 'Tasks')
+        self._add_dock_action('catalog_dock', 'Catalog')
         if self.show_console:
-            self.menu_bar.window_menu.addAction(
-                self.console_dock.toggleViewAction())
+            self._add_dock_action('console_dock', 'Console')
+
+    def _add_dock_action(self, name, title):
+        # Stands in for `toggleViewAction` until the dock exists.
+        action = QtGui.QAction(title, self)
+        action.setCheckable(True)
+        action.triggered.connect(
+            lambda checked: self.get_dock(name).setVisible(checked))
+        self._dock_actions[name] = action
+        self.menu_bar.window_menu.addAction(action)
 
     def set_toolbar(self, toolbar=None, hide_all=False):
         if toolbar is not None: